@@ -0,0 +1,112 @@
+"""Rows/second of the vectorised regime and AQI classifiers against the old loops.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_classifiers.py --rows 1000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "dashboard"))
+
+from src.aqi_bands import band_labels  # noqa: E402
+from src.classifiers import classify_regimes  # noqa: E402
+from src.data_management import read_daily  # noqa: E402
+
+
+def legacy_regimes(df):
+    # The loop previously inlined in pages/4_predictions.py
+    regimes = []
+    for idx, row in df.iterrows():
+        wind = row.get('wind_speed_10m', row.get('wind_speed', 5))
+        pm25 = row.get('pm2_5', 25)
+        temp = row.get('temperature_2m', row.get('temperature', 20))
+
+        if wind < 3:
+            if pm25 > 35:
+                regime = 'Polluted Stagnation'
+            else:
+                regime = 'Stagnant'
+        elif wind > 8:
+            regime = 'Well-Ventilated'
+        elif pm25 > 50:
+            regime = 'High Pollution'
+        elif temp > 28:
+            regime = 'Heat Dominated'
+        else:
+            regime = 'Mixed Conditions'
+
+        regimes.append(regime)
+    return regimes
+
+
+def legacy_categorize_aqi(aqi):
+    # The per-value if/elif chain the pages used, with the EPA bands
+    if aqi <= 50:
+        return "Good"
+    elif aqi <= 100:
+        return "Moderate"
+    elif aqi <= 150:
+        return "Unhealthy for Sensitive Groups"
+    elif aqi <= 200:
+        return "Unhealthy"
+    elif aqi <= 300:
+        return "Very Unhealthy"
+    else:
+        return "Hazardous"
+
+
+def synthetic_frame(n_rows, seed=0):
+    """Resample the daily dataset to ``n_rows`` with jitter so every rule fires."""
+    base = read_daily()
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+    df["wind_speed_10m"] = rng.gamma(2.0, 3.0, n_rows).astype(np.float32)
+    df["pm2_5"] = rng.gamma(2.0, 12.0, n_rows).astype(np.float32)
+    df["temperature_2m"] = rng.normal(15, 10, n_rows).astype(np.float32)
+    df["us_aqi"] = rng.gamma(2.0, 35.0, n_rows).astype(np.float32)
+    return df
+
+
+def rows_per_second(func, n_rows):
+    start = time.perf_counter()
+    func()
+    return n_rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=20_000,
+                        help="rows given to the slow loops (rate is per row)")
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    legacy_df = df.iloc[:args.legacy_rows]
+
+    # Same labels as the old rules, row for row
+    assert list(classify_regimes(legacy_df)) == legacy_regimes(legacy_df)
+    assert list(band_labels(legacy_df["us_aqi"])) == list(
+        legacy_df["us_aqi"].apply(legacy_categorize_aqi))
+
+    results = [
+        ("regime, iterrows loop", rows_per_second(
+            lambda: legacy_regimes(legacy_df), len(legacy_df))),
+        ("regime, np.select", rows_per_second(
+            lambda: classify_regimes(df), len(df))),
+        ("aqi category, Series.apply", rows_per_second(
+            lambda: legacy_df["us_aqi"].apply(legacy_categorize_aqi), len(legacy_df))),
+        ("aqi category, np.digitize", rows_per_second(
+            lambda: band_labels(df["us_aqi"]), len(df))),
+    ]
+    print(pd.DataFrame(results, columns=["classifier", "rows_per_second"])
+          .to_string(index=False, float_format="{:,.0f}".format))
+
+
+if __name__ == "__main__":
+    main()
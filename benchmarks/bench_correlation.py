@@ -0,0 +1,71 @@
+"""Correlation queries: full ``DataFrame.corr()`` scans vs the sufficient-statistics engine.
+
+Builds a synthetic hourly history for N locations, then times a full matrix
+and a single pair through pandas (a scan per query), the engine's initial
+build, its queries, and folding in one extra day.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_correlation.py --locations 50 --days 1095
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "dashboard"))
+
+from src.correlation import CorrelationEngine  # noqa: E402
+from synthetic import VARIABLES, hourly_frame, synthetic_locations  # noqa: E402
+
+
+def timed(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    locations = synthetic_locations(args.locations)
+    hours = args.days * 24
+    aq = hourly_frame("air_quality", locations, hours=hours + 24)
+    weather = hourly_frame("weather", locations, hours=hours + 24, seed=1)
+    columns = list(VARIABLES["air_quality"]) + list(VARIABLES["weather"])
+    frame = pd.concat([aq, weather[list(VARIABLES["weather"])]], axis=1)
+    frame["city"] = frame["city"].astype("category")
+    frame = frame.rename(columns={"date": "date_hour"})
+
+    cutoff = frame["date_hour"].min() + pd.Timedelta(hours=hours)
+    history = frame[frame["date_hour"] < cutoff]
+
+    engine = CorrelationEngine(columns, date_col="date_hour")
+    rows = [
+        ("pandas corr() matrix", *timed(lambda: history[columns].corr())[:1]),
+        ("pandas corr() pair", *timed(lambda: history["temperature_2m"].corr(history["us_aqi"]))[:1]),
+        ("engine initial build", *timed(lambda: engine.update(history), repeat=1)[:1]),
+        ("engine matrix", *timed(engine.matrix)[:1]),
+        ("engine pair", *timed(lambda: engine.pair("temperature_2m", "us_aqi"))[:1]),
+        ("engine +1 day update", *timed(lambda: engine.update(frame), repeat=1)[:1]),
+    ]
+
+    expected = frame[columns].astype(np.float64).corr().to_numpy()
+    assert np.allclose(engine.matrix().to_numpy(), expected, atol=1e-9)
+
+    print(f"history: {len(history):,} rows x {len(columns)} columns")
+    print(pd.DataFrame(rows, columns=["query", "seconds"])
+          .to_string(index=False, float_format="{:.5f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Peak RSS and throughput of the hourly -> daily ETL on synthetic hourly CSVs.
+
+Generates ``air_quality`` and ``weather`` hourly CSVs for N locations x M days,
+then runs the streaming ETL (``src.etl``) and, optionally, the notebook's
+load-everything approach, each in a fresh subprocess so peak RSS is measured
+per run.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_etl.py --locations 2000 --days 365 --legacy   # ~2 x 2.5 GB
+    python benchmarks/bench_etl.py --locations 100 --days 60              # quick run
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+DASHBOARD_DIR = Path(__file__).resolve().parents[1] / "dashboard"
+sys.path.insert(0, str(DASHBOARD_DIR))
+
+from src.etl import (  # noqa: E402
+    AQ_NUMERIC_COLS, WEATHER_NUMERIC_COLS, build_dashboard_df, csv_chunks,
+)
+from synthetic import write_hourly_csv  # noqa: E402
+
+
+def legacy_etl(aq_path, weather_path):
+    # The steps in notebooks/04_etl_modeling.ipynb, on fully loaded frames
+    weather_df = pd.read_csv(weather_path)
+    aq_df = pd.read_csv(aq_path)
+    for df in (weather_df, aq_df):
+        df['date'] = pd.to_datetime(df['date'])
+        df['date_day'] = df['date'].dt.date
+        df['hour'] = df['date'].dt.hour
+
+    aq_daily = aq_df.groupby(["city", "date_day"])[AQ_NUMERIC_COLS].mean().reset_index()
+    weather_daily = weather_df.groupby(["city", "date_day"])[WEATHER_NUMERIC_COLS].mean().reset_index()
+    merged_df = pd.merge(aq_daily, weather_daily, on=['city', 'date_day'], how='inner')
+    merged_df['date_day'] = pd.to_datetime(merged_df['date_day'])
+    location_lookup = weather_df[['city', 'country', 'lat', 'lon']].drop_duplicates().reset_index(drop=True)
+    return pd.merge(merged_df, location_lookup, on='city', how='left')
+
+
+def run_once(mode, aq_path, weather_path, chunksize):
+    start = time.perf_counter()
+    if mode == "streaming":
+        result = build_dashboard_df(
+            csv_chunks(aq_path, AQ_NUMERIC_COLS, chunksize),
+            csv_chunks(weather_path, WEATHER_NUMERIC_COLS, chunksize),
+            output_path=None,
+        )
+    else:
+        result = legacy_etl(aq_path, weather_path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak_mb, "daily_rows": len(result)}))
+
+
+def measure(mode, aq_path, weather_path, chunksize):
+    output = subprocess.run(
+        [sys.executable, __file__, "--run", mode, "--chunksize", str(chunksize),
+         "--aq", str(aq_path), "--weather", str(weather_path)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=100)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    parser.add_argument("--legacy", action="store_true",
+                        help="also run the notebook's in-memory ETL for comparison")
+    parser.add_argument("--workdir", type=Path, default=None,
+                        help="where to write the synthetic CSVs (default: a temp dir)")
+    parser.add_argument("--run", choices=["streaming", "legacy"], help=argparse.SUPPRESS)
+    parser.add_argument("--aq", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--weather", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_once(args.run, args.aq, args.weather, args.chunksize)
+        return
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+        hours = args.days * 24
+        aq_path = write_hourly_csv(Path(tmp) / "air_quality_df.csv", "air_quality", args.locations, hours)
+        weather_path = write_hourly_csv(Path(tmp) / "weather_df.csv", "weather", args.locations, hours)
+        input_mb = (aq_path.stat().st_size + weather_path.stat().st_size) / 2**20
+        hourly_rows = 2 * args.locations * hours
+
+        modes = ["streaming"] + (["legacy"] if args.legacy else [])
+        rows = []
+        for mode in modes:
+            result = measure(mode, aq_path, weather_path, args.chunksize)
+            rows.append((mode, result["seconds"], result["peak_rss_mb"],
+                         hourly_rows / result["seconds"], result["daily_rows"]))
+
+    print(f"input: {hourly_rows:,} hourly rows, {input_mb:,.0f} MB of CSV")
+    print(pd.DataFrame(rows, columns=["etl", "seconds", "peak_rss_mb", "rows_per_second", "daily_rows"])
+          .to_string(index=False, float_format="{:,.1f}".format))
+
+
+if __name__ == "__main__":
+    main()
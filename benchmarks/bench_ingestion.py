@@ -0,0 +1,68 @@
+"""Wall time of the hourly fetch against a local mock Open-Meteo server.
+
+Compares one request per location issued serially (what the ingestion
+notebook does) with batched requests run concurrently over a pooled session,
+for a growing number of locations. The mock answers with real FlatBuffer
+payloads after a simulated network latency.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_ingestion.py --locations 6 50 200 --days 30
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "dashboard"))
+
+from src.ingestion import PooledFetcher  # noqa: E402
+from src.openmeteo_stub import serve_stub  # noqa: E402
+from synthetic import synthetic_locations  # noqa: E402
+
+
+def time_fetch(fetcher, locations, first, last):
+    start = time.perf_counter()
+    frame = fetcher.fetch("air_quality", locations, first, last)
+    elapsed = time.perf_counter() - start
+    assert frame["pm2_5"].notna().all()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, nargs="+", default=[6, 50, 200])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="seconds the mock server waits per request")
+    parser.add_argument("--latency-per-location", type=float, default=0.002)
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--max-workers", type=int, default=8)
+    args = parser.parse_args()
+
+    server, base_url = serve_stub(args.latency, args.latency_per_location)
+    urls = {"air_quality": base_url + "/v1/air-quality"}
+    first = pd.Timestamp("2025-11-07", tz="UTC")
+    last = first + pd.Timedelta(days=args.days) - pd.Timedelta(hours=1)
+
+    serial = PooledFetcher(batch_size=1, max_workers=1, urls=urls)
+    pooled = PooledFetcher(batch_size=args.batch_size, max_workers=args.max_workers, urls=urls)
+
+    rows = []
+    try:
+        for n in args.locations:
+            locations = synthetic_locations(n)
+            serial_s = time_fetch(serial, locations, first, last)
+            pooled_s = time_fetch(pooled, locations, first, last)
+            rows.append((n, serial_s, pooled_s, serial_s / pooled_s))
+    finally:
+        server.shutdown()
+
+    print(pd.DataFrame(rows, columns=["locations", "serial_s", "batched_concurrent_s", "speedup"])
+          .to_string(index=False, float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""KMeans k sweep: the notebook's serial loops vs ``src.model_selection.sweep``.
+
+Builds a synthetic daily history for N locations, projects it once, then
+times the notebook's approach (a serial inertia sweep followed by a second
+serial pass computing exact silhouette scores) against the parallel sweep
+with sampled silhouette.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_model_selection.py --locations 200 --days 365
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "dashboard"))
+
+from src.model_selection import CLUSTER_FEATURES, project, sweep  # noqa: E402
+from synthetic import daily_frame, synthetic_locations  # noqa: E402
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def notebook_sweep(matrix, ks):
+    inertia = [KMeans(n_clusters=k, random_state=0).fit(matrix).inertia_ for k in ks]
+    silhouette = [
+        silhouette_score(matrix, KMeans(n_clusters=k, random_state=0).fit_predict(matrix))
+        for k in ks if k > 1
+    ]
+    return inertia, silhouette
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--max-workers", type=int, default=None)
+    args = parser.parse_args()
+
+    df = daily_frame(synthetic_locations(args.locations), days=args.days)
+    matrix = project(df[CLUSTER_FEATURES].dropna())
+    ks = range(1, 11)
+
+    serial_s, (inertia, silhouette) = timed(lambda: notebook_sweep(matrix, ks))
+    sweep_s, results = timed(lambda: sweep(matrix, ks, args.max_workers))
+
+    print(f"{len(matrix):,} rows, k = {ks.start}..{ks.stop - 1}")
+    print(f"notebook loops:   {serial_s:8.2f}s")
+    print(f"parallel sweep:   {sweep_s:8.2f}s")
+    print(f"max |inertia diff|:    {np.max(np.abs(results['inertia'].to_numpy() - inertia)):.3g}")
+    print(f"max |silhouette diff|: {np.nanmax(np.abs(results['silhouette'].to_numpy()[1:] - silhouette)):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Chart-sized queries against the daily dataset: in-memory CSV vs partitioned Parquet.
+
+Writes a synthetic daily history for N stations x M days both as the single
+CSV the in-memory backend loads and as the city/year partitioned dataset of
+``src.partitioned``, then times typical chart queries each way and reports
+how many bytes each materialises.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_out_of_core.py --locations 2000 --days 1095
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "dashboard"))
+
+from src.data_management import to_daily_schema  # noqa: E402
+from src.partitioned import scan, write_partitioned  # noqa: E402
+from synthetic import daily_frame, synthetic_locations  # noqa: E402
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--days", type=int, default=730)
+    args = parser.parse_args()
+
+    locations = synthetic_locations(args.locations)
+    city = locations[len(locations) // 2]["city"]
+    df = to_daily_schema(daily_frame(locations, days=args.days))
+    start = df["date_day"].max() - pd.Timedelta(days=30)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "dashboard_df.csv"
+        df.to_csv(csv_path, index=False)
+        root = write_partitioned(df, Path(tmp) / "daily")
+        del df
+
+        def in_memory(query):
+            frame = to_daily_schema(pd.read_csv(csv_path))
+            return query(frame), frame.memory_usage(deep=True).sum()
+
+        queries = {
+            "one city, last 30 days, 1 column": (
+                lambda frame: frame.loc[(frame["city"] == city) & (frame["date_day"] >= start), ["date_day", "us_aqi"]],
+                lambda: scan(["date_day", "us_aqi"], [city], start, root=root),
+            ),
+            "all cities, 2 columns": (
+                lambda frame: frame[["temperature_2m", "us_aqi"]],
+                lambda: scan(["temperature_2m", "us_aqi"], root=root),
+            ),
+        }
+
+        rows = []
+        for name, (memory_query, partitioned_query) in queries.items():
+            memory_s, (memory_result, frame_bytes) = timed(lambda: in_memory(memory_query))
+            scan_s, scan_result = timed(partitioned_query)
+            assert len(memory_result) == len(scan_result)
+            rows.append((name, memory_s, scan_s, frame_bytes / 2**20,
+                         scan_result.memory_usage(deep=True).sum() / 2**20))
+
+    print(f"history: {args.locations:,} stations x {args.days:,} days")
+    print(pd.DataFrame(rows, columns=["query", "in_memory_s", "partitioned_s", "in_memory_mb", "partitioned_mb"])
+          .to_string(index=False, float_format="{:.3f}".format))
+    print("in-memory figures include loading the whole CSV, which that backend holds for every query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Regime model serving: joblib pickle of the sklearn Pipeline vs the NumPy artifact.
+
+Cold start is timed in a fresh interpreter per run (imports plus load), so it
+includes importing sklearn for the pickle. Scoring latency is timed in this
+process for single rows and for one batch.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_regime_artifact.py --rows 1000000
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DASHBOARD = Path(__file__).resolve().parents[1] / "dashboard"
+sys.path.insert(0, str(DASHBOARD))
+
+from src.regime_artifact import REGIME_ARTIFACT_PATH, REGIME_MODEL_PATH, RegimeArtifact  # noqa: E402
+
+COLD_START = {
+    "pickle": (
+        "import time; start = time.perf_counter(); import joblib; "
+        f"joblib.load({str(REGIME_MODEL_PATH)!r}); print(time.perf_counter() - start)"
+    ),
+    "npz": (
+        "import time; start = time.perf_counter(); from src.regime_artifact import RegimeArtifact; "
+        f"RegimeArtifact.load({str(REGIME_ARTIFACT_PATH)!r}); print(time.perf_counter() - start)"
+    ),
+}
+
+
+def cold_start(code, repeat):
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=DASHBOARD,
+                                capture_output=True, text=True, check=True).stdout
+        times.append(float(output.split()[-1]))
+    return min(times)
+
+
+def best(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import warnings
+
+    import joblib
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        pipeline = joblib.load(REGIME_MODEL_PATH)
+    artifact = RegimeArtifact.load()
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(50, 20, size=(args.rows, len(artifact.feature_names_in_))),
+                     columns=artifact.feature_names_in_)
+    assert (pipeline.predict(X) == artifact.predict(X)).all()
+    one = X.iloc[:1]
+
+    rows = []
+    for name, model in (("pickle", pipeline), ("npz", artifact)):
+        rows.append({
+            "format": name,
+            "cold_start_ms": cold_start(COLD_START[name], args.repeat) * 1e3,
+            "single_row_us": best(lambda: model.predict(one), args.repeat * 20) * 1e6,
+            "batch_ns_per_row": best(lambda: model.predict(X), args.repeat) / args.rows * 1e9,
+        })
+    print(f"file sizes: pickle {REGIME_MODEL_PATH.stat().st_size:,} B, npz {REGIME_ARTIFACT_PATH.stat().st_size:,} B")
+    print(pd.DataFrame(rows).to_string(index=False, float_format="{:.1f}".format))
+
+
+if __name__ == "__main__":
+    main()
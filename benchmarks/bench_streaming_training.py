@@ -0,0 +1,81 @@
+"""Regime pipeline training: full-batch fit vs the streamed ``partial_fit`` fit.
+
+The synthetic generator draws every variable independently, which leaves
+nothing for PCA or KMeans to find, so the history here is the real daily
+dataset resampled to N rows with a little noise added. It is written to a CSV,
+then the notebook pipeline is fitted on the whole frame and the streaming
+pipeline from CSV chunks, reporting time, peak traced memory and how closely
+the streamed clusters match the batch ones.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_streaming_training.py --rows 1000000
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "dashboard"))
+
+from src.data_management import DAILY_CSV  # noqa: E402
+from src.model_selection import CLUSTER_FEATURES  # noqa: E402
+from src.regime_training import compare, fit_batch, fit_streaming  # noqa: E402
+
+
+def resampled_history(n_rows, noise=0.05, seed=0):
+    """``n_rows`` rows drawn from the daily dataset, jittered by ``noise`` standard deviations."""
+    rng = np.random.default_rng(seed)
+    daily = pd.read_csv(DAILY_CSV, usecols=CLUSTER_FEATURES)[CLUSTER_FEATURES].dropna()
+    rows = daily.to_numpy()[rng.integers(0, len(daily), n_rows)]
+    rows += rng.normal(scale=noise * daily.std().to_numpy(), size=rows.shape)
+    return pd.DataFrame(rows, columns=CLUSTER_FEATURES)
+
+
+def measured(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2**20, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunksize", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "dashboard_df.csv"
+        resampled_history(args.rows).to_csv(csv_path, index=False)
+        dtype = dict.fromkeys(CLUSTER_FEATURES, np.float32)
+
+        def chunks():
+            for chunk in pd.read_csv(csv_path, usecols=CLUSTER_FEATURES, dtype=dtype,
+                                     chunksize=args.chunksize):
+                yield chunk[CLUSTER_FEATURES].dropna()
+
+        batch_s, batch_mb, batch = measured(
+            lambda: fit_batch(pd.read_csv(csv_path, usecols=CLUSTER_FEATURES, dtype=dtype)
+                              [CLUSTER_FEATURES].dropna())
+        )
+        stream_s, stream_mb, streaming = measured(lambda: fit_streaming(chunks))
+
+        X = pd.read_csv(csv_path, usecols=CLUSTER_FEATURES, dtype=dtype)[CLUSTER_FEATURES].dropna()
+
+    print(f"history: {len(X):,} rows, chunks of {args.chunksize:,}")
+    print(f"batch fit:     {batch_s:6.2f}s  peak {batch_mb:7.1f} MB")
+    print(f"streaming fit: {stream_s:6.2f}s  peak {stream_mb:7.1f} MB")
+    print(compare(batch, streaming, X).to_string(float_format="{:.4f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Cold-start profile of the dashboard pages.
+
+Each page is rendered headless with Streamlit's ``AppTest`` in a fresh
+interpreter, the way the first request after a container restart sees it:
+
+- ``streamlit_s``: importing Streamlit itself, common to every page;
+- ``import_s``: time inside ``import`` statements while the page first runs
+  (its own imports and everything they pull in);
+- ``first_render_s``: the whole first run, imports and data loading included;
+- ``rerun_s``: a second run in the same process, with modules and caches warm.
+
+The slowest top-level imports of each page are listed under the table.
+
+Usage (from the repository root):
+
+    python benchmarks/profile_startup.py
+    python benchmarks/profile_startup.py pages/3_monitoring.py --json startup.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+DASHBOARD = Path(__file__).resolve().parents[1] / "dashboard"
+PAGES = [
+    "air_quality.py",
+    "pages/1_overview.py",
+    "pages/2_insights.py",
+    "pages/3_monitoring.py",
+    "pages/4_predictions.py",
+]
+
+# Runs in the child interpreter; prints one JSON line
+PROFILE_PAGE = r"""
+import builtins, json, logging, sys, time, warnings
+warnings.filterwarnings("ignore")
+logging.disable(logging.WARNING)
+
+start = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+streamlit_s = time.perf_counter() - start
+
+original_import = builtins.__import__
+depth = 0
+imports = {}
+
+def timed_import(name, *args, **kwargs):
+    global depth
+    if depth or name in sys.modules:
+        return original_import(name, *args, **kwargs)
+    depth += 1
+    began = time.perf_counter()
+    try:
+        return original_import(name, *args, **kwargs)
+    finally:
+        depth -= 1
+        imports[name] = imports.get(name, 0.0) + time.perf_counter() - began
+
+page = sys.argv[1]
+app = AppTest.from_file(page, default_timeout=300)
+builtins.__import__ = timed_import
+start = time.perf_counter()
+app.run()
+first_render_s = time.perf_counter() - start
+builtins.__import__ = original_import
+start = time.perf_counter()
+app.run()
+rerun_s = time.perf_counter() - start
+
+print(json.dumps({
+    "page": page,
+    "streamlit_s": streamlit_s,
+    "import_s": sum(imports.values()),
+    "first_render_s": first_render_s,
+    "rerun_s": rerun_s,
+    "exception": [str(e.value) for e in app.exception][:1],
+    "slowest_imports": sorted(imports.items(), key=lambda item: -item[1])[:5],
+}))
+"""
+
+
+def profile_page(page, repeat=1, env=None):
+    """Profile ``page`` in ``repeat`` fresh interpreters; keeps the fastest first render.
+
+    ``env`` adds environment variables, e.g. ``AIR_QUALITY_DATASETS_DIR``.
+    """
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", PROFILE_PAGE, str(DASHBOARD / page)],
+            cwd=DASHBOARD, env={"PYTHONPATH": str(DASHBOARD), "PATH": "", **(env or {})},
+            capture_output=True, text=True, check=True,
+        )
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run["first_render_s"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", default=PAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = [profile_page(page, args.repeat) for page in args.pages]
+
+    print(f"{'page':<24}{'streamlit_s':>12}{'import_s':>10}{'first_render_s':>16}{'rerun_s':>9}")
+    for row in results:
+        name = Path(row["page"]).name
+        print(f"{name:<24}{row['streamlit_s']:>12.2f}{row['import_s']:>10.2f}"
+              f"{row['first_render_s']:>16.2f}{row['rerun_s']:>9.2f}"
+              + (f"  EXCEPTION: {row['exception'][0][:60]}" if row["exception"] else ""))
+    for row in results:
+        slowest = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in row["slowest_imports"])
+        print(f"{Path(row['page']).name}: {slowest}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+        print(f"Results saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""Benchmark suite for the ingestion, ETL, aggregation, model and page render paths.
+
+Every run generates a synthetic workload in the schema of
+``air_quality_df.csv`` / ``weather_df.csv`` for N cities x M hours and times:
+
+- ``ingestion.decode``: decoding FlatBuffers responses into the columnar frame;
+- ``ingestion.response_cache``: a window fetched through the per-day response
+  cache cold, again warm and shifted by a day, counting the requests made;
+- ``etl.hourly_to_daily``: the streaming hourly -> daily ETL over both CSVs;
+- ``aqi.hourly``: the AQI computed from the hourly pollutant concentrations;
+- ``cache.daily``: a cold start's CSV parse of the daily dataset against
+  writing and reading it back from the shared disk cache;
+- ``insights.city_aggregations``: building the aggregate cube and the city
+  statistics the Insights page shows, next to a plain pandas groupby;
+- ``monitoring.rolling``: rolling means, EWMA, z-scores and exceedance runs
+  of every city, in full and as the one-day update of an ingest cycle;
+- ``predictions.regimes``: the rule-based regime classifier and the KMeans
+  regime model the Predictions page scores with;
+- ``predictions.forecast``: lagged features and next-day AQI category scoring
+  for every city-day in one batch, for each city's latest day and for one row;
+- ``pages.<page>``: headless first render and rerun of every page with
+  Streamlit's ``AppTest``, against the daily dataset the ETL just wrote.
+
+Results are written as JSON named after the current commit, so runs from
+different commits can be compared with ``--compare``.
+
+Usage (from the repository root):
+
+    python benchmarks/suite.py --cities 50 --hours 720
+    python benchmarks/suite.py --only etl insights --compare benchmarks/results/1d54d6b.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "dashboard"))
+
+from profile_startup import PAGES, profile_page  # noqa: E402
+from src.aggregates import build_cube, summarize  # noqa: E402
+from src.aqi import compute_aqi  # noqa: E402
+from src.classifiers import classify_regimes  # noqa: E402
+from src.data_management import to_daily_schema  # noqa: E402
+from src.disk_cache import DiskCache  # noqa: E402
+from src.etl import AQ_NUMERIC_COLS, WEATHER_NUMERIC_COLS, build_dashboard_df, csv_chunks, utc_hours  # noqa: E402
+from src.forecasting import forecast, latest_rows, load_forecast_model, train  # noqa: E402
+from src.ingestion import ENDPOINTS, ClientFetcher, HourlyFetcher, decode_flatbuffers  # noqa: E402
+from src.model_serving import load_regime_model, predict_regimes  # noqa: E402
+from src.rolling import EWMA_SPAN, RollingEngine, rolling_stats  # noqa: E402
+from src.openmeteo_stub import HOUR, StubOpenMeteoClient, encode_response, synthetic_values  # noqa: E402
+from src.response_cache import ResponseCache  # noqa: E402
+from synthetic import synthetic_locations, write_hourly_csv  # noqa: E402
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+START = pd.Timestamp("2025-11-07", tz="UTC")
+INSIGHTS_SPEC = {"us_aqi": ["mean", "min", "max", "std"], "pm2_5": "mean", "temperature_2m": "mean"}
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register ``func(workload, repeat)`` under ``name``; it returns a dict of metrics."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def best(func, repeat):
+    """Fastest of ``repeat`` calls, in seconds, and the last result."""
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds, result
+
+
+class Workload:
+    """Synthetic inputs for one scale, written under ``root``."""
+
+    def __init__(self, root, cities, hours):
+        self.root = Path(root)
+        self.cities = cities
+        self.hours = hours
+        self.locations = synthetic_locations(cities)
+        self.aq_csv = write_hourly_csv(self.root / "air_quality_df.csv", "air_quality", cities, hours)
+        self.weather_csv = write_hourly_csv(self.root / "weather_df.csv", "weather", cities, hours)
+        self.daily_csv = self.root / "dashboard_df.csv"
+        self._daily = None
+
+    def daily(self):
+        """The ETL output in the dashboard schema; runs the ETL first if needed."""
+        if self._daily is None:
+            if not self.daily_csv.exists():
+                run_etl(self)
+            self._daily = to_daily_schema(pd.read_csv(self.daily_csv))
+        return self._daily
+
+
+def run_etl(workload):
+    return build_dashboard_df(
+        csv_chunks(workload.aq_csv, AQ_NUMERIC_COLS),
+        csv_chunks(workload.weather_csv, WEATHER_NUMERIC_COLS),
+        output_path=workload.daily_csv,
+    )
+
+
+class _EncodedFetcher(HourlyFetcher):
+    """Fetcher answering from pre-encoded FlatBuffers bodies, so only decoding is timed."""
+
+    def __init__(self, bodies, batch_size):
+        super().__init__(batch_size, max_workers=1)
+        self.bodies = bodies
+
+    def _request(self, url, params):
+        return decode_flatbuffers(self.bodies[tuple(params["latitude"])])
+
+
+@benchmark("ingestion.decode")
+def bench_decode(workload, repeat, batch_size=50):
+    variables = ENDPOINTS["air_quality"]["variables"]
+    first = int(START.timestamp())
+    end = first + workload.hours * HOUR
+    times = np.arange(first, end, HOUR, dtype=np.int64)
+
+    bodies = {}
+    for offset in range(0, workload.cities, batch_size):
+        batch = workload.locations[offset:offset + batch_size]
+        bodies[tuple(loc["lat"] for loc in batch)] = b"".join(
+            encode_response(loc["lat"], loc["lon"], first, end,
+                            [synthetic_values(loc["lat"], loc["lon"], i, times) for i in range(len(variables))])
+            for loc in batch
+        )
+    fetcher = _EncodedFetcher(bodies, batch_size)
+    last = START + pd.Timedelta(hours=workload.hours - 1)
+    seconds, frame = best(lambda: fetcher.fetch("air_quality", workload.locations, START, last), repeat)
+    return {"seconds": seconds, "rows_per_s": len(frame) / seconds,
+            "payload_mb": sum(map(len, bodies.values())) / 2**20}
+
+
+@benchmark("ingestion.response_cache")
+def bench_response_cache(workload, repeat, batch_size=50):
+    client = StubOpenMeteoClient()
+    last = START + pd.Timedelta(hours=workload.hours - 1)
+    day = pd.Timedelta(days=1)
+    metrics = {}
+    with tempfile.TemporaryDirectory() as root:
+        fetcher = ClientFetcher(client, batch_size, cache=ResponseCache(root))
+        for label, (first, end) in {"cold": (START, last), "warm": (START, last),
+                                    "shifted": (START + day, last + day)}.items():
+            before = len(client.calls)
+            start = time.perf_counter()
+            frame = fetcher.fetch("air_quality", workload.locations, first, end)
+            metrics[f"{label}_seconds"] = time.perf_counter() - start
+            metrics[f"{label}_requests"] = len(client.calls) - before
+    metrics["warm_rows_per_s"] = len(frame) / metrics["warm_seconds"]
+    return metrics
+
+
+@benchmark("etl.hourly_to_daily")
+def bench_etl(workload, repeat):
+    seconds, daily = best(lambda: run_etl(workload), repeat)
+    hourly_rows = 2 * workload.cities * workload.hours
+    return {"seconds": seconds, "hourly_rows_per_s": hourly_rows / seconds, "daily_rows": len(daily)}
+
+
+@benchmark("aqi.hourly")
+def bench_aqi(workload, repeat):
+    hourly = pd.read_csv(workload.aq_csv, dtype={"date": str})
+    hours = utc_hours(hourly["date"])
+    seconds, _ = best(lambda: compute_aqi(hourly, hours), repeat)
+    return {"seconds": seconds, "rows_per_s": len(hourly) / seconds}
+
+
+@benchmark("cache.daily")
+def bench_disk_cache(workload, repeat):
+    workload.daily()
+    parse_seconds, df = best(lambda: to_daily_schema(pd.read_csv(workload.daily_csv)), repeat)
+    cache = DiskCache(workload.root / "cache")
+    write_seconds, path = best(lambda: cache.put("daily", "bench", df), repeat)
+    read_seconds, _ = best(lambda: cache.get("daily", "bench"), repeat)
+    return {"parse_seconds": parse_seconds, "write_seconds": write_seconds, "read_seconds": read_seconds,
+            "speedup": parse_seconds / read_seconds, "bytes": path.stat().st_size, "rows": len(df)}
+
+
+@benchmark("insights.city_aggregations")
+def bench_aggregations(workload, repeat):
+    df = workload.daily()
+    columns = ["city", "date_day", *INSIGHTS_SPEC]
+    cube_seconds, cube = best(lambda: build_cube(df[columns], list(INSIGHTS_SPEC)), repeat)
+    rows = cube[cube["grain"] == "all"].set_index("city")
+    query_seconds, _ = best(lambda: summarize(rows, INSIGHTS_SPEC), repeat)
+    groupby_seconds, _ = best(lambda: df.groupby("city", observed=True).agg(INSIGHTS_SPEC), repeat)
+    return {"cube_seconds": cube_seconds, "query_seconds": query_seconds,
+            "pandas_groupby_seconds": groupby_seconds, "rows": len(df)}
+
+
+@benchmark("monitoring.rolling")
+def bench_rolling(workload, repeat):
+    df = workload.daily()
+    full_seconds, _ = best(lambda: rolling_stats(df), repeat)
+
+    # The EWMA skips missing values as pandas does with ignore_na=True
+    gappy = df.assign(us_aqi=df["us_aqi"].mask(np.arange(len(df)) % 5 >= 3))
+    expected = gappy.groupby("city", observed=True)["us_aqi"].transform(
+        lambda values: values.ewm(span=EWMA_SPAN, adjust=False, ignore_na=True).mean())
+    assert np.allclose(rolling_stats(gappy)["us_aqi_ewma"], expected, equal_nan=True)
+
+    last_day = df["date_day"].max()
+    history, new_day = df[df["date_day"] < last_day], df[df["date_day"] == last_day]
+
+    def ingest_cycle():
+        engine = RollingEngine()
+        engine.update(history)
+        start = time.perf_counter()
+        engine.update(new_day)
+        return time.perf_counter() - start
+
+    update_seconds = min(ingest_cycle() for _ in range(repeat))
+    return {"full_seconds": full_seconds, "update_seconds": update_seconds,
+            "rows_per_s": len(df) / full_seconds, "cities": workload.cities}
+
+
+@benchmark("predictions.regimes")
+def bench_regimes(workload, repeat):
+    df = workload.daily()
+    rules_seconds, _ = best(lambda: classify_regimes(df), repeat)
+    model, _ = load_regime_model()
+    kmeans_seconds, _ = best(lambda: predict_regimes(df, model), repeat)
+    return {"rules_seconds": rules_seconds, "kmeans_seconds": kmeans_seconds,
+            "rows_per_s": len(df) / (rules_seconds + kmeans_seconds), "rows": len(df)}
+
+
+@benchmark("predictions.forecast")
+def bench_forecast(workload, repeat):
+    df = workload.daily()
+    bundle, _ = load_forecast_model()
+    if bundle is None:
+        bundle, _ = train(df)
+    batch_seconds, _ = best(lambda: forecast(df, bundle), repeat)
+    latest = latest_rows(df)
+    latest_seconds, _ = best(lambda: forecast(df, bundle, latest), repeat)
+    single_seconds, _ = best(lambda: forecast(df, bundle, latest[:1]), repeat)
+    return {"batch_seconds": batch_seconds, "latest_seconds": latest_seconds, "single_seconds": single_seconds,
+            "rows_per_s": len(df) / batch_seconds, "rows": len(df), "cities": len(latest)}
+
+
+def _page_benchmark(page):
+    def bench_page(workload, repeat):
+        workload.daily()
+        result = profile_page(page, repeat, env={"AIR_QUALITY_DATASETS_DIR": str(workload.root)})
+        if result["exception"]:
+            return {"exception": result["exception"][0]}
+        return {key: result[key] for key in ("import_s", "first_render_s", "rerun_s")}
+    return bench_page
+
+
+for _page in PAGES:
+    benchmark(f"pages.{Path(_page).stem}")(_page_benchmark(_page))
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, dirty
+
+
+def is_timing(metric):
+    return metric.endswith(("seconds", "_s")) and "_per_" not in metric
+
+
+def compare(results, baseline, threshold):
+    """Print each timing next to the baseline's and return the names of regressions."""
+    regressions = []
+    print(f"\ncompared with {baseline['commit']} (regression above x{threshold:.2f}):")
+    for name, metrics in results["benchmarks"].items():
+        before = baseline["benchmarks"].get(name, {})
+        for metric, value in metrics.items():
+            if not is_timing(metric) or metric not in before:
+                continue
+            ratio = value / before[metric] if before[metric] else float("inf")
+            flag = "  REGRESSION" if ratio > threshold else ""
+            if flag:
+                regressions.append(f"{name}.{metric}")
+            print(f"  {name:<30}{metric:<24}{before[metric]:>10.4f}{value:>10.4f}  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--hours", type=int, default=24 * 30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", default=[],
+                        help="run the benchmarks whose name starts with any of these")
+    parser.add_argument("--output", type=Path, help="default: benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", type=Path, help="results JSON of an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if not args.only or name.startswith(tuple(args.only))]
+    commit, dirty = git_commit()
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "created": pd.Timestamp.now(tz="UTC").isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": {"cities": args.cities, "hours": args.hours, "repeat": args.repeat},
+        "benchmarks": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workload = Workload(tmp, args.cities, args.hours)
+        for name in names:
+            metrics = BENCHMARKS[name](workload, args.repeat)
+            results["benchmarks"][name] = metrics
+            print(f"{name:<30}" + "  ".join(
+                f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in metrics.items()
+            ))
+
+    output = args.output or RESULTS_DIR / f"{commit}{'-dirty' if dirty else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results saved to: {output}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            sys.exit(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
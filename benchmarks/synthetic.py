@@ -0,0 +1,88 @@
+"""Synthetic stand-ins for the project's datasets at arbitrary scale.
+
+Hourly frames follow the schema of ``air_quality_df.csv`` / ``weather_df.csv``
+as written by the ingestion notebook, for N locations x M hours; daily frames
+follow ``dashboard_df.csv``.
+"""
+import numpy as np
+import pandas as pd
+
+
+AQ_VARIABLES = {
+    # column: (typical level, spread)
+    "pm10": (12.0, 6.0),
+    "pm2_5": (9.0, 5.0),
+    "carbon_monoxide": (220.0, 60.0),
+    "sulphur_dioxide": (3.0, 1.5),
+    "ozone": (55.0, 15.0),
+    "us_aqi": (40.0, 15.0),
+    "carbon_dioxide": (450.0, 10.0),
+    "nitrogen_dioxide": (14.0, 6.0),
+}
+
+WEATHER_VARIABLES = {
+    "temperature_2m": (10.0, 8.0),
+    "relative_humidity_2m": (65.0, 15.0),
+    "precipitation": (0.1, 0.3),
+    "wind_speed_10m": (12.0, 6.0),
+    "surface_pressure": (1000.0, 15.0),
+}
+
+VARIABLES = {"air_quality": AQ_VARIABLES, "weather": WEATHER_VARIABLES}
+
+
+def synthetic_locations(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(25, 49, n).round(4)
+    lons = rng.uniform(-124, -67, n).round(4)
+    return [
+        {"city": f"Station {i:05d}", "country": "US", "lat": lat, "lon": lon}
+        for i, (lat, lon) in enumerate(zip(lats, lons))
+    ]
+
+
+def hourly_frame(kind, locations, start="2025-11-07", hours=24 * 60, seed=0):
+    """Hourly rows for ``locations``, city-major and time-ascending like the notebook output."""
+    rng = np.random.default_rng(seed)
+    n = len(locations) * hours
+    times = pd.date_range(start, periods=hours, freq="h", tz="UTC")
+    hour_of_day = np.tile(times.hour.to_numpy(), len(locations))
+
+    data = {"date": times[np.tile(np.arange(hours), len(locations))]}
+    daily = np.sin(2 * np.pi * hour_of_day / 24)
+    for column, (level, spread) in VARIABLES[kind].items():
+        values = level + spread * (0.5 * daily + rng.standard_normal(n))
+        if column != "temperature_2m":
+            values = np.clip(values, 0, None)
+        data[column] = values.astype(np.float32)
+    for column in ["city", "country", "lat", "lon"]:
+        data[column] = np.repeat([loc[column] for loc in locations], hours)
+    return pd.DataFrame(data)
+
+
+def daily_frame(locations, start="2025-11-07", days=365, seed=0):
+    """Daily rows in the ``dashboard_df`` schema, city-major and date-ascending."""
+    rng = np.random.default_rng(seed)
+    n = len(locations) * days
+    dates = pd.date_range(start, periods=days, freq="D")
+
+    data = {"city": np.repeat([loc["city"] for loc in locations], days),
+            "date_day": dates[np.tile(np.arange(days), len(locations))]}
+    for column, (level, spread) in {**AQ_VARIABLES, **WEATHER_VARIABLES}.items():
+        values = level + spread * rng.standard_normal(n)
+        if column != "temperature_2m":
+            values = np.clip(values, 0, None)
+        data[column] = values.astype(np.float32)
+    for column in ["country", "lat", "lon"]:
+        data[column] = np.repeat([loc[column] for loc in locations], days)
+    return pd.DataFrame(data)
+
+
+def write_hourly_csv(path, kind, n_locations, hours, start="2025-11-07", block=50, seed=0):
+    """Write an hourly CSV ``block`` locations at a time, so the generator's memory stays flat."""
+    locations = synthetic_locations(n_locations, seed)
+    for i in range(0, n_locations, block):
+        frame = hourly_frame(kind, locations[i:i + block], start, hours, seed + i)
+        frame.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False,
+                     date_format="%Y-%m-%d %H:%M:%S+00:00")
+    return path
@@ -1,5 +1,9 @@
 import streamlit as st
 
+from src.aggregates import overall_summary
+from src.instrumentation import instrument_page
+from src.query import daily_index
+
 # Page configuration
 st.set_page_config(
     page_title="Air Quality & Weather Dashboard",
@@ -7,6 +11,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+run = instrument_page("home")
 
 # Custom CSS for better styling
 st.markdown("""
@@ -80,23 +85,20 @@ st.info("""
 """)
 
 # Quick stats preview
-@st.cache_data
-def load_preview():
-    import pandas as pd
-    df = pd.read_csv("../datasets/dashboard_df.csv")
-    return df
-
-df = load_preview()
+index = daily_index()
+first_day, last_day = index.date_range()
 
 col1, col2, col3, col4 = st.columns(4)
 with col1:
-    st.metric("Cities", df["city"].nunique())
+    st.metric("Cities", len(index.cities))
 with col2:
-    st.metric("Records", f"{len(df):,}")
+    st.metric("Records", f"{len(index):,}")
 with col3:
-    st.metric("Avg AQI", f"{df['us_aqi'].mean():.1f}")
+    st.metric("Avg AQI", f"{overall_summary({'us_aqi': 'mean'}).iloc[0]['us_aqi_mean']:.1f}")
 with col4:
-    st.metric("Time Period", f"{df['date_day'].min()[:10]} to {df['date_day'].max()[:10]}")
+    st.metric("Time Period", f"{first_day:%Y-%m-%d} to {last_day:%Y-%m-%d}")
 
 st.markdown("---")
-st.caption("Navigate using the buttons above or select a page from the sidebar")
\ No newline at end of file
+st.caption("Navigate using the buttons above or select a page from the sidebar")
+
+run.finish()
@@ -1,22 +1,37 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from src.aggregates import city_summary, describe_table, overall_summary
+from src.aqi_bands import band_colors
+from src.chart_cache import cached_pyplot
+from src.density import daily_density, use_density
+from src.instrumentation import instrument_page
+from src.query import daily_index
 
 st.set_page_config(page_title="Overview", layout="wide")
+run = instrument_page("overview")
 
 st.title(" Overview")
 st.markdown("Dataset preview, basic statistics, and fundamental visualizations")
 
-@st.cache_data
-def load_data():
-    return pd.read_csv("../datasets/dashboard_df.csv")
-
-df = load_data()
+index = daily_index()
+n_rows = len(index)
+first_day, last_day = index.date_range()
 
 # Dataset Preview
+PREVIEW_ROWS = 10_000
+
 st.header("Dataset Preview")
-with st.expander("View Full Dataset", expanded=False):
-    st.dataframe(df, use_container_width=True)
+# A toggle rather than an expander: a collapsed expander still runs its contents
+if st.toggle("View Full Dataset"):
+    if n_rows <= PREVIEW_ROWS:
+        st.dataframe(index.read(), use_container_width=True)
+    else:
+        # Large histories only load the first cities' rows
+        preview = index.read(cities=index.cities[:max(1, len(index.cities) * PREVIEW_ROWS // n_rows)])
+        st.dataframe(preview.head(PREVIEW_ROWS), use_container_width=True)
+        st.caption(f"Showing the first {min(len(preview), PREVIEW_ROWS):,} of {n_rows:,} rows")
     
 # Basic Statistics
 st.header("Basic Statistics")
@@ -24,77 +39,103 @@ col1, col2 = st.columns([1, 2])
 
 with col1:
     st.subheader("Quick Stats")
+    means = overall_summary({"us_aqi": "mean", "temperature_2m": "mean", "pm2_5": "mean"}).iloc[0]
     stats_data = {
         "Metric": ["Total Records", "Cities", "Date Range", "Avg AQI", "Avg Temp", "Avg PM2.5"],
         "Value": [
-            len(df),
-            df["city"].nunique(),
-            f"{df['date_day'].min()[:10]} to {df['date_day'].max()[:10]}",
-            f"{df['us_aqi'].mean():.1f}",
-            f"{df['temperature_2m'].mean():.1f}°C",
-            f"{df['pm2_5'].mean():.1f} µg/m³"
+            n_rows,
+            len(index.cities),
+            f"{first_day:%Y-%m-%d} to {last_day:%Y-%m-%d}",
+            f"{means['us_aqi_mean']:.1f}",
+            f"{means['temperature_2m_mean']:.1f}°C",
+            f"{means['pm2_5_mean']:.1f} µg/m³"
         ]
     }
     st.table(pd.DataFrame(stats_data))
 
 with col2:
     st.subheader("Numerical Summary")
-    st.dataframe(df.describe(), use_container_width=True)
+    st.dataframe(describe_table(), use_container_width=True)
 
 # Basic Visualizations
 st.header("Basic Visualizations")
 
-# AQI Distribution
-st.subheader("Average Air Quality Index (AQI) by City")
-city_aqi_mean = df.groupby("city")["us_aqi"].mean().sort_values(ascending=False)
+# Figures are rendered to PNG once per dataset version and served from the chart cache;
+# pyplot is imported by the builders, so cache hits never load it
+def aqi_by_city_figure():
+    import matplotlib.pyplot as plt
 
-# Create plot with matplotlib
-fig, ax = plt.subplots(figsize=(12, 6))
-colors = ['red' if val > 100 else 'orange' if val > 50 else 'green' 
-          for val in city_aqi_mean.values]
-bars = ax.bar(city_aqi_mean.index, city_aqi_mean.values, color=colors, edgecolor='black')
+    city_aqi_mean = city_summary({"us_aqi": "mean"})["us_aqi_mean"].sort_values(ascending=False)
 
-ax.axhline(y=50, color='blue', linestyle='--', linewidth=2, 
-           label='Good Air Quality (AQI ≤ 50)')
-ax.axhline(y=100, color='orange', linestyle='--', linewidth=2, 
-           label='Moderate (AQI ≤ 100)', alpha=0.5)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    bars = ax.bar(city_aqi_mean.index, city_aqi_mean.values, color=band_colors(city_aqi_mean), edgecolor='black')
 
-for bar in bars:
-    height = bar.get_height()
-    ax.text(bar.get_x() + bar.get_width()/2., height + 1,
-            f'{height:.1f}', ha='center', va='bottom', fontsize=9)
+    ax.axhline(y=50, color='blue', linestyle='--', linewidth=2, 
+               label='Good Air Quality (AQI ≤ 50)')
+    ax.axhline(y=100, color='orange', linestyle='--', linewidth=2, 
+               label='Moderate (AQI ≤ 100)', alpha=0.5)
 
-ax.set_ylabel('Mean US AQI')
-ax.set_xlabel('City')
-ax.set_xticklabels(city_aqi_mean.index, rotation=45, ha='right')
-ax.legend()
-ax.grid(True, alpha=0.3, axis='y')
-plt.tight_layout()
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 1,
+                f'{height:.1f}', ha='center', va='bottom', fontsize=9)
 
-st.pyplot(fig)
+    ax.set_ylabel('Mean US AQI')
+    ax.set_xlabel('City')
+    ax.set_xticklabels(city_aqi_mean.index, rotation=45, ha='right')
+    ax.legend()
+    ax.grid(True, alpha=0.3, axis='y')
+    plt.tight_layout()
+    return fig
 
-# Additional simple visualizations
-col1, col2 = st.columns(2)
 
-with col1:
-    st.subheader("AQI Distribution")
+def aqi_histogram_figure():
+    import matplotlib.pyplot as plt
+
     fig2, ax2 = plt.subplots(figsize=(8, 4))
-    ax2.hist(df['us_aqi'], bins=30, color='skyblue', edgecolor='black', alpha=0.7)
+    ax2.hist(index.read(['us_aqi'])['us_aqi'], bins=30, color='skyblue', edgecolor='black', alpha=0.7)
     ax2.set_xlabel('US AQI')
     ax2.set_ylabel('Frequency')
     ax2.axvline(x=50, color='red', linestyle='--', label='Good Threshold')
     ax2.axvline(x=100, color='orange', linestyle='--', label='Moderate Threshold')
     ax2.legend()
     ax2.grid(True, alpha=0.3)
-    st.pyplot(fig2)
+    return fig2
+
+
+def temperature_aqi_figure():
+    import matplotlib.pyplot as plt
 
-with col2:
-    st.subheader("Temperature vs AQI")
     fig3, ax3 = plt.subplots(figsize=(8, 4))
-    scatter = ax3.scatter(df['temperature_2m'], df['us_aqi'], 
-                         c=df['us_aqi'], cmap='RdYlGn_r', alpha=0.6, s=20)
+    if use_density(n_rows):
+        # One cell per bin instead of one marker per row
+        counts, x_edges, y_edges = daily_density('temperature_2m', 'us_aqi')
+        mesh = ax3.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts, 0), cmap='viridis')
+        plt.colorbar(mesh, ax=ax3, label='Days')
+    else:
+        df = index.read(['temperature_2m', 'us_aqi'])
+        scatter = ax3.scatter(df['temperature_2m'], df['us_aqi'], 
+                             c=df['us_aqi'], cmap='RdYlGn_r', alpha=0.6, s=20)
+        plt.colorbar(scatter, ax=ax3, label='AQI')
     ax3.set_xlabel('Temperature (°C)')
     ax3.set_ylabel('US AQI')
     ax3.grid(True, alpha=0.3)
-    plt.colorbar(scatter, ax=ax3, label='AQI')
-    st.pyplot(fig3)
+    return fig3
+
+
+# AQI Distribution
+st.subheader("Average Air Quality Index (AQI) by City")
+st.image(cached_pyplot("overview.aqi_by_city", aqi_by_city_figure), use_container_width=True)
+
+# Additional simple visualizations
+col1, col2 = st.columns(2)
+
+with col1:
+    st.subheader("AQI Distribution")
+    st.image(cached_pyplot("overview.aqi_histogram", aqi_histogram_figure), use_container_width=True)
+
+with col2:
+    st.subheader("Temperature vs AQI")
+    st.image(cached_pyplot("overview.temperature_aqi", temperature_aqi_figure), use_container_width=True)
+
+run.finish()
@@ -1,25 +1,24 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+from src.aggregates import city_summary
+from src.aqi_bands import band_column_config, band_tags
+from src.chart_cache import cached_plotly
+from src.charts import city_comparison_bar
+from src.instrumentation import instrument_page
+from src.query import daily_index
 
 st.set_page_config(page_title="Insights", layout="wide")
+run = instrument_page("insights")
 
 st.title(" Insights")
 st.markdown("City comparisons, detailed analysis, and AQI health guidelines")
 
-@st.cache_data
-def load_data():
-    return pd.read_csv("../datasets/dashboard_df.csv")
-
-df = load_data()
-
 # Sidebar for city selection
 with st.sidebar:
     st.header(" Filter Settings")
     
     # City selector
-    all_cities = sorted(df['city'].unique())
+    all_cities = daily_index().cities
     selected_cities = st.multiselect(
         "Select Cities for Comparison",
         all_cities,
@@ -37,74 +36,27 @@ with st.sidebar:
     st.info("Use the filters to customize the comparison view below.")
 
 # Calculate city statistics
-if selected_cities:
-    filtered_df = df[df['city'].isin(selected_cities)]
-else:
-    filtered_df = df
+if not selected_cities:
     selected_cities = all_cities
 
-city_stats = filtered_df.groupby("city").agg({
+city_stats = city_summary({
     "us_aqi": ["mean", "min", "max", "std"],
     "pm2_5": "mean",
     "temperature_2m": "mean"
-}).round(2)
+}, selected_cities).round(2)
 
-city_stats.columns = ['_'.join(col).strip() for col in city_stats.columns.values]
 city_stats = city_stats.reset_index()
 city_stats = city_stats.sort_values("us_aqi_mean", ascending=False)
 
 # City Comparison Dashboard
 st.header("🏙️ City Comparison Dashboard")
 
-# Create comparison chart
-fig = go.Figure()
-
-for idx, row in city_stats.iterrows():
-    aqi = row['us_aqi_mean']
-    
-    # Color coding
-    if aqi <= 50:
-        color = '#2ECC71'  # Green
-        category = "Good"
-    elif aqi <= 100:
-        color = '#F39C12'  # Orange
-        category = "Moderate"
-    elif aqi <= 150:
-        color = '#E74C3C'  # Red
-        category = "Unhealthy"
-    else:
-        color = '#8B0000'  # Dark Red
-        category = "Very Unhealthy"
-    
-    fig.add_trace(go.Bar(
-        x=[row['city']],
-        y=[aqi],
-        marker_color=color,
-        hovertemplate=(
-            "<b>%{x}</b><br><br>" +
-            "Mean AQI: %{y:.1f}<br>" +
-            f"Category: {category}<br>" +
-            f"PM2.5: {row['pm2_5_mean']:.1f} µg/m³<br>" +
-            f"Temp: {row['temperature_2m_mean']:.1f}°C<br>" +
-            "<extra></extra>"
-        ),
-        text=f"{aqi:.1f}",
-        textposition='outside'
-    ))
-
-# Add threshold lines
-fig.add_hline(y=50, line_dash="dash", line_color="blue",
-              annotation_text="Good Air Quality", annotation_position="top left")
-fig.add_hline(y=100, line_dash="dot", line_color="orange",
-              annotation_text="Moderate", annotation_position="top left")
-
-fig.update_layout(
-    title=f"Average {metric.replace('_', ' ').title()} by City",
-    xaxis_title="City",
-    yaxis_title=f"Average {metric.replace('_', ' ').title()}",
-    showlegend=False,
-    height=500,
-    xaxis_tickangle=-45
+# Create comparison chart, built once per dataset version and selection
+fig = cached_plotly(
+    "insights.city_comparison",
+    lambda cities, metric: city_comparison_bar(city_stats, metric),
+    cities=selected_cities,
+    metric=metric
 )
 
 st.plotly_chart(fig, use_container_width=True)
@@ -114,30 +66,23 @@ st.header(" Detailed City Statistics")
 
 # Create formatted table
 display_df = city_stats.copy()
+display_df.insert(display_df.columns.get_loc('us_aqi_mean') + 1, 'aqi_band', band_tags(display_df['us_aqi_mean']))
 display_df.columns = [col.replace('_', ' ').title() for col in display_df.columns]
 
-# Add color coding
-def color_aqi(val):
-    if val <= 50:
-        color = '#d4edda'
-    elif val <= 100:
-        color = '#fff3cd'
-    elif val <= 150:
-        color = '#f8d7da'
-    else:
-        color = '#721c24'
-    return f'background-color: {color}; color: {"white" if val > 150 else "black"}'
-
-styled_df = display_df.style.applymap(color_aqi, subset=['Us Aqi Mean']).format({
-    'Us Aqi Mean': '{:.1f}',
-    'Us Aqi Min': '{:.1f}',
-    'Us Aqi Max': '{:.1f}',
-    'Us Aqi Std': '{:.2f}',
-    'Pm2_5 Mean': '{:.1f}',
-    'Temperature 2M Mean': '{:.1f}'
-})
-
-st.dataframe(styled_df, use_container_width=True)
+# Colours and number formats are set per column and applied by the browser,
+# instead of a pandas Styler rendering every cell in Python
+number_formats = {
+    'Us Aqi Mean': '%.1f',
+    'Us Aqi Min': '%.1f',
+    'Us Aqi Max': '%.1f',
+    'Us Aqi Std': '%.2f',
+    'Pm2_5 Mean': '%.1f',
+    'Temperature 2M Mean': '%.1f'
+}
+column_config = {col: st.column_config.NumberColumn(format=fmt) for col, fmt in number_formats.items()}
+column_config['Aqi Band'] = band_column_config()
+
+st.dataframe(display_df, column_config=column_config, use_container_width=True)
 
 # Download button
 csv = city_stats.to_csv(index=False)
@@ -191,3 +136,5 @@ st.info("""
 and above 300 is "Hazardous". Sensitive groups include children, elderly, and 
 people with respiratory or heart conditions.
 """)
+
+run.finish()
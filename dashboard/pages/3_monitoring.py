@@ -1,36 +1,40 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import numpy as np
+
+from src.correlation import correlation_engine
+from src.data_management import MEASUREMENT_COLS
+from src.density import bin_centers, daily_box_stats, daily_density, trend_lines, use_density
+from src.downsampling import DEFAULT_POINT_BUDGET, RANGE_TIERS, daily_trend_tiers, downsample
+from src.instrumentation import instrument_page
+from src.query import daily_index
+from src.rolling import BASELINE_WINDOW, EWMA_SPAN, MEAN_WINDOW, MIN_RUN, THRESHOLDS, Z_ALERT, city_rolling, rolling_engine
 
 st.set_page_config(page_title="Monitoring", layout="wide")
+run = instrument_page("monitoring")
 
 st.title("Monitoring")
 st.markdown("Real-time trends, correlations, and city-level monitoring")
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv("../datasets/dashboard_df.csv")
-    df['date_day'] = pd.to_datetime(df['date_day'])
-    return df
-
-df = load_data()
+index = daily_index()
+n_rows = len(index)
+all_cities = index.cities
 
-# Create tabs for different monitoring views
-tab1, tab2, tab3, tab4 = st.tabs([" City Explorer", "📈 Trends", "🏙️ City Comparison", " Correlations"])
+# One view at a time: unlike st.tabs, only the selected view's queries and charts run
+VIEWS = [" City Explorer", "📈 Trends", "🏙️ City Comparison", " Correlations", "🚨 Alerts"]
+view = st.radio("View", VIEWS, horizontal=True, label_visibility="collapsed", key="monitoring_view")
+run.view(view)
 
-with tab1:
+if view == VIEWS[0]:
     # City Details Explorer
     st.header(" City Details Explorer")
     
     col1, col2 = st.columns([1, 3])
     
     with col1:
-        selected_city = st.selectbox("Select a City", sorted(df['city'].unique()))
+        selected_city = st.selectbox("Select a City", all_cities)
         
         if selected_city:
-            city_df = df[df['city'] == selected_city]
+            city_df = index.get(selected_city)
             
             # City metrics
             st.metric("Total Days", len(city_df))
@@ -40,11 +44,14 @@ with tab1:
     
     with col2:
         if selected_city:
-            city_df = df[df['city'] == selected_city]
+            # Plotly is imported by the views that draw, so the Alerts view never loads it
+            import plotly.express as px
+            import plotly.graph_objects as go
             
-            # Time series for selected city
+            # Time series for selected city, downsampled to the point budget
+            city_trend = daily_trend_tiers([selected_city])["all"]
             fig = px.line(
-                city_df,
+                city_trend,
                 x='date_day',
                 y='us_aqi',
                 title=f'AQI Trend for {selected_city}',
@@ -57,22 +64,44 @@ with tab1:
             fig.add_hline(y=100, line_dash="dash", line_color="orange", 
                          annotation_text="Moderate", annotation_position="top left")
             
+            # Rolling overlays and anomalies, from the cached per-city rolling stats
+            rolling = city_rolling(selected_city)
+            for column, name, color in [('us_aqi_mean', f'{MEAN_WINDOW}-day mean', 'black'),
+                                        ('us_aqi_ewma', f'EWMA (span {EWMA_SPAN})', 'purple')]:
+                kept = downsample(rolling['date_day'].to_numpy(), rolling[column].to_numpy())
+                fig.add_trace(go.Scatter(x=rolling['date_day'].iloc[kept], y=rolling[column].iloc[kept],
+                                         mode='lines', name=name, line=dict(color=color, width=1.5)))
+            anomalies = rolling[rolling['us_aqi_zscore'].abs() >= Z_ALERT]
+            fig.add_trace(go.Scatter(x=anomalies['date_day'], y=anomalies['us_aqi'], mode='markers',
+                                     name=f'Anomaly (|z| ≥ {Z_ALERT:g})',
+                                     marker=dict(color='red', size=10, symbol='x')))
+            
             fig.update_layout(height=400)
             st.plotly_chart(fig, use_container_width=True)
 
-with tab2:
+elif view == VIEWS[1]:
     # Trends
     st.header("📈 Trends Analysis")
     
     # Multi-city time series
     selected_cities_trend = st.multiselect(
         "Select Cities for Trend Comparison",
-        sorted(df['city'].unique()),
-        default=sorted(df['city'].unique())[:3]
+        all_cities,
+        default=all_cities[:3]
     )
     
     if selected_cities_trend:
-        trend_df = df[df['city'].isin(selected_cities_trend)]
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            # Each range is precomputed and downsampled server-side
+            trend_range = st.radio("Range", list(RANGE_TIERS), index=len(RANGE_TIERS) - 1, horizontal=True)
+        with col2:
+            point_budget = st.select_slider(
+                "Points per city", options=[250, 500, 1000, 2000], value=DEFAULT_POINT_BUDGET
+            )
+        trend_df = daily_trend_tiers(selected_cities_trend, budget=point_budget)[trend_range]
+        
+        import plotly.express as px
         
         fig = px.line(
             trend_df,
@@ -83,22 +112,11 @@ with tab2:
             markers=True
         )
         
-        # Add range selector
-        fig.update_xaxes(
-            rangeslider_visible=True,
-            rangeselector=dict(
-                buttons=list([
-                    dict(count=7, label="1w", step="day", stepmode="backward"),
-                    dict(count=1, label="1m", step="month", stepmode="backward"),
-                    dict(count=6, label="6m", step="month", stepmode="backward"),
-                    dict(step="all")
-                ])
-            )
-        )
+        fig.update_xaxes(rangeslider_visible=True)
         
         st.plotly_chart(fig, use_container_width=True)
 
-with tab3:
+elif view == VIEWS[2]:
     # City Comparison
     st.header("🏙️ Multi-City Comparison")
     
@@ -107,8 +125,8 @@ with tab3:
     with col1:
         compare_cities = st.multiselect(
             "Select Cities",
-            sorted(df['city'].unique()),
-            default=sorted(df['city'].unique())[:4]
+            all_cities,
+            default=all_cities[:4]
         )
         
         compare_metric = st.selectbox(
@@ -117,27 +135,41 @@ with tab3:
         )
     
     if compare_cities:
-        compare_df = df[df['city'].isin(compare_cities)]
+        import plotly.express as px
+        import plotly.graph_objects as go
         
-        # Box plot comparison
-        fig = px.box(
-            compare_df,
-            x='city',
-            y=compare_metric,
-            color='city',
-            title=f'{compare_metric.replace("_", " ").title()} Distribution by City',
-            points='all'
-        )
+        box_title = f'{compare_metric.replace("_", " ").title()} Distribution by City'
+        if use_density(n_rows):
+            # Boxes drawn from precomputed quartiles and whiskers, without the raw points
+            stats = daily_box_stats(compare_cities, compare_metric)
+            fig = go.Figure()
+            for city, row in stats.iterrows():
+                fig.add_trace(go.Box(
+                    name=city,
+                    q1=[row['q1']], median=[row['median']], q3=[row['q3']],
+                    lowerfence=[row['lowerfence']], upperfence=[row['upperfence']],
+                    mean=[row['mean']]
+                ))
+            fig.update_layout(title=box_title, xaxis_title='city', yaxis_title=compare_metric)
+        else:
+            # Box plot comparison
+            fig = px.box(
+                index.get_many(compare_cities),
+                x='city',
+                y=compare_metric,
+                color='city',
+                title=box_title,
+                points='all'
+            )
         
         st.plotly_chart(fig, use_container_width=True)
 
-with tab4:
+elif view == VIEWS[3]:
     # Correlations
     st.header("🌡️ Correlations Analysis")
     
     # Select variables for correlation
-    numeric_cols = [col for col in df.select_dtypes(include=['float64', 'int64']).columns 
-                   if col not in ['lat', 'lon']]
+    numeric_cols = MEASUREMENT_COLS
     
     col1, col2, col3 = st.columns(3)
     
@@ -148,19 +180,53 @@ with tab4:
     with col3:
         color_var = st.selectbox("Color by", ['city', 'us_aqi', 'pm2_5'])
     
-    # Scatter plot with regression
-    fig = px.scatter(
-        df,
-        x=x_var,
-        y=y_var,
-        color=color_var,
-        trendline="ols",
-        title=f'{x_var.replace("_", " ").title()} vs {y_var.replace("_", " ").title()}',
-        hover_data=['city', 'date_day']
-    )
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
+    scatter_title = f'{x_var.replace("_", " ").title()} vs {y_var.replace("_", " ").title()}'
+    if use_density(n_rows):
+        # Too many rows for one marker each: show where the days fall instead
+        counts, x_edges, y_edges = daily_density(x_var, y_var)
+        fig = go.Figure(go.Heatmap(
+            x=bin_centers(x_edges),
+            y=bin_centers(y_edges),
+            z=np.where(counts > 0, counts, np.nan),
+            colorscale='Viridis',
+            colorbar=dict(title='Days')
+        ))
+        fig.update_layout(title=scatter_title, xaxis_title=x_var, yaxis_title=y_var)
+        line_colors = {}
+    else:
+        # Scatter plot over just the columns it shows
+        scatter_cols = list(dict.fromkeys([x_var, y_var, color_var, 'city', 'date_day']))
+        fig = px.scatter(
+            index.read(scatter_cols),
+            x=x_var,
+            y=y_var,
+            color=color_var,
+            title=scatter_title,
+            hover_data=['city', 'date_day']
+        )
+        line_colors = {trace.name: trace.marker.color for trace in fig.data}
+    
+    # Regression lines from the correlation engine's running sums, no refit per rerun
+    for name, line in trend_lines(x_var, y_var, per_city=color_var == 'city').iterrows():
+        line_x = [line['x_min'], line['x_max']]
+        fig.add_trace(go.Scatter(
+            x=line_x,
+            y=[line['intercept'] + line['slope'] * value for value in line_x],
+            mode='lines',
+            name=f"{name} OLS",
+            line=dict(color=line_colors.get(name)),
+            hovertemplate=(
+                f"<b>{name} OLS</b><br>{y_var} = {line['slope']:.3f} * {x_var} + {line['intercept']:.3f}"
+                f"<br>R² = {line['r'] ** 2:.3f}<extra></extra>"
+            )
+        ))
     
     # Calculate correlation coefficient
-    correlation = df[x_var].corr(df[y_var])
+    correlations = correlation_engine()
+    correlation = correlations.pair(x_var, y_var)
     fig.add_annotation(
         x=0.05, y=0.95,
         xref="paper", yref="paper",
@@ -175,7 +241,7 @@ with tab4:
     
     # Correlation heatmap
     if st.checkbox("Show Correlation Heatmap"):
-        corr_matrix = df[numeric_cols].corr()
+        corr_matrix = correlations.matrix(numeric_cols)
         
         fig2 = px.imshow(
             corr_matrix,
@@ -186,6 +252,42 @@ with tab4:
         )
         st.plotly_chart(fig2, use_container_width=True)
 
+elif view == VIEWS[4]:
+    # Alerts
+    st.header("🚨 Alerts")
+    
+    # Rolling state of every station, folded forward only over newly ingested days
+    engine = rolling_engine()
+    alerts = engine.alerts()
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Stations Monitored", len(engine.latest) if engine.latest is not None else 0)
+    col2.metric("Exceedances", int((alerts['alert'] == 'Exceedance').sum()))
+    col3.metric("Anomalies", int((alerts['alert'] == 'Anomaly').sum()))
+    
+    st.caption(
+        f"Exceedance: {MIN_RUN}+ consecutive days above "
+        + ", ".join(f"{column} {threshold:g}" for column, threshold in THRESHOLDS.items())
+        + f". Anomaly: latest value {Z_ALERT:g}+ standard deviations from the preceding {BASELINE_WINDOW} days."
+    )
+    
+    if alerts.empty:
+        st.success("No active alerts at the latest day.")
+    else:
+        st.dataframe(
+            alerts,
+            column_config={
+                'value': st.column_config.NumberColumn(format='%.1f'),
+                'mean': st.column_config.NumberColumn(f'{MEAN_WINDOW}-day mean', format='%.1f'),
+                'zscore': st.column_config.NumberColumn('z-score', format='%.2f'),
+                'run': st.column_config.NumberColumn('days', format='%d'),
+                'date_day': st.column_config.DateColumn('latest'),
+                'since': st.column_config.DateColumn('since'),
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+
 # Prediction Navigation
 st.markdown("---")
 st.subheader("🔮 Prediction Models")
@@ -193,3 +295,5 @@ st.write("Explore atmospheric regime clustering and AQI risk forecasting")
 
 if st.button("Go to Predictions Page", use_container_width=True):
     st.switch_page("pages/4_🔮_Predictions.py")
+
+run.finish()
@@ -1,53 +1,43 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+
+from src.aqi_bands import AQI_BAND_COLORS, AQI_BAND_LABELS, band_column_config, band_labels
+from src.classifiers import classify_regimes
+from src.data_management import load_daily
+from src.forecasting import daily_forecasts
+from src.instrumentation import instrument_page
+from src.model_serving import daily_regime_clusters
 
 st.set_page_config(page_title="Predictions", layout="wide")
+run = instrument_page("predictions")
 
 
-st.title(" Predictions: Service NOT currently abvailable")
+st.title(" Predictions")
 st.markdown("Atmospheric regime analysis and AQI risk forecasting")
 
+df = load_daily()
+
 
-# Create tabs
-tab1, tab2 = st.tabs([" Atmospheric Regimes", " AQI Risk Analysis"])
+# One view at a time: unlike st.tabs, only the selected view is computed
+VIEWS = [" Atmospheric Regimes", " AQI Risk Analysis"]
+view = st.radio("View", VIEWS, horizontal=True, label_visibility="collapsed", key="predictions_view")
+run.view(view)
 
-with tab1:
+if view == VIEWS[0]:
     st.header("🌤️ Rule-Based Atmospheric Regime Analysis")
     
-    # Simple rule-based classification
-    regimes = []
-    for idx, row in df.iterrows():
-        # Use available features with defaults
-        wind = row.get('wind_speed_10m', row.get('wind_speed', 5))
-        pm25 = row.get('pm2_5', 25)
-        temp = row.get('temperature_2m', row.get('temperature', 20))
-        
-        if wind < 3:
-            if pm25 > 35:
-                regime = 'Polluted Stagnation'
-            else:
-                regime = 'Stagnant'
-        elif wind > 8:
-            regime = 'Well-Ventilated'
-        elif pm25 > 50:
-            regime = 'High Pollution'
-        elif temp > 28:
-            regime = 'Heat Dominated'
-        else:
-            regime = 'Mixed Conditions'
-        
-        regimes.append(regime)
+    # Plotly is imported by the views that draw, not at page load
+    import plotly.express as px
     
-    df['regime'] = regimes
+    # Simple rule-based classification
+    df = df.assign(regime=classify_regimes(df))
     
     # Visualization
     col1, col2 = st.columns(2)
     
     with col1:
-        regime_counts = pd.Series(regimes).value_counts()
+        regime_counts = df['regime'].value_counts()
+        regime_counts = regime_counts[regime_counts > 0]
         fig = px.pie(
             values=regime_counts.values,
             names=regime_counts.index,
@@ -58,7 +48,7 @@ with tab1:
     
     with col2:
         if 'us_aqi' in df.columns:
-            summary = df.groupby('regime')['us_aqi'].agg(['mean', 'min', 'max']).round(1)
+            summary = df.groupby('regime', observed=True)['us_aqi'].agg(['mean', 'min', 'max']).astype(float).round(1)
             st.dataframe(summary, use_container_width=True)
     
     # AQI by regime
@@ -67,35 +57,46 @@ with tab1:
                      title='AQI by Atmospheric Regime')
         st.plotly_chart(fig2, use_container_width=True)
 
-with tab2:
+    # Clusters from the persisted KMeans pipeline
+    st.header("🧭 KMeans Regime Clusters")
+    
+    labels, report = daily_regime_clusters()
+    cluster_names = [f"Cluster {c}" for c in range(labels.max() + 1)]
+    df = df.assign(cluster=pd.Categorical.from_codes(labels, cluster_names))
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        cluster_summary = df.groupby('cluster', observed=True)[['us_aqi', 'pm2_5', 'wind_speed_10m', 'temperature_2m']].mean().astype(float).round(1)
+        cluster_summary.insert(0, 'days', df['cluster'].value_counts())
+        st.dataframe(cluster_summary, use_container_width=True)
+    
+    with col2:
+        cluster_regimes = pd.crosstab(df['cluster'], df['regime'])
+        cluster_regimes.index = cluster_regimes.index.astype(str)
+        cluster_regimes.columns = cluster_regimes.columns.astype(str)
+        st.dataframe(cluster_regimes, use_container_width=True)
+    
+    st.caption(
+        f"Model load ({report['model_format']}): {report['load_seconds'] * 1000:.0f} ms | "
+        f"Scoring: {report['rows']:,} rows in {report['predict_seconds'] * 1000:.1f} ms "
+        f"({report['rows_per_second']:,.0f} rows/s), cached for this dataset version"
+    )
+
+elif view == VIEWS[1]:
     st.header(" AQI Risk Categories")
     
     if 'us_aqi' in df.columns:
-        # Categorize AQI
-        def categorize_aqi(aqi):
-            if aqi <= 50:
-                return "Good"
-            elif aqi <= 100:
-                return "Moderate"
-            elif aqi <= 150:
-                return "Unhealthy for Sensitive"
-            elif aqi <= 200:
-                return "Unhealthy"
-            else:
-                return "Very Unhealthy"
+        import plotly.express as px
         
-        df['aqi_category'] = df['us_aqi'].apply(categorize_aqi)
+        # Categorize AQI
+        df = df.assign(aqi_category=band_labels(df['us_aqi']))
         
         # Display distribution
         category_counts = df['aqi_category'].value_counts()
+        category_counts = category_counts[category_counts > 0]
         
-        colors = {
-            'Good': 'green',
-            'Moderate': 'yellow',
-            'Unhealthy for Sensitive': 'orange',
-            'Unhealthy': 'red',
-            'Very Unhealthy': 'purple'
-        }
+        colors = dict(zip(AQI_BAND_LABELS, AQI_BAND_COLORS))
         
         fig3 = px.bar(
             x=category_counts.index,
@@ -108,15 +109,53 @@ with tab2:
         )
         st.plotly_chart(fig3, use_container_width=True)
         
+        # Next-day forecast from the persisted classifier
+        st.subheader("🔮 Next-Day Forecast")
+        
+        forecasts, forecast_report = daily_forecasts()
+        if forecasts is None:
+            st.info("No usable forecast model found. Train one with `python -m src.forecasting` from the dashboard folder.")
+        else:
+            table = forecasts[['city', 'forecast_day', 'probability']].assign(
+                forecast=[[label] for label in forecasts['category']]
+            )
+            st.dataframe(
+                table,
+                column_config={
+                    'city': 'City',
+                    'forecast_day': st.column_config.DateColumn('Forecast Day'),
+                    'forecast': band_column_config('Forecast Band'),
+                    'probability': st.column_config.ProgressColumn('Probability', format='percent', min_value=0, max_value=1),
+                },
+                column_order=['city', 'forecast_day', 'forecast', 'probability'],
+                hide_index=True,
+                use_container_width=True,
+            )
+            
+            skill = ""
+            if 'accuracy' in forecast_report:
+                skill = (
+                    f"Holdout accuracy {forecast_report['accuracy']:.0%} "
+                    f"(persistence {forecast_report['persistence_accuracy']:.0%}, "
+                    f"balanced {forecast_report['balanced_accuracy']:.0%}) | "
+                )
+            st.caption(
+                f"Trained through {forecast_report['trained_through']} | {skill}"
+                f"Model load: {forecast_report['load_seconds'] * 1000:.0f} ms | "
+                f"Scoring: {forecast_report['cities']:,} cities in {forecast_report['predict_seconds'] * 1000:.1f} ms, "
+                f"cached for this dataset version"
+            )
+        
         # Health recommendations
         st.subheader("💡 Health Guidelines")
         
         guidelines = {
             'Good': " Normal outdoor activities are safe for everyone.",
             'Moderate': "⚠️ Sensitive individuals should consider reducing prolonged exertion.",
-            'Unhealthy for Sensitive': "⚠️ People with respiratory conditions should limit outdoor activities.",
+            'Unhealthy for Sensitive Groups': "⚠️ People with respiratory conditions should limit outdoor activities.",
             'Unhealthy': " Everyone should reduce outdoor activities.",
-            'Very Unhealthy': " Avoid all outdoor activities. Health alert conditions."
+            'Very Unhealthy': " Avoid all outdoor activities. Health alert conditions.",
+            'Hazardous': " Stay indoors. Emergency conditions for everyone."
         }
         
         for category, advice in guidelines.items():
@@ -128,4 +167,6 @@ with tab2:
 # Navigation
 st.markdown("---")
 if st.button("← Back to Monitoring", use_container_width=True):
-    st.switch_page("pages/3_monitoring.py")
\ No newline at end of file
+    st.switch_page("pages/3_monitoring.py")
+
+run.finish()
@@ -0,0 +1,168 @@
+"""Precomputed per-city aggregate cubes over the daily dataset.
+
+For every city and period of each grain (the whole history, month, week and
+day) the cube holds count, sum, sum of squares, min and max of every
+measurement. Mean and standard deviation follow from those, so page queries
+such as "mean/min/max/std of AQI for the selected cities" slice a handful of
+cube rows instead of grouping the full frame on every widget change.
+
+The cube is built once per dataset and kept in the shared disk cache
+(``src.disk_cache``), so restarted processes and other replicas load it
+instead of rebuilding it.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.data_management import (
+    DATE_COL, MEASUREMENT_COLS, dataset_digest, dataset_version, load_daily, out_of_core,
+)
+from src.disk_cache import cache_key, disk_cache
+from src.instrumentation import cached, timed
+from src.query import daily_index
+
+
+# Pandas period frequency of each grain; "all" collapses the whole history
+GRAINS = {"all": None, "month": "M", "week": "W-SUN", "day": "D"}
+BASE_STATS = ["count", "sum", "sumsq", "min", "max"]
+
+
+def _period_start(dates, grain):
+    # Weeks run Monday to Sunday and are labelled by their Monday
+    if grain == "all":
+        return pd.Series(pd.NaT, index=dates.index, dtype=dates.dtype)
+    return dates.dt.to_period(GRAINS[grain]).dt.start_time.astype(dates.dtype)
+
+
+def build_cube(df, columns=MEASUREMENT_COLS):
+    """Long cube frame with one row per (grain, city, period) and ``<col>__<stat>`` columns."""
+    values = df[columns].astype(np.float64)
+    grouped_by = [df["city"], df["date_day"].dt.floor("D")]
+    day = pd.concat({
+        "count": values.notna().groupby(grouped_by, observed=True).sum(),
+        "sum": values.groupby(grouped_by, observed=True).sum(),
+        "sumsq": (values ** 2).groupby(grouped_by, observed=True).sum(),
+        "min": values.groupby(grouped_by, observed=True).min(),
+        "max": values.groupby(grouped_by, observed=True).max(),
+    }, axis=1)
+    day.columns = [f"{col}__{stat}" for stat, col in day.columns]
+    day.index.names = ["city", "period"]
+    day = day.reset_index()
+
+    # Coarser grains are rolled up from the day level, not from raw rows
+    how = {f"{col}__{stat}": ("sum" if stat in ("count", "sum", "sumsq") else stat)
+           for col in columns for stat in BASE_STATS}
+    levels = []
+    for grain in GRAINS:
+        if grain == "day":
+            level = day
+        else:
+            period = _period_start(day["period"], grain)
+            level = (
+                day.drop(columns="period")
+                .groupby([day["city"], period.rename("period")], observed=True, dropna=False)
+                .agg(how)
+                .reset_index()
+            )
+        levels.append(level.assign(grain=grain))
+
+    cube = pd.concat(levels, ignore_index=True)
+    cube["grain"] = pd.Categorical(cube["grain"], categories=list(GRAINS))
+    return cube[["grain", "city", "period"] + list(how)]
+
+
+def summarize(rows, spec):
+    """Derive statistics from cube rows.
+
+    ``spec`` maps a column to a list of statistics among ``count``, ``mean``,
+    ``std`` (sample), ``min``, ``max`` and ``sum``, like ``DataFrame.agg``.
+    Returns a frame with ``<col>_<stat>`` columns aligned with ``rows``.
+    """
+    out = {}
+    for col, stats in spec.items():
+        n = rows[f"{col}__count"].to_numpy(dtype=np.float64)
+        total = rows[f"{col}__sum"].to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, total / n, np.nan)
+            for stat in ([stats] if isinstance(stats, str) else stats):
+                if stat == "mean":
+                    value = mean
+                elif stat == "std":
+                    var = (rows[f"{col}__sumsq"].to_numpy() - n * mean ** 2) / (n - 1)
+                    value = np.where(n > 1, np.sqrt(np.clip(var, 0, None)), np.nan)
+                elif stat == "count":
+                    value = n.astype(np.int64)
+                else:
+                    value = rows[f"{col}__{stat}"].to_numpy()
+                out[f"{col}_{stat}"] = value
+    return pd.DataFrame(out, index=rows.index)
+
+
+@cached("aggregates.load_cube", st.cache_resource(show_spinner=False, max_entries=1))
+def _load_cube(version):
+    def build():
+        # Cities never span batches, so per-batch cubes simply stack
+        columns = ["city", DATE_COL] + MEASUREMENT_COLS
+        cube = pd.concat([build_cube(batch) for batch in daily_index().batches(columns)], ignore_index=True)
+        cube["city"] = cube["city"].astype(str)
+        return cube
+
+    cube = disk_cache().get_or_compute("aggregates.cube", cache_key(dataset_digest(), MEASUREMENT_COLS), build)
+    # One frame per grain, indexed by city, so slicing a selection is a lookup
+    return {
+        grain: rows.drop(columns="grain").set_index("city").sort_index(kind="stable")
+        for grain, rows in cube.groupby("grain", observed=True)
+    }
+
+
+def load_cube(grain="all"):
+    """Cube rows of one grain for the current dataset version, indexed by city."""
+    return _load_cube(dataset_version())[grain]
+
+
+@timed("aggregates.city_summary")
+def city_summary(spec, cities=None, grain="all"):
+    """Per-city statistics for ``cities`` (default: all) over the whole history.
+
+    With a finer ``grain`` the result has one row per city and period.
+    """
+    rows = load_cube(grain)
+    if cities is not None:
+        rows = rows.loc[rows.index.isin(cities)]
+    summary = summarize(rows, spec)
+    if grain != "all":
+        summary.insert(0, "period", rows["period"])
+    return summary.rename_axis("city")
+
+
+@timed("aggregates.overall_summary")
+def overall_summary(spec, cities=None):
+    """Statistics over every row of ``cities`` (default: all), as a single-row frame."""
+    rows = load_cube("all")
+    if cities is not None:
+        rows = rows.loc[rows.index.isin(cities)]
+    how = {col: col.rsplit("__", 1)[1] for col in rows.columns if "__" in col}
+    how = {col: ("sum" if stat in ("count", "sum", "sumsq") else stat) for col, stat in how.items()}
+    return summarize(rows.agg(how).to_frame().T, spec)
+
+
+@cached("aggregates.load_describe", st.cache_resource(show_spinner=False, max_entries=1))
+def _load_describe(version):
+    def build():
+        if out_of_core():
+            # One column in memory at a time
+            index = daily_index()
+            table = pd.concat(
+                {col: index.read([col])[col].describe() for col in [DATE_COL] + MEASUREMENT_COLS}, axis=1
+            )
+        else:
+            table = load_daily().describe()
+        # The date column mixes a count with timestamps; keep it as text so it persists
+        return table.astype({col: "string" for col in table.select_dtypes("object")})
+
+    return disk_cache().get_or_compute("aggregates.describe", cache_key(dataset_digest()), build)
+
+
+def describe_table():
+    """``DataFrame.describe()`` of the daily dataset, computed once per dataset version."""
+    return _load_describe(dataset_version())
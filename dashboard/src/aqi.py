@@ -0,0 +1,219 @@
+"""US EPA Air Quality Index computed from hourly pollutant concentrations.
+
+Every pollutant is averaged over its EPA window (24 h for PM2.5 and PM10,
+8 h for ozone and carbon monoxide, 1 h for nitrogen and sulphur dioxide),
+truncated to the precision of its breakpoint table and mapped to a sub-index
+by linear interpolation inside the breakpoint interval ``np.searchsorted``
+finds for it. The AQI is the highest sub-index and the dominant pollutant
+the one it comes from.
+
+Concentrations are taken in the units ``air_quality_df.csv`` stores them in
+(µg/m³ for every pollutant) and converted to the ppm/ppb of the gas tables at
+25 °C. Rolling windows are computed per city with the cumulative sums of
+``src.rolling``, so missing hours shorten a window instead of shifting it; a
+window needs 75% of its hours to produce a value.
+
+Run from the ``dashboard`` folder to time it::
+
+    python -m src.aqi --rows 5000000
+"""
+import argparse
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from src.rolling import rolling_mean, series_keys, sort_order, window_starts
+
+
+# AQI of each category's lower and upper bound
+AQI_BOUNDS = [(0, 50), (51, 100), (101, 150), (151, 200), (201, 300), (301, 500)]
+
+# Concentration bounds of each AQI category (May 2024 PM2.5 revision)
+BREAKPOINTS = {
+    "pm2_5": [(0.0, 9.0), (9.1, 35.4), (35.5, 55.4), (55.5, 125.4), (125.5, 225.4), (225.5, 325.4)],
+    "pm10": [(0, 54), (55, 154), (155, 254), (255, 354), (355, 424), (425, 604)],
+    "ozone": [(0.0, 0.054), (0.055, 0.070), (0.071, 0.085), (0.086, 0.105), (0.106, 0.200)],
+    "carbon_monoxide": [(0.0, 4.4), (4.5, 9.4), (9.5, 12.4), (12.5, 15.4), (15.5, 30.4), (30.5, 50.4)],
+    "nitrogen_dioxide": [(0, 53), (54, 100), (101, 360), (361, 649), (650, 1249), (1250, 2049)],
+    "sulphur_dioxide": [(0, 35), (36, 75), (76, 185), (186, 304), (305, 604), (605, 1004)],
+}
+
+# Ozone's 1-hour table starts at "Unhealthy for Sensitive Groups"; the higher
+# of the 8-hour and 1-hour sub-indices is used, and above 0.200 ppm only the
+# 1-hour one is defined
+OZONE_1H_BREAKPOINTS = [(0.125, 0.164), (0.165, 0.204), (0.205, 0.404), (0.405, 0.604)]
+OZONE_1H_FIRST_CATEGORY = 2
+
+# ppb per µg/m³ is 24.45 / molecular weight at 25 °C and 1 atm
+_PPB = 24.45
+POLLUTANTS = {
+    # column: (averaging hours, µg/m³ -> table unit, decimals the table is truncated to)
+    "pm2_5": (24, 1.0, 1),
+    "pm10": (24, 1.0, 0),
+    "ozone": (8, _PPB / 48.00 / 1000, 3),
+    "carbon_monoxide": (8, _PPB / 28.01 / 1000, 1),
+    "nitrogen_dioxide": (1, _PPB / 46.01, 0),
+    "sulphur_dioxide": (1, _PPB / 64.07, 0),
+}
+
+MIN_COVERAGE = 0.75
+AQI_COLUMN = "us_aqi_computed"
+DOMINANT_COLUMN = "dominant_pollutant"
+MAX_WINDOW = max(hours for hours, _, _ in POLLUTANTS.values())
+
+
+def _table(breakpoints, first_category=0):
+    """``(k, 4)`` array of concentration low/high and AQI low/high per category."""
+    bounds = AQI_BOUNDS[first_category:first_category + len(breakpoints)]
+    return np.array([(c_lo, c_hi, i_lo, i_hi) for (c_lo, c_hi), (i_lo, i_hi) in zip(breakpoints, bounds)],
+                    dtype=np.float64)
+
+
+_TABLES = {column: _table(breakpoints) for column, breakpoints in BREAKPOINTS.items()}
+_OZONE_1H_TABLE = _table(OZONE_1H_BREAKPOINTS, OZONE_1H_FIRST_CATEGORY)
+
+
+def interpolate(concentration, table, decimals):
+    """Sub-index of concentrations already in the table's unit and averaging window.
+
+    Values above the table are capped at its top AQI; values below it and
+    negative or missing concentrations give NaN.
+    """
+    c_lo, c_hi, i_lo, i_hi = table.T
+    # Each category is a line, so a lookup is one gather of slope and intercept
+    slope = (i_hi - i_lo) / (c_hi - c_lo)
+    intercept = i_lo - slope * c_lo
+
+    scale = 10.0 ** decimals
+    c = np.asarray(concentration, dtype=np.float64) * scale
+    # The epsilon keeps float32 inputs such as 9.1 from truncating to 9.0
+    c += 1e-6
+    np.floor(c, out=c)
+    c /= scale
+    below = ~(c >= c_lo[0])
+    np.minimum(c, c_hi[-1], out=c)
+
+    category = np.searchsorted(c_lo, c, side="right")
+    category -= 1
+    np.maximum(category, 0, out=category)
+    index = slope.take(category)
+    index *= c
+    index += intercept.take(category)
+    np.rint(index, out=index)
+    index[below] = np.nan
+    return index
+
+
+def sub_index(concentration, pollutant):
+    """EPA sub-index of ``pollutant`` from concentrations in µg/m³ averaged over its window."""
+    _, to_unit, decimals = POLLUTANTS[pollutant]
+    return interpolate(np.asarray(concentration, dtype=np.float64) * to_unit, _TABLES[pollutant], decimals)
+
+
+def compute_aqi(df, hours, group="city", min_coverage=MIN_COVERAGE):
+    """Sub-indices, AQI and dominant pollutant of hourly rows, aligned with ``df``.
+
+    ``hours`` are integer hour numbers (e.g. hours since the epoch) for each
+    row; ``group`` names the column that separates the series, usually the
+    city. Pollutant columns missing from ``df`` are left out of the AQI.
+    """
+    hours = np.asarray(hours, dtype=np.int64)
+    codes = pd.factorize(df[group])[0].astype(np.int64) if group in df.columns else np.zeros(len(df), np.int64)
+    order = sort_order(codes, hours)
+    if order is not None:
+        codes, hours = codes[order], hours[order]
+    keys = series_keys(codes, hours, MAX_WINDOW)
+
+    pollutants = [column for column in POLLUTANTS if column in df.columns]
+    starts = {}
+    indices = {}
+    aqi = np.full(len(df), -np.inf)
+    dominant = np.full(len(df), -1, dtype=np.int8)
+    for j, column in enumerate(pollutants):
+        window, to_unit, decimals = POLLUTANTS[column]
+        values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        if order is not None:
+            values = values[order]
+        if window > 1 and window not in starts:
+            starts[window] = window_starts(keys, window)
+        averaged = rolling_mean(values, keys, window, int(np.ceil(window * min_coverage)), starts.get(window))
+        index = sub_index(averaged, column)
+        if column == "ozone":
+            index[averaged * to_unit > _TABLES[column][-1, 1]] = np.nan
+            index = np.fmax(index, interpolate(values * to_unit, _OZONE_1H_TABLE, decimals))
+
+        # Running maximum; ties go to the earlier pollutant and NaN never wins
+        higher = index > aqi
+        aqi[higher] = index[higher]
+        dominant[higher] = j
+        indices[f"aqi_{column}"] = index
+
+    aqi[dominant < 0] = np.nan
+    columns = {**indices, AQI_COLUMN: aqi}
+    if order is not None:
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(len(order))
+        columns = {name: values.take(inverse) for name, values in columns.items()}
+        dominant = dominant.take(inverse)
+
+    result = pd.DataFrame({name: values.astype(np.float32) for name, values in columns.items()}, index=df.index)
+    result[DOMINANT_COLUMN] = pd.Categorical.from_codes(dominant, categories=pollutants)
+    return result
+
+
+class StreamingAQI:
+    """``compute_aqi`` over consecutive chunks of an hourly stream.
+
+    The last ``MAX_WINDOW - 1`` hours of every city are carried into the next
+    chunk, so windows that straddle a chunk boundary see all their hours. The
+    carried state grows with the number of cities, not with the stream.
+    """
+
+    def __init__(self, group="city", min_coverage=MIN_COVERAGE):
+        self.group = group
+        self.min_coverage = min_coverage
+        self._tail = None
+
+    def add(self, chunk, hours):
+        columns = [self.group] + [column for column in POLLUTANTS if column in chunk.columns]
+        frame = chunk[columns].reset_index(drop=True).assign(_hour=np.asarray(hours, dtype=np.int64))
+        carried = 0
+        if self._tail is not None:
+            carried = len(self._tail)
+            frame = pd.concat([self._tail, frame], ignore_index=True)
+
+        result = compute_aqi(frame, frame["_hour"].to_numpy(), self.group, self.min_coverage)
+
+        latest = frame.groupby(self.group, observed=True, sort=False)["_hour"].transform("max")
+        self._tail = frame[frame["_hour"] > latest - MAX_WINDOW].reset_index(drop=True)
+        result = result.iloc[carried:]
+        result.index = chunk.index
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the vectorised AQI over synthetic hourly rows")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--cities", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    hours_per_city = args.rows // args.cities
+    levels = {"pm2_5": 12, "pm10": 20, "ozone": 70, "carbon_monoxide": 300,
+              "nitrogen_dioxide": 25, "sulphur_dioxide": 5}
+    df = pd.DataFrame({column: rng.gamma(2.0, level / 2.0, args.cities * hours_per_city).astype(np.float32)
+                       for column, level in levels.items()})
+    df["city"] = pd.Categorical.from_codes(np.repeat(np.arange(args.cities), hours_per_city),
+                                           [f"City {i}" for i in range(args.cities)])
+    hours = np.tile(np.arange(hours_per_city), args.cities)
+
+    start = perf_counter()
+    result = compute_aqi(df, hours)
+    seconds = perf_counter() - start
+    print(f"{len(df):,} rows in {seconds:.2f} s ({len(df) / seconds:,.0f} rows/s)")
+    print(result[DOMINANT_COLUMN].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
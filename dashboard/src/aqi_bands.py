@@ -0,0 +1,66 @@
+"""US EPA AQI bands shared by the pages: band, label and colour of every value.
+
+Values are banded with one ``np.digitize`` over the bands' inclusive upper
+bounds and labels and colours are gathered from per-band arrays, so a column
+of any length is banded without a Python call per value. Tables show the band
+as a coloured tag configured once for the whole column
+(``band_column_config``) rather than styling cells with ``pandas.Styler``,
+which renders every cell of the table in Python before it is sent.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Inclusive upper bound of every band but the last
+AQI_BAND_EDGES = [50, 100, 150, 200, 300]
+AQI_BAND_LABELS = [
+    "Good",
+    "Moderate",
+    "Unhealthy for Sensitive Groups",
+    "Unhealthy",
+    "Very Unhealthy",
+    "Hazardous",
+]
+AQI_BAND_COLORS = ["#00E400", "#FFFF00", "#FF7E00", "#FF0000", "#8F3F97", "#7E0023"]
+MISSING_COLOR = "#BDBDBD"
+
+
+def _values(aqi):
+    return np.asarray(aqi.to_numpy() if isinstance(aqi, pd.Series) else aqi, dtype=np.float64)
+
+
+def band_index(aqi, edges=AQI_BAND_EDGES):
+    """Band of every value as int8 codes; values above the last edge fall in the last band, missing ones are -1."""
+    values = _values(aqi)
+    codes = np.digitize(values, edges, right=True).astype(np.int8)
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+def band_labels(aqi, edges=AQI_BAND_EDGES, labels=AQI_BAND_LABELS):
+    """Band label of every value as a categorical, a Series when ``aqi`` is one."""
+    categories = pd.Categorical.from_codes(band_index(aqi, edges), labels)
+    if isinstance(aqi, pd.Series):
+        return pd.Series(categories, index=aqi.index, name="aqi_category")
+    return categories
+
+
+def band_colors(aqi, edges=AQI_BAND_EDGES, colors=AQI_BAND_COLORS):
+    """Colour of every value's band as an array of strings."""
+    palette = np.asarray([*colors, MISSING_COLOR])
+    # Code -1 picks the missing colour at the end of the palette
+    return palette.take(band_index(aqi, edges))
+
+
+def band_tags(aqi, edges=AQI_BAND_EDGES, labels=AQI_BAND_LABELS):
+    """One-label lists for a tag column shown with ``band_column_config``; empty where missing."""
+    tags = np.empty(len(labels) + 1, dtype=object)
+    tags[:] = [[label] for label in labels] + [[]]
+    return tags.take(band_index(aqi, edges))
+
+
+def band_column_config(label="AQI Band", labels=AQI_BAND_LABELS, colors=AQI_BAND_COLORS):
+    """``st.dataframe`` column config colouring a ``band_tags`` column by band."""
+    import streamlit as st
+
+    return st.column_config.MultiselectColumn(label, options=labels, color=colors, disabled=True)
@@ -0,0 +1,108 @@
+"""Rendered-chart cache shared by every session.
+
+Charts are keyed by (dataset version, chart id, filter params) and stored in
+their rendered form: PNG bytes for matplotlib, the figure JSON for Plotly.
+A rerun with unchanged inputs is then a dictionary lookup, and matplotlib
+figures are closed as soon as they are rendered, so they no longer pile up in
+pyplot's global figure registry across sessions.
+
+Entries are evicted least-recently-used once the cache exceeds its byte cap.
+"""
+import io
+import json
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from src.data_management import dataset_version
+from src.instrumentation import timed
+
+
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+# Same rendering options st.pyplot uses
+PNG_OPTIONS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+
+
+class ChartCache:
+    """LRU mapping of chart keys to rendered bytes or strings, capped at ``max_bytes``."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Render outside the lock so one slow chart does not block the others
+        value = render()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value
+                self.size += len(value)
+                self._evict()
+        return value
+
+    def _evict(self):
+        # Always keep the newest entry, even when it alone exceeds the cap
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            _, value = self._entries.popitem(last=False)
+            self.size -= len(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+@st.cache_resource(show_spinner=False)
+def chart_cache():
+    """The process-wide chart cache."""
+    return ChartCache()
+
+
+def chart_key(chart_id, params):
+    return (dataset_version(), chart_id, json.dumps(params, sort_keys=True, default=str))
+
+
+def render_png(fig):
+    """PNG bytes of a matplotlib figure; the figure is closed afterwards."""
+    # Imported here so pages that only draw Plotly charts never load pyplot
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, **PNG_OPTIONS)
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+def cached_pyplot(chart_id, build, **params):
+    """PNG bytes of ``build(**params)``, rendered once per dataset version and params."""
+    with timed(f"chart.{chart_id}"):
+        return chart_cache().get_or_render(
+            chart_key(chart_id, params), lambda: render_png(build(**params))
+        )
+
+
+def cached_plotly(chart_id, build, **params):
+    """Plotly figure dict of ``build(**params)``, built once per dataset version and params."""
+    with timed(f"chart.{chart_id}"):
+        figure_json = chart_cache().get_or_render(
+            chart_key(chart_id, params), lambda: build(**params).to_json()
+        )
+        return json.loads(figure_json)
@@ -0,0 +1,57 @@
+"""Figure builders shared by the dashboard pages."""
+import numpy as np
+
+from src.aqi_bands import band_colors, band_labels
+
+
+def city_comparison_bar(city_stats, metric):
+    """Mean AQI per city as a single bar trace, coloured by AQI band.
+
+    ``city_stats`` needs ``city``, ``us_aqi_mean``, ``pm2_5_mean`` and
+    ``temperature_2m_mean`` columns.
+    """
+    # Imported here so a chart cache hit never loads Plotly
+    import plotly.graph_objects as go
+
+    aqi = city_stats["us_aqi_mean"].to_numpy()
+    category = band_labels(aqi)
+
+    fig = go.Figure(go.Bar(
+        x=city_stats["city"].astype(str),
+        y=aqi,
+        marker_color=band_colors(aqi),
+        marker_line_color="black",
+        marker_line_width=0.5,
+        # Object array: column_stack would turn the numbers into strings the hover cannot format
+        customdata=np.array(list(zip(
+            category.astype(str),
+            city_stats["pm2_5_mean"].to_numpy(dtype=float),
+            city_stats["temperature_2m_mean"].to_numpy(dtype=float),
+        )), dtype=object),
+        hovertemplate=(
+            "<b>%{x}</b><br><br>" +
+            "Mean AQI: %{y:.1f}<br>" +
+            "Category: %{customdata[0]}<br>" +
+            "PM2.5: %{customdata[1]:.1f} µg/m³<br>" +
+            "Temp: %{customdata[2]:.1f}°C<br>" +
+            "<extra></extra>"
+        ),
+        text=[f"{value:.1f}" for value in aqi],
+        textposition='outside'
+    ))
+
+    # Add threshold lines
+    fig.add_hline(y=50, line_dash="dash", line_color="blue",
+                  annotation_text="Good Air Quality", annotation_position="top left")
+    fig.add_hline(y=100, line_dash="dot", line_color="orange",
+                  annotation_text="Moderate", annotation_position="top left")
+
+    fig.update_layout(
+        title=f"Average {metric.replace('_', ' ').title()} by City",
+        xaxis_title="City",
+        yaxis_title=f"Average {metric.replace('_', ' ').title()}",
+        showlegend=False,
+        height=500,
+        xaxis_tickangle=-45
+    )
+    return fig
@@ -0,0 +1,69 @@
+"""Vectorised rule-based regime classifier used by the Predictions page.
+
+The rules are evaluated over whole columns with ``np.select`` instead of
+walking rows, and take their thresholds as a plain dictionary so alternative
+rule sets can be passed in without code changes. AQI categories live in
+``src.aqi_bands``.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Atmospheric regimes, in rule priority order (first matching rule wins)
+REGIME_LABELS = [
+    "Polluted Stagnation",
+    "Stagnant",
+    "Well-Ventilated",
+    "High Pollution",
+    "Heat Dominated",
+    "Mixed Conditions",
+]
+
+REGIME_THRESHOLDS = {
+    "stagnant_wind": 3,       # wind below this is stagnant
+    "stagnation_pm25": 35,    # PM2.5 above this while stagnant is polluted stagnation
+    "ventilated_wind": 8,     # wind above this is well ventilated
+    "high_pm25": 50,          # PM2.5 above this is high pollution
+    "heat_temperature": 28,   # temperature above this is heat dominated
+}
+
+# Column fallbacks and the constant used when none of the columns exist
+REGIME_INPUTS = {
+    "wind": (["wind_speed_10m", "wind_speed"], 5),
+    "pm25": (["pm2_5"], 25),
+    "temperature": (["temperature_2m", "temperature"], 20),
+}
+
+
+def _input_column(df, names, default):
+    for name in names:
+        if name in df.columns:
+            return df[name].to_numpy()
+    return np.full(len(df), default)
+
+
+def classify_regimes(df, thresholds=None):
+    """Label every row of ``df`` with an atmospheric regime.
+
+    Returns a categorical Series aligned with ``df.index``.
+    """
+    t = {**REGIME_THRESHOLDS, **(thresholds or {})}
+    wind, pm25, temp = (
+        _input_column(df, names, default) for names, default in REGIME_INPUTS.values()
+    )
+
+    stagnant = wind < t["stagnant_wind"]
+    conditions = [
+        stagnant & (pm25 > t["stagnation_pm25"]),
+        stagnant,
+        wind > t["ventilated_wind"],
+        pm25 > t["high_pm25"],
+        temp > t["heat_temperature"],
+    ]
+    codes = np.select(conditions, range(len(conditions)), default=len(conditions))
+
+    return pd.Series(
+        pd.Categorical.from_codes(codes, REGIME_LABELS),
+        index=df.index,
+        name="regime",
+    )
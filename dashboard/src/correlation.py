@@ -0,0 +1,211 @@
+"""Pairwise correlations from running sufficient statistics.
+
+For every pair of measurement columns (i, j) and every city the engine keeps,
+over the rows where both columns are present: the row count, the sum and sum
+of squares of each column, and the cross-product sum. Any correlation, or the
+full matrix, is then answered in O(columns²) without touching the rows, with
+the same pairwise-complete semantics as ``DataFrame.corr()``.
+
+When the dataset is rewritten with new days only the rows from each city's
+most recent day onwards are folded into the moments, so the arithmetic of a
+refresh is O(new rows). Telling such a version from one that changed anything
+else still reads and hashes every row (``BatchHistory``), so a refresh as a
+whole is O(total rows); a changed version is recomputed from the full frame.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.data_management import DATE_COL, MEASUREMENT_COLS, BatchHistory, dataset_version
+from src.instrumentation import timed
+from src.query import daily_index
+
+
+class Moments:
+    """Pairwise-complete sums of a block of rows.
+
+    ``n[i, j]`` counts rows where columns i and j are both present;
+    ``sx[i, j]`` and ``sxx[i, j]`` sum column i (and its square) over those
+    rows, and ``sxy[i, j]`` sums the product of columns i and j.
+    """
+
+    def __init__(self, k):
+        self.n = np.zeros((k, k))
+        self.sx = np.zeros((k, k))
+        self.sxx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+
+    @classmethod
+    def from_values(cls, values, shift):
+        # Shifting by a fixed per-column offset leaves every covariance unchanged
+        # but keeps the sums small, so the subtraction below does not cancel out
+        present = ~np.isnan(values)
+        x = np.where(present, values - shift, 0.0)
+        m = present.astype(np.float64)
+
+        moments = cls.__new__(cls)
+        moments.n = m.T @ m
+        moments.sx = x.T @ m
+        moments.sxx = (x * x).T @ m
+        moments.sxy = x.T @ x
+        return moments
+
+    def __add__(self, other):
+        total = Moments.__new__(Moments)
+        total.n = self.n + other.n
+        total.sx = self.sx + other.sx
+        total.sxx = self.sxx + other.sxx
+        total.sxy = self.sxy + other.sxy
+        return total
+
+    def correlation(self):
+        n = self.n
+        cov = n * self.sxy - self.sx * self.sx.T
+        var = n * self.sxx - self.sx ** 2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.sqrt(var * var.T)
+        corr[n < 2] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+
+class CorrelationEngine:
+    """Per-group running moments of ``columns``, refreshed from the growing daily frame.
+
+    Each group keeps the moments of its settled days and, separately, of its
+    most recent day. On ``update`` the most recent day is recomputed from the
+    new frame, so a partially ingested day can be revised; earlier days are
+    taken as final. ``sync`` checks that they are and recomputes every group
+    when they are not.
+    """
+
+    def __init__(self, columns=MEASUREMENT_COLS, by="city", date_col=DATE_COL):
+        self.columns = list(columns)
+        self.by = by
+        self.date_col = date_col
+        self.version = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget every group."""
+        self.shift = None
+        self._settled = {}
+        self._latest = {}
+        self._last_day = {}
+        # Per group, the last day synced and the digest of the rows before it
+        self._marks = None
+        self._history = None
+
+    def sync(self, batches):
+        """Bring the engine up to a new version of the dataset; returns whether it was recomputed.
+
+        ``batches()`` yields the version's rows in group-aligned batches. They
+        are folded in with ``update`` only while the version just appends to
+        the last one synced: every group still present, with the same rows
+        before its last synced day and none of them ending before it. Revised
+        history, removed groups or a replaced dataset recompute the moments
+        from scratch. Every row is read and hashed once for the check, so this
+        is O(total rows) even when only the new rows are folded in.
+        """
+        if self._marks is not None:
+            synced = self._fold(batches(), check=True)
+            if synced is not None and self._marks.index.isin(synced[0].index).all():
+                self._marks, self._history = synced
+                return False
+        self.reset()
+        self._marks, self._history = self._fold(batches(), check=False)
+        return True
+
+    def _fold(self, batches, check):
+        """``update`` with every batch; the new marks and digests, or None once a batch is not an append."""
+        marks, history = [], []
+        for batch in batches:
+            batch_history = BatchHistory(batch[self.by], batch[self.date_col], batch[self.columns])
+            if check and not batch_history.appends(self._marks, self._history):
+                return None
+            self.update(batch)
+            marks.append(batch_history.newest)
+            history.append(batch_history.digest(batch_history.newest))
+        if not marks:
+            return pd.Series(dtype="datetime64[ns]"), pd.DataFrame(columns=["size", "sum"], dtype=np.int64)
+        return pd.concat(marks), pd.concat(history)
+
+    def update(self, df):
+        """Fold in the rows of ``df`` from each group's most recent day onwards."""
+        if self.shift is None:
+            self.shift = np.nan_to_num(df[self.columns].mean().to_numpy(np.float64))
+
+        dates = df[self.date_col]
+        keys = df[self.by].astype("category")
+        # Look up each row's last seen day through the category codes, not per row
+        per_key = pd.Series(self._last_day, dtype=dates.dtype).reindex(keys.cat.categories)
+        last_day = pd.Series(per_key.array.take(keys.cat.codes.to_numpy(), allow_fill=True), index=df.index)
+        fresh = df[last_day.isna() | (dates >= last_day)]
+
+        values = fresh[self.columns].to_numpy(np.float64)
+        fresh_days = fresh[self.date_col].array
+        for key, positions in fresh.groupby(self.by, observed=True, sort=False).indices.items():
+            days = fresh_days[positions]
+            newest = days.max()
+            settled = self._settled.get(key, Moments(len(self.columns)))
+            # Keep the previous latest day unless the new rows restate it
+            if key in self._latest and not (days == self._last_day[key]).any():
+                settled = settled + self._latest[key]
+
+            is_newest = days == newest
+            self._settled[key] = settled + Moments.from_values(values[positions[~is_newest]], self.shift)
+            self._latest[key] = Moments.from_values(values[positions[is_newest]], self.shift)
+            self._last_day[key] = newest
+        return len(fresh)
+
+    def groups(self):
+        return list(self._last_day)
+
+    def moments(self, groups=None):
+        total = Moments(len(self.columns))
+        for key in self._last_day if groups is None else groups:
+            if key in self._last_day:
+                total = total + self._settled[key] + self._latest[key]
+        return total
+
+    def matrix(self, columns=None, groups=None):
+        """Correlation matrix of ``columns`` over ``groups`` (default: everything seen)."""
+        corr = pd.DataFrame(self.moments(groups).correlation(), index=self.columns, columns=self.columns)
+        if columns is not None:
+            corr = corr.loc[columns, columns]
+        return corr
+
+    def pair(self, x, y, groups=None):
+        i, j = self.columns.index(x), self.columns.index(y)
+        return float(self.moments(groups).correlation()[i, j])
+
+    def ols(self, x, y, groups=None):
+        """Least-squares fit of ``y`` on ``x``: ``(slope, intercept, r)``."""
+        i, j = self.columns.index(x), self.columns.index(y)
+        m = self.moments(groups)
+        n, sx, sy = m.n[i, j], m.sx[i, j], m.sx[j, i]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slope = (n * m.sxy[i, j] - sx * sy) / (n * m.sxx[i, j] - sx ** 2)
+            # Undo the per-column shift the sums were taken with
+            intercept = (sy - slope * sx) / n + self.shift[j] - slope * self.shift[i]
+        return float(slope), float(intercept), float(m.correlation()[i, j])
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_engine():
+    return CorrelationEngine()
+
+
+@timed("correlation.engine")
+def correlation_engine():
+    """The process-wide engine, brought up to date with the current dataset version."""
+    engine = _shared_engine()
+    version = dataset_version()
+    with engine.lock:
+        if engine.version != version:
+            columns = [engine.by, engine.date_col] + engine.columns
+            engine.sync(lambda: daily_index().batches(columns))
+            engine.version = version
+    return engine
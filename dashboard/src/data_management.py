@@ -0,0 +1,171 @@
+"""Shared access to the daily dashboard dataset.
+
+Every page reads the same frame through ``load_daily()``. The CSV written by
+``notebooks/04_etl_modeling.ipynb`` is parsed once, typed (categorical city,
+datetime64 date_day, float32 measurements), sorted by city and day and
+stored in the shared disk cache (``src.disk_cache``) under the CSV's content
+hash, so later cold starts, in any process or replica, memory-map it instead
+of parsing the CSV.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.disk_cache import cache_key, disk_cache, file_digest
+from src.instrumentation import cached
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # the out-of-core dataset needs pyarrow, the CSV is always readable
+    pq = None
+
+
+# AIR_QUALITY_DATASETS_DIR points the dashboard at another copy of the datasets,
+# e.g. the synthetic one the benchmark suite renders pages against
+DATASETS_DIR = Path(
+    os.environ.get("AIR_QUALITY_DATASETS_DIR", Path(__file__).resolve().parents[2] / "datasets")
+)
+DAILY_CSV = DATASETS_DIR / "dashboard_df.csv"
+
+# Out-of-core copy written by the ETL; see src/partitioned.py
+PARTITIONED_DIR = DATASETS_DIR / "daily"
+PARTITIONED_VERSION = PARTITIONED_DIR / "_version"
+
+CATEGORICAL_COLS = ["city", "country"]
+DATE_COL = "date_day"
+COORD_COLS = ["lat", "lon"]
+MEASUREMENT_COLS = [
+    "pm2_5", "pm10", "us_aqi", "ozone",
+    "nitrogen_dioxide", "sulphur_dioxide",
+    "carbon_monoxide", "carbon_dioxide",
+    "temperature_2m", "relative_humidity_2m",
+    "precipitation", "wind_speed_10m", "surface_pressure",
+]
+
+# Columns the ETL adds when it can (the AQI computed by src.aqi); pages must not assume them
+DERIVED_COLS = ["us_aqi_computed"]
+
+
+def out_of_core():
+    """Whether the pages should scan the partitioned dataset instead of holding one frame.
+
+    Not once the CSV has been rewritten after it (by the notebook, or an ETL
+    run writing elsewhere): the partitioned copy is then stale until
+    ``python -m src.partitioned`` or the ETL rewrites it.
+    """
+    if pq is None:
+        return False
+    try:
+        written = PARTITIONED_VERSION.stat().st_mtime_ns
+    except OSError:
+        return False
+    try:
+        return DAILY_CSV.stat().st_mtime_ns <= written
+    except OSError:
+        # Only the partitioned copy was deployed
+        return True
+
+
+def dataset_version(path=None):
+    """Cheap identifier of the dataset, changes whenever the file is rewritten.
+
+    Defaults to the partitioned dataset's version marker in out-of-core mode
+    and to the source CSV otherwise.
+    """
+    if path is None:
+        path = PARTITIONED_VERSION if out_of_core() else DAILY_CSV
+    stat = Path(path).stat()
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def to_daily_schema(df):
+    """Cast a raw daily frame to the dashboard column types."""
+    df = df.copy()
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    df[DATE_COL] = pd.to_datetime(df[DATE_COL])
+    measurements = [col for col in MEASUREMENT_COLS + DERIVED_COLS if col in df.columns]
+    df[measurements] = df[measurements].astype(np.float32)
+    # Rows stay grouped by city in date order, which the query index relies on
+    return df.sort_values(["city", DATE_COL], kind="stable", ignore_index=True)
+
+
+def dataset_digest(path=None):
+    """Content hash of the dataset, the same in every process and replica serving the same data.
+
+    Keys the disk cache; ``dataset_version`` keys the in-process caches.
+    """
+    if path is None:
+        path = PARTITIONED_VERSION if out_of_core() else DAILY_CSV
+    return file_digest(path)
+
+
+class BatchHistory:
+    """Row counts and content hashes of one group-aligned batch, per group.
+
+    The process-wide engines compare these between dataset versions to tell a
+    version that only appends steps from one that rewrote history. ``groups``
+    labels each row, ``steps`` orders it within its group and ``values``
+    (rows x columns) is hashed with the step. Every row is hashed once.
+    """
+
+    def __init__(self, groups, steps, values):
+        keys = pd.Series(groups).astype("category")
+        self.codes = keys.cat.codes.to_numpy()
+        self.groups = keys.cat.categories.astype(str)
+        self.steps = pd.Series(steps).array
+        frame = pd.DataFrame(np.asarray(values, dtype=np.float64))
+        frame.insert(0, "step", self.steps)
+        # 32-bit row hashes, so the per-group sums cannot overflow
+        self.hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy() & 0xFFFFFFFF
+        newest = pd.Series(self.steps).groupby(self.codes).max()
+        self.newest = pd.Series(newest.array, index=self.groups[newest.index])
+
+    def digest(self, before):
+        """Row count and hash sum, per group, of the rows before that group's ``before`` step."""
+        # Groups missing from ``before`` get NaN/NaT, which no step is before
+        limit = before.reindex(self.groups).array.take(self.codes)
+        rows = np.asarray(self.steps < limit, dtype=bool)
+        sums = pd.Series(self.hashes[rows], dtype=np.int64).groupby(self.codes[rows]).agg(["size", "sum"])
+        sums.index = self.groups[sums.index]
+        return sums.astype(np.int64)
+
+    def appends(self, marks, digests):
+        """Whether the batch only adds steps to groups last seen up to ``marks`` with ``digests``.
+
+        A group's step at its mark may be restated; nothing before it may change.
+        """
+        known = marks.reindex(self.newest.index).dropna()
+        if (self.newest[known.index] < known).any():
+            return False
+        return self.digest(marks).reindex(known.index, fill_value=0).equals(
+            digests.reindex(known.index, fill_value=0))
+
+
+def read_daily(csv_path=DAILY_CSV):
+    """Read the typed daily dataset from the disk cache, parsing the CSV on a miss."""
+    key = cache_key(file_digest(csv_path))
+    return disk_cache().get_or_compute("daily", key, lambda: to_daily_schema(pd.read_csv(csv_path)))
+
+
+@cached("data.load_daily", st.cache_resource(show_spinner=False, max_entries=1))
+def _load_daily(version):
+    if out_of_core():
+        from src.partitioned import scan
+        return scan()
+    return read_daily()
+
+
+def load_daily():
+    """Return the process-wide daily frame.
+
+    The same object is handed to every page and session, so callers must treat
+    it as read-only and use ``assign``/``copy`` before adding columns. In
+    out-of-core mode this materialises the whole history; prefer the column
+    and city scoped reads of ``src.query.daily_index()``.
+    """
+    return _load_daily(dataset_version())
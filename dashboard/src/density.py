@@ -0,0 +1,99 @@
+"""Reduced scatter and box-plot renderings for large frames.
+
+Above ``DENSITY_ROW_THRESHOLD`` rows the pages stop sending one marker per
+row: scatters become a 2D histogram computed with NumPy, box plots are drawn
+from precomputed quartiles and whiskers, and regression lines come from the
+correlation engine's running sums instead of a statsmodels refit.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.aggregates import city_summary, overall_summary
+from src.correlation import correlation_engine
+from src.data_management import dataset_version
+from src.instrumentation import cached, timed
+from src.query import daily_index
+
+
+DENSITY_ROW_THRESHOLD = 20_000
+DENSITY_BINS = 80
+
+
+def use_density(n_rows, threshold=DENSITY_ROW_THRESHOLD):
+    return n_rows > threshold
+
+
+def histogram2d(x, y, bins=DENSITY_BINS):
+    """Counts of (x, y) pairs, shaped ``(y bins, x bins)`` for heatmaps, and the bin edges."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    counts, x_edges, y_edges = np.histogram2d(x[valid], y[valid], bins=bins)
+    return counts.T, x_edges, y_edges
+
+
+def bin_centers(edges):
+    return (edges[:-1] + edges[1:]) / 2
+
+
+def box_stats(df, value, by):
+    """Per-group quartiles, Tukey whiskers (1.5 IQR), mean and count of ``value``.
+
+    Quartiles use linear interpolation, like plotly's default ``quartilemethod``.
+    """
+    grouped = df.groupby(by, observed=True)[value]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "median", "q3"]
+    iqr = stats["q3"] - stats["q1"]
+    bounds = pd.DataFrame({"low": stats["q1"] - 1.5 * iqr, "high": stats["q3"] + 1.5 * iqr})
+
+    rows = df[[by, value]].join(bounds, on=by)
+    inside = rows[rows[value].between(rows["low"], rows["high"])]
+    fences = inside.groupby(by, observed=True)[value].agg(["min", "max"])
+    stats["lowerfence"] = fences["min"]
+    stats["upperfence"] = fences["max"]
+    stats["mean"] = grouped.mean()
+    stats["count"] = grouped.count()
+    return stats
+
+
+@cached("density.box_stats", st.cache_data(show_spinner=False, max_entries=16))
+def _daily_box_stats(version, cities, value):
+    return box_stats(daily_index().get_many(cities, columns=["city", value]), value, "city")
+
+
+def daily_box_stats(cities, value):
+    """Box statistics of ``value`` per city for the current dataset version."""
+    return _daily_box_stats(dataset_version(), tuple(cities), value)
+
+
+@cached("density.density", st.cache_data(show_spinner=False, max_entries=16))
+def _daily_density(version, x, y, bins):
+    df = daily_index().read([x, y])
+    return histogram2d(df[x], df[y], bins)
+
+
+def daily_density(x, y, bins=DENSITY_BINS):
+    """2D histogram of two daily columns for the current dataset version."""
+    return _daily_density(dataset_version(), x, y, bins)
+
+
+@timed("density.trend_lines")
+def trend_lines(x, y, per_city=False):
+    """OLS lines of ``y`` on ``x`` from running sums, overall or one per city.
+
+    Returns one row per line with its name, slope, intercept, r and the x
+    range it spans.
+    """
+    engine = correlation_engine()
+    if per_city:
+        ranges = city_summary({x: ["min", "max"]})
+        fits = {city: engine.ols(x, y, [city]) for city in ranges.index}
+    else:
+        ranges = overall_summary({x: ["min", "max"]}).set_axis(["All"])
+        fits = {"All": engine.ols(x, y)}
+    lines = pd.DataFrame(fits, index=["slope", "intercept", "r"]).T
+    lines["x_min"] = ranges[f"{x}_min"]
+    lines["x_max"] = ranges[f"{x}_max"]
+    return lines.rename_axis("name")
@@ -0,0 +1,229 @@
+"""Cache of derived frames and arrays on disk, shared by every process and replica.
+
+``st.cache_data``/``st.cache_resource`` only live as long as their process, so
+every server process used to parse the dataset and rebuild the cube, describe
+table and model scores after each start. Those results are also written here,
+keyed by a SHA-256 of the inputs' content (not their mtime), so a restarted
+process or a new replica pointed at the same directory warms from disk, and
+a replica holding a copy of the same data finds the same keys.
+
+Frames are stored as uncompressed Arrow IPC files and read memory-mapped:
+float columns (stored with NaN as a value, not as null) and timestamps are
+handed to pandas without a copy, so processes on one host share the pages of
+the hot dataset through the OS page cache instead of each holding its own
+copy. Arrays are stored as ``.npz``. Small JSON metadata can ride along with
+either.
+
+Writes go to a temporary file in the cache directory and are renamed into
+place, so readers only ever see whole entries and concurrent writers of the
+same key simply replace each other's identical file. Once the directory
+exceeds its byte cap the least recently read entries are deleted; a reader
+losing that race sees a miss and recomputes.
+
+``AIR_QUALITY_CACHE_DIR`` moves the cache (e.g. to a volume shared by the
+replicas) and ``AIR_QUALITY_CACHE_MAX_BYTES`` sets the cap.
+"""
+import functools
+import hashlib
+import json
+import os
+import time
+import uuid
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.instrumentation import count_call, timed
+
+try:
+    import pyarrow as pa
+except ImportError:  # frames are not cached without pyarrow, arrays still are
+    pa = None
+
+
+CACHE_DIR_ENV = "AIR_QUALITY_CACHE_DIR"
+MAX_BYTES_ENV = "AIR_QUALITY_CACHE_MAX_BYTES"
+DEFAULT_MAX_BYTES = 2 * 2**30
+# Bump when the layout of a cached value changes, so old entries stop matching
+FORMAT_VERSION = 1
+SUFFIXES = (".arrow", ".npz")
+# Temporary files older than this were left by a writer that died
+STALE_TMP_SECONDS = 3600
+_READ_ERRORS = (OSError, ValueError, KeyError, zipfile.BadZipFile) + ((pa.ArrowException,) if pa else ())
+_META_KEY = b"disk_cache_meta"
+_META_MEMBER = "_meta"
+
+
+@functools.lru_cache(maxsize=64)
+def _file_digest(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """SHA-256 of a file's content, hashed once per process for each mtime and size."""
+    stat = Path(path).stat()
+    return _file_digest(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def cache_key(*parts):
+    """Hex key of JSON-serialisable ``parts`` (digests, parameters)."""
+    payload = json.dumps([FORMAT_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _to_arrow(df):
+    table = pa.Table.from_pandas(df)
+    # Keep NaN as a value: float columns without nulls convert back without a copy
+    for name in df.columns:
+        if df[name].dtype.kind == "f" and table.column(name).null_count:
+            i = table.schema.get_field_index(name)
+            table = table.set_column(i, table.schema.field(i), pa.array(df[name].to_numpy(), from_pandas=False))
+    return table
+
+
+class DiskCache:
+    """Directory of ``<name>-<key>.arrow|.npz`` entries, capped at ``max_bytes``."""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def _path(self, name, key, suffix):
+        return self.root / f"{name}-{key}{suffix}"
+
+    def get(self, name, key):
+        """``(value, meta)`` stored under ``name`` and ``key``, or None on a miss."""
+        for suffix in SUFFIXES:
+            path = self._path(name, key, suffix)
+            try:
+                with timed(f"disk.{name}.read"):
+                    entry = self._read(path)
+            except _READ_ERRORS:
+                # Missing, evicted, truncated or foreign: a miss, the next put replaces it
+                continue
+            try:
+                # The mtime records the last read, for eviction
+                os.utime(path)
+            except OSError:
+                pass
+            count_call(f"disk.{name}")
+            return entry
+        count_call(f"disk.{name}", miss=True)
+        return None
+
+    def _read(self, path):
+        if path.suffix == ".arrow":
+            if pa is None:
+                raise FileNotFoundError(path)
+            with pa.memory_map(str(path)) as source:
+                table = pa.ipc.open_file(source).read_all()
+            meta = json.loads((table.schema.metadata or {}).get(_META_KEY, b"{}"))
+            return table.to_pandas(split_blocks=True), meta
+
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {member: npz[member] for member in npz.files}
+        meta = json.loads(str(arrays.pop(_META_MEMBER, "{}")))
+        return arrays, meta
+
+    def put(self, name, key, value, meta=None):
+        """Store a DataFrame or a dict of arrays; returns the entry's path, or None if it could not be written.
+
+        ``meta`` is a small JSON-serialisable dict returned with the value.
+        """
+        if isinstance(value, pd.DataFrame):
+            if pa is None:
+                return None
+            path = self._path(name, key, ".arrow")
+        else:
+            path = self._path(name, key, ".npz")
+        tmp = self.root / f".{path.name}.{uuid.uuid4().hex}.tmp"
+        try:
+            with timed(f"disk.{name}.write"):
+                self.root.mkdir(parents=True, exist_ok=True)
+                if path.suffix == ".arrow":
+                    table = _to_arrow(value)
+                    metadata = {**(table.schema.metadata or {}), _META_KEY: json.dumps(meta or {}).encode()}
+                    table = table.replace_schema_metadata(metadata)
+                    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                else:
+                    with open(tmp, "wb") as f:
+                        np.savez(f, **value, **{_META_MEMBER: np.str_(json.dumps(meta or {}))})
+                os.replace(tmp, path)
+        except OSError:
+            # Read-only deployments still work, they just recompute on every cold start
+            tmp.unlink(missing_ok=True)
+            return None
+        self.evict(keep=path)
+        return path
+
+    def entries(self):
+        """``(path, size, mtime)`` of every entry, least recently read first."""
+        found = []
+        try:
+            paths = list(self.root.iterdir())
+        except OSError:
+            return found
+        now = time.time()
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if path.suffix == ".tmp":
+                if now - stat.st_mtime > STALE_TMP_SECONDS:
+                    path.unlink(missing_ok=True)
+            elif path.suffix in SUFFIXES:
+                found.append((path, stat.st_size, stat.st_mtime))
+        return sorted(found, key=lambda entry: entry[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Delete the least recently read entries until the directory fits ``max_bytes``."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            path.unlink(missing_ok=True)
+
+    def get_or_compute(self, name, key, compute):
+        """The value stored under ``name`` and ``key``, computing and storing it on a miss."""
+        entry = self.get(name, key)
+        if entry is not None:
+            return entry[0]
+        value = compute()
+        self.put(name, key, value)
+        return value
+
+
+@st.cache_resource(show_spinner=False)
+def _disk_cache(root, max_bytes):
+    return DiskCache(root, max_bytes)
+
+
+def disk_cache():
+    """The process-wide cache, under ``datasets/cache`` unless ``AIR_QUALITY_CACHE_DIR`` is set."""
+    from src.data_management import DATASETS_DIR
+
+    root = os.environ.get(CACHE_DIR_ENV) or DATASETS_DIR / "cache"
+    return _disk_cache(str(root), int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES)))
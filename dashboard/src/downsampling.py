@@ -0,0 +1,142 @@
+"""Server-side downsampling of time series before they are sent to the browser.
+
+Each line trace is reduced to a fixed point budget with Largest-Triangle-
+Three-Buckets (LTTB), which keeps the visual shape of the series. Long series
+are first pre-selected with a min/max pass so LTTB only runs on a few points
+per pixel and spikes are never dropped.
+
+Range tiers (1w/1m/6m/all) are precomputed per dataset version, so switching
+the visible range is a cache lookup instead of a re-render of every row.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.data_management import DATE_COL, dataset_version
+from src.instrumentation import cached
+from src.query import daily_index
+
+
+DEFAULT_POINT_BUDGET = 1000
+
+# Visible span of each range tier, counted back from the last timestamp
+RANGE_TIERS = {
+    "1w": pd.DateOffset(days=7),
+    "1m": pd.DateOffset(months=1),
+    "6m": pd.DateOffset(months=6),
+    "all": None,
+}
+
+# Above this many points per budget slot, min/max pre-selection runs before LTTB
+_MINMAX_RATIO = 8
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").view(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def minmax(y, n_bins):
+    """Indices of the minimum and maximum of ``y`` in each of ``n_bins`` equal-count bins."""
+    n = len(y)
+    if n_bins >= n:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_bins + 1).astype(np.int64)
+    bin_of = np.repeat(np.arange(n_bins), np.diff(edges))
+
+    picked = []
+    for reduce in (np.minimum, np.maximum):
+        extremes = reduce.reduceat(y, edges[:-1])
+        hits = np.flatnonzero(y == extremes[bin_of])
+        # First hit per bin
+        _, first = np.unique(bin_of[hits], return_index=True)
+        picked.append(hits[first])
+    return np.unique(np.concatenate(picked))
+
+
+def lttb(x, y, budget):
+    """Indices of ``budget`` points chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the mean of the next bucket.
+    """
+    n = len(x)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    selected = np.empty(budget, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    anchor = 0
+    for i in range(budget - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+
+        area = np.abs(
+            (x[anchor] - next_x) * (y[start:stop] - y[anchor])
+            - (x[anchor] - x[start:stop]) * (next_y - y[anchor])
+        )
+        anchor = start + int(area.argmax())
+        selected[i + 1] = anchor
+    return selected
+
+
+def downsample(x, y, budget=DEFAULT_POINT_BUDGET):
+    """Indices of at most ``budget`` points of a series sorted by ``x``; NaN values are dropped."""
+    x, y = _as_float(x), _as_float(y)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= budget:
+        return valid
+    x, y = x[valid], y[valid]
+
+    candidates = np.arange(len(y))
+    if len(y) > _MINMAX_RATIO * budget:
+        # Two points per bin, several bins per budget slot
+        candidates = minmax(y, 2 * budget)
+        candidates = np.unique(np.concatenate([[0], candidates, [len(y) - 1]]))
+    kept = lttb(x[candidates], y[candidates], budget)
+    return valid[candidates[kept]]
+
+
+def downsample_frame(df, x, y, budget=DEFAULT_POINT_BUDGET, by=None):
+    """Rows of ``df`` left after downsampling ``y`` against ``x``, per ``by`` group."""
+    if by is None:
+        ordered = df.sort_values(x)
+        return ordered.iloc[downsample(ordered[x].to_numpy(), ordered[y].to_numpy(), budget)]
+    parts = [
+        downsample_frame(group, x, y, budget)
+        for _, group in df.groupby(by, observed=True, sort=False)
+    ]
+    return pd.concat(parts) if parts else df.iloc[:0]
+
+
+def range_window(df, x, tier):
+    """Rows of ``df`` inside the visible span of a range tier."""
+    span = RANGE_TIERS[tier]
+    if span is None or df.empty:
+        return df
+    return df[df[x] > df[x].max() - span]
+
+
+def tiered_frames(df, x, y, budget=DEFAULT_POINT_BUDGET, by=None):
+    """One downsampled frame per range tier, each within ``budget`` points per group."""
+    return {
+        tier: downsample_frame(range_window(df, x, tier), x, y, budget, by)
+        for tier in RANGE_TIERS
+    }
+
+
+@cached("downsampling.trend_tiers", st.cache_data(show_spinner=False, max_entries=32))
+def _daily_trend_tiers(version, cities, column, budget):
+    rows = daily_index().get_many(cities, columns=["city", DATE_COL, column])
+    return tiered_frames(rows, DATE_COL, column, budget, by="city")
+
+
+def daily_trend_tiers(cities, column="us_aqi", budget=DEFAULT_POINT_BUDGET):
+    """Precomputed range tiers of ``column`` for ``cities`` from the daily dataset."""
+    return _daily_trend_tiers(dataset_version(), tuple(cities), column, budget)
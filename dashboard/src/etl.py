@@ -0,0 +1,252 @@
+"""Streaming hourly -> daily ETL producing ``dashboard_df``.
+
+Reusable form of the harmonisation steps in ``notebooks/04_etl_modeling.ipynb``:
+both hourly inputs are read in chunks, each chunk is reduced to per-(city, day)
+sums and counts, and only those running totals are kept. Memory is therefore
+bounded by the number of city-days, never by the number of hourly rows.
+
+The hourly AQI is also computed from the pollutant concentrations
+(``src.aqi``) and averaged per day into ``us_aqi_computed``, next to the
+upstream ``us_aqi``.
+
+Run from the ``dashboard`` folder::
+
+    python -m src.etl                # hourly CSVs -> datasets/dashboard_df.csv
+    python -m src.etl --from-store   # ingestion store partitions instead of CSVs
+    python -m src.etl --partitioned  # also datasets/daily/ for out-of-core dashboards
+                                     # (rewritten anyway once it exists)
+    python -m src.etl --no-computed-aqi  # upstream us_aqi only
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.aqi import AQI_COLUMN, StreamingAQI
+from src.data_management import DAILY_CSV, DATASETS_DIR, PARTITIONED_DIR, PARTITIONED_VERSION, to_daily_schema
+
+
+AQ_NUMERIC_COLS = [
+    "pm2_5", "pm10", "us_aqi", "ozone",
+    "nitrogen_dioxide", "sulphur_dioxide",
+    "carbon_monoxide", "carbon_dioxide"
+]
+
+WEATHER_NUMERIC_COLS = [
+    "temperature_2m",
+    "relative_humidity_2m",
+    "precipitation",
+    "wind_speed_10m",
+    "surface_pressure"
+]
+
+LOCATION_COLS = ["city", "country", "lat", "lon"]
+KEYS = ["city", "date_day"]
+
+AQ_CSV = DATASETS_DIR / "air_quality_df.csv"
+WEATHER_CSV = DATASETS_DIR / "weather_df.csv"
+CHUNKSIZE = 500_000
+
+
+def utc_days(dates):
+    """UTC calendar day of each hourly timestamp.
+
+    Returns datetime64 days, or ``YYYY-MM-DD`` strings for ISO strings already
+    in UTC (as the ingestion writes them), where slicing the date is an order
+    of magnitude cheaper than parsing every timestamp.
+    """
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+        return dates.dt.floor("D")
+    if dates.str.endswith("+00:00").all():
+        return dates.str.slice(0, 10)
+    return pd.to_datetime(dates, utc=True, format="ISO8601").dt.floor("D").dt.tz_localize(None)
+
+
+def utc_hours(dates):
+    """Hours since the epoch of each hourly timestamp, in UTC, as int64."""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+        return dates.to_numpy().astype("datetime64[h]").view(np.int64)
+    if dates.str.endswith("+00:00").all():
+        # As in utc_days, slicing "YYYY-MM-DD HH" is cheaper than parsing
+        return np.array(dates.str.slice(0, 13).to_numpy(), dtype="datetime64[h]").view(np.int64)
+    parsed = pd.to_datetime(dates, utc=True, format="ISO8601").dt.tz_localize(None)
+    return parsed.to_numpy().astype("datetime64[h]").view(np.int64)
+
+
+class DailyAccumulator:
+    """Running per-(city, day) sums and non-missing counts of hourly columns.
+
+    Partial aggregates are buffered and folded together every ``fold_every``
+    chunks, so the cost per chunk stays proportional to the chunk and the
+    state stays proportional to the number of city-days seen.
+    """
+
+    def __init__(self, columns, fold_every=8):
+        self.columns = list(columns)
+        self.fold_every = fold_every
+        self._partials = []
+        self._locations = []
+        self.rows = 0
+
+    def add(self, chunk):
+        values = chunk[self.columns].astype(np.float64)
+        grouped_by = [chunk["city"], utc_days(chunk["date"])]
+
+        sums = values.groupby(grouped_by, observed=True, sort=False).sum()
+        counts = values.notna().groupby(grouped_by, observed=True, sort=False).sum()
+        partial = pd.concat([sums, counts.add_suffix("__n")], axis=1)
+
+        days = partial.index.levels[1]
+        if not pd.api.types.is_datetime64_any_dtype(days):
+            partial.index = partial.index.set_levels(pd.to_datetime(days, format="%Y-%m-%d"), level=1)
+        self._partials.append(partial)
+
+        present = [col for col in LOCATION_COLS if col in chunk.columns]
+        self._locations.append(chunk[present].drop_duplicates("city"))
+
+        self.rows += len(chunk)
+        if len(self._partials) >= self.fold_every:
+            self._fold()
+
+    def _fold(self):
+        if len(self._partials) > 1:
+            combined = pd.concat(self._partials)
+            self._partials = [combined.groupby(level=[0, 1], sort=False).sum()]
+        if len(self._locations) > 1:
+            self._locations = [pd.concat(self._locations).drop_duplicates("city")]
+
+    def daily_means(self):
+        """Mean of each column per city and day (NaN where every hour is missing)."""
+        self._fold()
+        if not self._partials:
+            return pd.DataFrame(columns=KEYS + self.columns)
+        totals = self._partials[0].sort_index()
+        totals.index.names = KEYS
+        counts = totals[[f"{col}__n" for col in self.columns]].to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = totals[self.columns].to_numpy() / counts
+        return pd.DataFrame(means, index=totals.index, columns=self.columns).reset_index()
+
+    def locations(self):
+        """First-seen country/lat/lon for every city."""
+        self._fold()
+        if not self._locations:
+            return pd.DataFrame(columns=LOCATION_COLS)
+        return self._locations[0].reset_index(drop=True)
+
+
+def csv_chunks(path, columns, chunksize=CHUNKSIZE):
+    """Read an hourly CSV in chunks, only the columns the ETL needs.
+
+    Raises ``ValueError`` up front when ``path`` is not an hourly export, e.g.
+    a daily CSV keyed by ``date_day``.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [col for col in ["date", "city"] + columns if col not in header]
+    if missing:
+        raise ValueError(f"{path} is not an hourly CSV (missing columns {missing}); "
+                         "hourly input is required")
+    usecols = ["date"] + [col for col in LOCATION_COLS if col in header] + columns
+    dtype = {"date": str, **{col: np.float32 for col in columns}}
+    return pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize)
+
+
+def store_chunks(endpoint, store_dir=None):
+    """Yield the ingestion store's monthly partitions one at a time."""
+    from src.ingestion import STORE_DIR
+
+    endpoint_dir = Path(store_dir or STORE_DIR) / endpoint
+    for path in sorted(endpoint_dir.glob("city=*/*.parquet")):
+        yield pd.read_parquet(path)
+
+
+def with_computed_aqi(chunks):
+    """Add the hourly AQI computed from the pollutant concentrations to each chunk."""
+    stream = StreamingAQI()
+    for chunk in chunks:
+        computed = stream.add(chunk, utc_hours(chunk["date"]))
+        yield chunk.assign(**{AQI_COLUMN: computed[AQI_COLUMN]})
+
+
+def accumulate(chunks, columns):
+    accumulator = DailyAccumulator(columns)
+    for chunk in chunks:
+        accumulator.add(chunk)
+    return accumulator
+
+
+def merge_daily(aq, weather):
+    """Inner-join the daily aggregates and attach the location lookup."""
+    merged_df = pd.merge(aq.daily_means(), weather.daily_means(), on=KEYS, how="inner")
+
+    # Location lookup for reference of city, country, lat and lon during dashboards
+    location_lookup = weather.locations()
+    return pd.merge(merged_df, location_lookup, on="city", how="left")
+
+
+def build_dashboard_df(aq_chunks, weather_chunks, output_path=DAILY_CSV, partitioned_dir=None,
+                       computed_aqi=True):
+    """Run the streaming ETL and save the merged daily dataset for dashboards.
+
+    With ``partitioned_dir`` the result is also written as the partitioned
+    dataset the dashboard scans in out-of-core mode. ``computed_aqi`` expects
+    each city's hours to arrive in order across the air quality chunks.
+    """
+    aq_columns = AQ_NUMERIC_COLS
+    if computed_aqi:
+        aq_chunks = with_computed_aqi(aq_chunks)
+        aq_columns = AQ_NUMERIC_COLS + [AQI_COLUMN]
+    aq = accumulate(aq_chunks, aq_columns)
+    weather = accumulate(weather_chunks, WEATHER_NUMERIC_COLS)
+    dashboard_df = merge_daily(aq, weather)
+    if output_path is not None:
+        dashboard_df.to_csv(output_path, index=False)
+    if partitioned_dir is not None:
+        from src.partitioned import write_partitioned
+        write_partitioned(to_daily_schema(dashboard_df), partitioned_dir)
+    return dashboard_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hourly -> daily dashboard ETL")
+    parser.add_argument("--air-quality", default=AQ_CSV, type=Path)
+    parser.add_argument("--weather", default=WEATHER_CSV, type=Path)
+    parser.add_argument("--output", default=DAILY_CSV, type=Path)
+    parser.add_argument("--chunksize", default=CHUNKSIZE, type=int)
+    parser.add_argument("--from-store", action="store_true",
+                        help="read the ingestion store instead of the hourly CSVs")
+    parser.add_argument("--partitioned", nargs="?", const=PARTITIONED_DIR, default=None, type=Path,
+                        help="also write the partitioned dataset for out-of-core dashboards "
+                             "(always rewritten when it exists and --output is the dashboard CSV)")
+    parser.add_argument("--no-computed-aqi", dest="computed_aqi", action="store_false",
+                        help="skip computing the AQI from the pollutant concentrations")
+    args = parser.parse_args()
+
+    if args.from_store:
+        aq_chunks = store_chunks("air_quality")
+        weather_chunks = store_chunks("weather")
+    else:
+        try:
+            aq_chunks = csv_chunks(args.air_quality, AQ_NUMERIC_COLS, args.chunksize)
+            weather_chunks = csv_chunks(args.weather, WEATHER_NUMERIC_COLS, args.chunksize)
+        except ValueError as err:
+            parser.error(f"{err}; pass the hourly exports with --air-quality/--weather or use --from-store")
+
+    partitioned = args.partitioned
+    if partitioned is None and args.output.resolve() == DAILY_CSV.resolve() and PARTITIONED_VERSION.exists():
+        # The dashboard would otherwise keep scanning the old partitioned copy
+        partitioned = PARTITIONED_DIR
+    dashboard_df = build_dashboard_df(aq_chunks, weather_chunks, args.output, partitioned,
+                                      args.computed_aqi)
+    print(f"Dashboard dataset saved to: {args.output} {dashboard_df.shape}")
+    if partitioned is not None:
+        print(f"Partitioned dataset saved to: {partitioned}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Next-day AQI category forecasts for every city.
+
+Features are each city's measurements on a day and on the ``LAGS`` days
+before it. Lags are vectorised shifts over the (city, day)-sorted frame: the
+lagged row is looked up by its (city, day) key with ``np.searchsorted``, so a
+missing day gives NaN instead of silently shifting to an older row. The
+target is the EPA band (``src.aqi_bands``) of the next day's ``us_aqi``.
+
+The model is the notebook's ``PipelineClf2ExplainClusters`` (StandardScaler
+-> SelectFromModel(GradientBoosting) -> GradientBoosting) behind a median
+imputer for lags before a city's first day. It is evaluated on the last
+``HOLDOUT_DAYS`` days against persistence (tomorrow's band is today's), then
+refitted on every day and saved with its feature list and metrics. The
+dashboard scores every city's latest day in one ``predict_proba`` call, cached
+per dataset version and in the shared disk cache under the dataset and model
+content hashes.
+
+The bundle is a pickle that only loads under the scikit-learn version that
+wrote it, so it is not committed: train it once when setting up, from the
+``dashboard`` folder::
+
+    python -m src.forecasting    # train and save models/aqi_forecast.pkl
+"""
+import argparse
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.aqi_bands import AQI_BAND_LABELS, band_index
+from src.data_management import DATE_COL, MEASUREMENT_COLS, dataset_digest, dataset_version, load_daily
+from src.disk_cache import cache_key, disk_cache, file_digest
+from src.instrumentation import cached
+from src.regime_artifact import MODELS_DIR
+from src.rolling import series_keys, sort_order, time_steps
+
+
+FORECAST_COLUMNS = MEASUREMENT_COLS
+LAGS = [0, 1, 2, 6]
+HORIZON = 1
+HOLDOUT_DAYS = 14
+FORECAST_MODEL_PATH = MODELS_DIR / "aqi_forecast.pkl"
+FORMAT_VERSION = 1
+
+
+def feature_names(columns=FORECAST_COLUMNS, lags=LAGS):
+    return [f"{column}_lag{lag}" for lag in lags for column in columns]
+
+
+def _keys(df, by, date_col):
+    """``series_keys`` of ``df`` in sorted order, and the order (None if already sorted)."""
+    codes = pd.factorize(df[by])[0].astype(np.int64)
+    steps = time_steps(df[date_col])
+    order = sort_order(codes, steps)
+    if order is not None:
+        codes, steps = codes[order], steps[order]
+    return series_keys(codes, steps, max(max(LAGS), HORIZON)), order
+
+
+def _shifted(keys, offset, at):
+    """Positions of the rows ``offset`` steps from the rows ``at`` in the same series, and which exist."""
+    target = keys.take(at) + offset
+    found = np.searchsorted(keys, target).clip(max=len(keys) - 1)
+    return found, keys.take(found) == target
+
+
+def lagged_features(df, columns=FORECAST_COLUMNS, lags=LAGS, rows=None, by="city", date_col=DATE_COL):
+    """The ``<column>_lag<n>`` features of ``df``'s rows (or only of the positions ``rows``).
+
+    Lag 0 is the day itself; lag n is the same city n days earlier, NaN
+    where that day is missing.
+    """
+    keys, order = _keys(df, by, date_col)
+    n = len(df)
+    positions = np.arange(n) if rows is None else np.asarray(rows)
+    if order is None:
+        at = positions
+    else:
+        # Sorted position of every requested row
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(n)
+        at = inverse.take(positions)
+
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    if order is not None:
+        values = values[order]
+    features = np.empty((len(at), len(lags) * len(columns)))
+    for i, lag in enumerate(lags):
+        found, exists = _shifted(keys, -lag, at)
+        block = values.take(found, axis=0)
+        block[~exists] = np.nan
+        features[:, i * len(columns):(i + 1) * len(columns)] = block
+    return pd.DataFrame(features, index=df.index[positions], columns=feature_names(columns, lags))
+
+
+def next_day_band(df, by="city", date_col=DATE_COL):
+    """EPA band index of each row's next-day ``us_aqi``; -1 where that day is missing."""
+    keys, order = _keys(df, by, date_col)
+    aqi = df["us_aqi"].to_numpy(dtype=np.float64, na_value=np.nan)
+    if order is not None:
+        aqi = aqi[order]
+    found, exists = _shifted(keys, HORIZON, np.arange(len(df)))
+    bands = np.where(exists, band_index(aqi.take(found)), -1).astype(np.int8)
+    if order is None:
+        return bands
+    unsorted = np.empty_like(bands)
+    unsorted[order] = bands
+    return unsorted
+
+
+def forecast_pipeline(random_state=0):
+    """The notebook's ``PipelineClf2ExplainClusters`` behind a median imputer."""
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.feature_selection import SelectFromModel
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return Pipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler()),
+        ("feat_selection", SelectFromModel(GradientBoostingClassifier(random_state=random_state))),
+        ("model", GradientBoostingClassifier(random_state=random_state)),
+    ])
+
+
+def training_set(df):
+    """Features, next-day band targets and issue dates of every row with a known next day."""
+    target = next_day_band(df)
+    labelled = np.flatnonzero(target >= 0)
+    X = lagged_features(df, rows=labelled)
+    return X, target[labelled], df[DATE_COL].to_numpy()[labelled]
+
+
+def train(df, holdout_days=HOLDOUT_DAYS, random_state=0):
+    """Fit on every labelled day; returns ``(bundle, metrics)``.
+
+    The metrics come from a fit on the days before the last
+    ``holdout_days``, scored on those days.
+    """
+    import sklearn
+    from sklearn.metrics import accuracy_score, balanced_accuracy_score
+
+    X, y, issued = training_set(df)
+    features = list(X.columns)
+    # Fitted on plain arrays so batches are scored without a name check
+    X = X.to_numpy()
+    cutoff = issued.max() - np.timedelta64(holdout_days, "D")
+    train_rows, test_rows = issued <= cutoff, issued > cutoff
+
+    metrics = {"train_rows": int(train_rows.sum()), "holdout_rows": int(test_rows.sum())}
+    if test_rows.any() and len(np.unique(y[train_rows])) > 1:
+        holdout = forecast_pipeline(random_state).fit(X[train_rows], y[train_rows])
+        predicted = holdout.predict(X[test_rows])
+        persistence = band_index(X[test_rows, features.index("us_aqi_lag0")])
+        metrics.update({
+            "accuracy": accuracy_score(y[test_rows], predicted),
+            "balanced_accuracy": balanced_accuracy_score(y[test_rows], predicted),
+            "persistence_accuracy": accuracy_score(y[test_rows], persistence),
+        })
+
+    start = perf_counter()
+    pipeline = forecast_pipeline(random_state).fit(X, y)
+    metrics["fit_seconds"] = perf_counter() - start
+    bundle = {
+        "format_version": FORMAT_VERSION,
+        "sklearn_version": sklearn.__version__,
+        "pipeline": pipeline,
+        "columns": list(FORECAST_COLUMNS),
+        "lags": list(LAGS),
+        "features": features,
+        "labels": [AQI_BAND_LABELS[band] for band in pipeline.classes_],
+        "trained_through": str(pd.Timestamp(issued.max()).date()),
+        "metrics": metrics,
+    }
+    return bundle, metrics
+
+
+@cached("model.load_forecast_model", st.cache_resource(show_spinner=False, max_entries=2))
+def _load_forecast_model(path, model_digest):
+    # ``model_digest`` keys the cache, so a retrained file is loaded again
+    import joblib
+    import sklearn
+
+    start = perf_counter()
+    try:
+        bundle = joblib.load(path)
+    except Exception:  # unpickling a truncated or foreign file can raise almost anything
+        return None, 0.0
+    if (not isinstance(bundle, dict) or bundle.get("format_version") != FORMAT_VERSION
+            or bundle.get("sklearn_version") != sklearn.__version__):
+        return None, 0.0
+    return bundle, perf_counter() - start
+
+
+def load_forecast_model(path=FORECAST_MODEL_PATH):
+    """The saved forecast bundle, loaded once per process and content of the file.
+
+    ``(None, 0.0)`` when it is missing, unreadable, or was trained with
+    another scikit-learn version, so the page asks for a retrain instead of
+    failing.
+    """
+    if not Path(path).exists():
+        return None, 0.0
+    return _load_forecast_model(str(path), file_digest(path))
+
+
+def forecast(df, bundle, rows=None):
+    """Next-day band probabilities for ``df``'s rows (or the positions ``rows``), in one batch.
+
+    Returns the city, the issue day, the forecast day, the most likely band
+    and one probability column per band the model knows.
+    """
+    positions = np.arange(len(df)) if rows is None else np.asarray(rows)
+    X = lagged_features(df, bundle["columns"], bundle["lags"], positions)
+    probabilities = bundle["pipeline"].predict_proba(X.to_numpy())
+    labels = np.asarray(bundle["labels"])
+    issued = df[DATE_COL].to_numpy().take(positions)
+    result = pd.DataFrame({
+        "city": df["city"].to_numpy().take(positions),
+        "issued": issued,
+        "forecast_day": issued + np.timedelta64(HORIZON, "D"),
+        "category": labels.take(probabilities.argmax(axis=1)),
+        "probability": probabilities.max(axis=1),
+    }, index=X.index)
+    return pd.concat([result, pd.DataFrame(probabilities, index=X.index, columns=labels)], axis=1)
+
+
+def latest_rows(df, by="city", date_col=DATE_COL):
+    """Position of each city's most recent row."""
+    codes = pd.factorize(df[by])[0]
+    order = np.lexsort((df[date_col].to_numpy(), codes))
+    codes = codes[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = codes[1:] != codes[:-1]
+    return order[last]
+
+
+@cached("model.score_forecasts", st.cache_data(show_spinner=False, max_entries=4))
+def _score_forecasts(version, model_digest):
+    key = cache_key(dataset_digest(), model_digest)
+    entry = disk_cache().get("model.forecasts", key)
+    if entry is not None:
+        return entry
+
+    # The bundle of this digest, so the scores are stored under the model that made them
+    bundle, load_seconds = _load_forecast_model(str(FORECAST_MODEL_PATH), model_digest)
+    if bundle is None:
+        return None, {}
+    df = load_daily()
+
+    start = perf_counter()
+    forecasts = forecast(df, bundle, latest_rows(df)).reset_index(drop=True)
+    predict_seconds = perf_counter() - start
+
+    report = {
+        "cities": len(forecasts),
+        "load_seconds": load_seconds,
+        "predict_seconds": predict_seconds,
+        "rows_per_second": len(forecasts) / predict_seconds if predict_seconds else float("inf"),
+        "trained_through": bundle["trained_through"],
+        **bundle["metrics"],
+    }
+    if file_digest(FORECAST_MODEL_PATH) == model_digest:
+        # Not when the file was replaced during the load: the bundle may be the new one
+        disk_cache().put("model.forecasts", key, forecasts, report)
+    return forecasts, report
+
+
+def daily_forecasts():
+    """Next-day forecasts for every city's latest day plus the serving report.
+
+    Returns ``(None, {})`` until a model has been trained with
+    ``python -m src.forecasting``.
+    """
+    # Checked on every call, so a model trained while the server runs shows up at once
+    if not FORECAST_MODEL_PATH.exists():
+        return None, {}
+    return _score_forecasts(dataset_version(), file_digest(FORECAST_MODEL_PATH))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the next-day AQI category model")
+    parser.add_argument("--holdout-days", type=int, default=HOLDOUT_DAYS)
+    parser.add_argument("--output", type=Path, default=FORECAST_MODEL_PATH)
+    args = parser.parse_args()
+
+    import joblib
+
+    bundle, metrics = train(load_daily(), args.holdout_days)
+    for name, value in metrics.items():
+        print(f"{name:>22}: {value:.4f}" if isinstance(value, float) else f"{name:>22}: {value}")
+    joblib.dump(bundle, args.output)
+    print(f"Forecast model saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""Incremental ingestion of Open-Meteo hourly data into a local store.
+
+Replaces the full-window refetch in ``notebooks/01_data_ingestion.ipynb``.
+Each endpoint keeps a per-city high-water mark (the last hour stored), so a
+refresh only requests the hours after it and appends them to Parquet
+partitions laid out as::
+
+    datasets/store/<endpoint>/city=<city>/<YYYY-MM>.parquet
+    datasets/store/<endpoint>/_state.json
+
+Locations are fetched in batched FlatBuffers requests, several at a time,
+over one pooled HTTP session (see ``PooledFetcher``). Decoded days are kept
+in a per-(location, day) response cache (see ``src.response_cache``), so
+overlapping windows and reruns only request the days not fetched yet.
+
+Run from the ``dashboard`` folder::
+
+    python -m src.ingestion --export-csv
+    python -m src.ingestion --offline   # stub client, no network
+"""
+import abc
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_management import DATASETS_DIR
+from src.response_cache import DAY, HOURS_PER_DAY, ResponseCache
+
+
+STORE_DIR = DATASETS_DIR / "store"
+DEFAULT_START = "2025-11-07"
+
+# Explicitly define city-coordinate mapping
+LOCATIONS = [
+    {"city": "Los Angeles", "country": "US", "lat": 34.0522, "lon": -118.2437},
+    {"city": "Sacramento", "country": "US", "lat": 38.5816, "lon": -121.4944},
+    {"city": "Detroit", "country": "US", "lat": 42.3314, "lon": -83.0458},
+    {"city": "Houston", "country": "US", "lat": 29.7604, "lon": -95.3698},
+    {"city": "Cleveland", "country": "US", "lat": 41.4993, "lon": -81.6944},
+    {"city": "Chicago", "country": "US", "lat": 41.8781, "lon": -87.6298},
+]
+
+# The order of variables is important to assign them correctly from the response
+ENDPOINTS = {
+    "air_quality": {
+        "url": "https://air-quality-api.open-meteo.com/v1/air-quality",
+        "variables": ["pm10", "pm2_5", "carbon_monoxide", "sulphur_dioxide",
+                      "ozone", "us_aqi", "carbon_dioxide", "nitrogen_dioxide"],
+        "csv": "air_quality_df.csv",
+    },
+    "weather": {
+        "url": "https://api.open-meteo.com/v1/forecast",
+        "variables": ["temperature_2m", "relative_humidity_2m", "precipitation",
+                      "wind_speed_10m", "surface_pressure"],
+        "csv": "weather_df.csv",
+    },
+}
+
+HOUR = pd.Timedelta(hours=1)
+
+
+def _city_dir(store_dir, endpoint, city):
+    return Path(store_dir) / endpoint / f"city={city}"
+
+
+def _write_atomic(df, path):
+    # Readers never see a half-written partition
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def read_state(endpoint, store_dir=STORE_DIR):
+    """Per-city high-water marks (last stored hour, UTC) for an endpoint."""
+    path = Path(store_dir) / endpoint / "_state.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return {city: pd.Timestamp(ts) for city, ts in json.load(f).items()}
+
+
+def write_state(endpoint, state, store_dir=STORE_DIR):
+    path = Path(store_dir) / endpoint / "_state.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({city: ts.isoformat() for city, ts in sorted(state.items())}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def missing_window(high_water_mark, start, end):
+    """First and last hour still to fetch, or ``None`` when up to date."""
+    first = start if high_water_mark is None else max(start, high_water_mark + HOUR)
+    return (first, end) if first <= end else None
+
+
+def pooled_session(pool_size, retries=5, backoff_factor=0.2):
+    """HTTP session keeping up to ``pool_size`` connections alive, with retry/backoff."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(total=retries, backoff_factor=backoff_factor,
+                  status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def decode_flatbuffers(data):
+    """Split a FlatBuffers body into ``WeatherApiResponse`` messages (one per location)."""
+    from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+    messages = []
+    pos = 0
+    while pos < len(data):
+        length = int.from_bytes(data[pos:pos + 4], byteorder="little")
+        # In stream error messages start with "Unexpected"
+        if length == 0x78656E55:
+            raise RuntimeError(data[pos:].decode("utf-8"))
+        messages.append(WeatherApiResponse.GetRootAs(data, pos + 4))
+        pos += length + 4
+    return messages
+
+
+class HourlyFetcher(abc.ABC):
+    """Fetch a shared hourly window for many locations into one columnar frame.
+
+    Locations are split into batches of ``batch_size`` coordinates per request
+    and at most ``max_workers`` requests run at once. Each decoded variable is
+    copied straight into a preallocated float32 column (NaN where the API
+    returns nothing), so no per-location DataFrames are built or concatenated.
+    Subclasses implement ``_request(url, params)`` returning response objects.
+
+    With a ``cache`` (a ``ResponseCache``) the window is widened to whole UTC
+    days, days already cached are read from it, and only the locations and
+    days it lacks are requested; locations missing the same span of days are
+    still batched together.
+    """
+
+    def __init__(self, batch_size=50, max_workers=8, cache=None):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.cache = cache
+
+    def url(self, endpoint):
+        return ENDPOINTS[endpoint]["url"]
+
+    @abc.abstractmethod
+    def _request(self, url, params):
+        """Response objects (one per location) for one batched request."""
+
+    def fetch(self, endpoint, locations, first, last):
+        n_hours = int((last - first) / HOUR) + 1
+        if self.cache is None:
+            columns = self._fetch_columns(endpoint, locations, first, n_hours)
+        else:
+            columns = self._fetch_cached(endpoint, locations, first, n_hours)
+        return _columnar_frame(locations, first, n_hours, columns)
+
+    def _fetch_columns(self, endpoint, locations, first, n_hours):
+        variables = ENDPOINTS[endpoint]["variables"]
+        last = first + (n_hours - 1) * HOUR
+        first_epoch = int(first.timestamp())
+        columns = {
+            name: np.full(len(locations) * n_hours, np.nan, dtype=np.float32)
+            for name in variables
+        }
+
+        def fetch_batch(offset):
+            batch = locations[offset:offset + self.batch_size]
+            params = {
+                "latitude": [loc["lat"] for loc in batch],
+                "longitude": [loc["lon"] for loc in batch],
+                "hourly": variables,
+                "start_hour": first.strftime("%Y-%m-%dT%H:%M"),
+                "end_hour": last.strftime("%Y-%m-%dT%H:%M"),
+            }
+            responses = self._request(self.url(endpoint), params)
+            for i, response in enumerate(responses):
+                _fill_columns(columns, (offset + i) * n_hours, n_hours,
+                              first_epoch, response.Hourly(), variables)
+
+        offsets = range(0, len(locations), self.batch_size)
+        if self.max_workers > 1 and len(offsets) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(fetch_batch, offsets))
+        else:
+            for offset in offsets:
+                fetch_batch(offset)
+        return columns
+
+    def _fetch_cached(self, endpoint, locations, first, n_hours):
+        url = self.url(endpoint)
+        variables = ENDPOINTS[endpoint]["variables"]
+        first_day = first.floor("D")
+        offset = int((first - first_day) / HOUR)
+        n_days = -(-(offset + n_hours) // HOURS_PER_DAY)
+        values, found = self.cache.read(url, locations, variables, first_day, n_days)
+
+        # One request group per span of missing days, from the first to the last
+        spans = {}
+        for i in np.flatnonzero(~found.all(axis=1)):
+            missing = np.flatnonzero(~found[i])
+            spans.setdefault((missing[0], missing[-1] + 1), []).append(i)
+        for (lo, hi), rows in spans.items():
+            group = [locations[i] for i in rows]
+            span_first = first_day + int(lo) * DAY
+            fetched = self._fetch_columns(endpoint, group, span_first, int(hi - lo) * HOURS_PER_DAY)
+            block = np.stack([fetched[name].reshape(len(rows), -1) for name in variables], axis=1)
+            values[rows, :, lo * HOURS_PER_DAY:hi * HOURS_PER_DAY] = block
+            self.cache.write(url, group, variables, span_first, block)
+
+        window = values[:, :, offset:offset + n_hours]
+        return {name: window[:, j].reshape(-1) for j, name in enumerate(variables)}
+
+
+class PooledFetcher(HourlyFetcher):
+    """Fetcher talking FlatBuffers to the Open-Meteo API over a pooled session.
+
+    ``urls`` overrides endpoint URLs (e.g. to point at ``openmeteo_stub.serve_stub``).
+    """
+
+    def __init__(self, batch_size=50, max_workers=8, retries=5, backoff_factor=0.2,
+                 timeout=60, urls=None, cache=None):
+        super().__init__(batch_size, max_workers, cache)
+        self.session = pooled_session(max_workers, retries, backoff_factor)
+        self.timeout = timeout
+        self.urls = urls or {}
+
+    def url(self, endpoint):
+        return self.urls.get(endpoint, ENDPOINTS[endpoint]["url"])
+
+    def _request(self, url, params):
+        query = {key: ",".join(map(str, value)) if isinstance(value, list) else value
+                 for key, value in params.items()}
+        query["format"] = "flatbuffers"
+        response = self.session.get(url, params=query, timeout=self.timeout)
+        response.raise_for_status()
+        return decode_flatbuffers(response.content)
+
+
+class ClientFetcher(HourlyFetcher):
+    """Fetcher delegating to an ``openmeteo_requests``-style client (or the stub)."""
+
+    def __init__(self, client, batch_size=50, max_workers=1, cache=None):
+        super().__init__(batch_size, max_workers, cache)
+        self.client = client
+
+    def _request(self, url, params):
+        return self.client.weather_api(url, params=params)
+
+
+def _fill_columns(columns, row_offset, n_hours, first_epoch, hourly, variables):
+    # Place the response on the requested hour grid, whatever window it covers
+    shift = (hourly.Time() - first_epoch) // hourly.Interval()
+    for i, name in enumerate(variables):
+        values = hourly.Variables(i).ValuesAsNumpy()
+        lo, hi = max(shift, 0), min(shift + len(values), n_hours)
+        if hi > lo:
+            columns[name][row_offset + lo:row_offset + hi] = values[lo - shift:hi - shift]
+
+
+def _columnar_frame(locations, first, n_hours, columns):
+    n_locations = len(locations)
+    hours = pd.date_range(first, periods=n_hours, freq="h")
+    location_codes = np.repeat(np.arange(n_locations), n_hours)
+    return pd.DataFrame({
+        "date": hours[np.tile(np.arange(n_hours), n_locations)],
+        **columns,
+        "city": pd.Categorical.from_codes(location_codes, [loc["city"] for loc in locations]),
+        "country": np.repeat([loc.get("country", "") for loc in locations], n_hours),
+        "lat": np.repeat([loc["lat"] for loc in locations], n_hours),
+        "lon": np.repeat([loc["lon"] for loc in locations], n_hours),
+    })
+
+
+def append_partitions(endpoint, df, store_dir=STORE_DIR):
+    """Merge one city's new hours into its monthly partitions; returns rows added."""
+    df = df.astype({"city": str, "country": str})
+    city_dir = _city_dir(store_dir, endpoint, df["city"].iloc[0])
+    city_dir.mkdir(parents=True, exist_ok=True)
+
+    added = 0
+    for month, part in df.groupby(df["date"].dt.strftime("%Y-%m"), sort=True):
+        path = city_dir / f"{month}.parquet"
+        if path.exists():
+            existing = pd.read_parquet(path)
+            before = len(existing)
+            part = (
+                pd.concat([existing, part], ignore_index=True)
+                .drop_duplicates("date", keep="last")
+                .sort_values("date", ignore_index=True)
+            )
+            added += len(part) - before
+        else:
+            added += len(part)
+        _write_atomic(part, path)
+    return added
+
+
+def refresh(endpoints=tuple(ENDPOINTS), locations=LOCATIONS, start=DEFAULT_START,
+            end=None, fetcher=None, store_dir=STORE_DIR):
+    """Bring the store up to ``end`` (default: the current hour, UTC).
+
+    Only hours after each city's high-water mark are requested; cities that
+    share the same missing window are fetched together by ``fetcher``
+    (default: a ``PooledFetcher`` with the response cache). Returns the number of rows added per
+    endpoint and city.
+    """
+    fetcher = fetcher or PooledFetcher(cache=ResponseCache())
+    start = pd.Timestamp(start, tz="UTC")
+    end = pd.Timestamp.now(tz="UTC") if end is None else pd.Timestamp(end, tz="UTC")
+    end = end.floor("h")
+
+    summary = {}
+    for endpoint in endpoints:
+        state = read_state(endpoint, store_dir)
+
+        windows = {}
+        for location in locations:
+            window = missing_window(state.get(location["city"]), start, end)
+            if window is not None:
+                windows.setdefault(window, []).append(location)
+
+        added = {}
+        for (first, last), group in windows.items():
+            frame = fetcher.fetch(endpoint, group, first, last)
+            received = frame[ENDPOINTS[endpoint]["variables"]].notna().any(axis=1)
+            for city, df in frame.groupby("city", observed=True, sort=False):
+                added[city] = append_partitions(endpoint, df, store_dir)
+                # Hours the API left empty are fetched again next time
+                if received[df.index].any():
+                    state[city] = df.loc[received[df.index], "date"].iloc[-1]
+                # Persist after every city so an interrupted run resumes cleanly
+                write_state(endpoint, state, store_dir)
+        summary[endpoint] = added
+    return summary
+
+
+def read_store(endpoint, cities=None, store_dir=STORE_DIR):
+    """Load the stored hourly rows for an endpoint (optionally only some cities)."""
+    endpoint_dir = Path(store_dir) / endpoint
+    city_dirs = sorted(endpoint_dir.glob("city=*"))
+    if cities is not None:
+        wanted = {f"city={city}" for city in cities}
+        city_dirs = [d for d in city_dirs if d.name in wanted]
+
+    parts = [pd.read_parquet(path) for d in city_dirs for path in sorted(d.glob("*.parquet"))]
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat(parts, ignore_index=True)
+
+
+def export_csv(endpoints=tuple(ENDPOINTS), store_dir=STORE_DIR, datasets_dir=DATASETS_DIR):
+    """Write the hourly CSVs the ETL notebook reads from the store contents."""
+    for endpoint in endpoints:
+        df = read_store(endpoint, store_dir=store_dir)
+        if not df.empty:
+            df.to_csv(Path(datasets_dir) / ENDPOINTS[endpoint]["csv"], index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental Open-Meteo ingestion")
+    parser.add_argument("--start", default=DEFAULT_START,
+                        help="first hour to hold for cities not yet in the store")
+    parser.add_argument("--end", default=None, help="last hour to fetch (default: now)")
+    parser.add_argument("--offline", action="store_true",
+                        help="use the deterministic stub client instead of the API")
+    parser.add_argument("--batch-size", type=int, default=50,
+                        help="locations per API request")
+    parser.add_argument("--max-workers", type=int, default=8,
+                        help="concurrent API requests")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="request every day from the API instead of reusing cached ones")
+    parser.add_argument("--export-csv", action="store_true",
+                        help="rewrite air_quality_df.csv/weather_df.csv from the store")
+    args = parser.parse_args()
+
+    if args.offline:
+        # Stub values are not cached, they would be served for the real endpoint
+        from src.openmeteo_stub import StubOpenMeteoClient
+        fetcher = ClientFetcher(StubOpenMeteoClient(), batch_size=args.batch_size)
+    else:
+        cache = None if args.no_cache else ResponseCache()
+        fetcher = PooledFetcher(batch_size=args.batch_size, max_workers=args.max_workers, cache=cache)
+
+    summary = refresh(start=args.start, end=args.end, fetcher=fetcher)
+    for endpoint, added in summary.items():
+        print(f"{endpoint}: {sum(added.values()):,} new rows across {len(added)} cities")
+    if args.export_csv:
+        export_csv()
+
+
+if __name__ == "__main__":
+    main()
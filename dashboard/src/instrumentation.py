@@ -0,0 +1,295 @@
+"""Timings, cache counters and memory deltas for the dashboard's hot paths.
+
+``timed(name)`` is a context manager and decorator that records the wall time
+and resident-memory change of a block. ``cached(name, cache)`` wraps a
+``st.cache_data``/``st.cache_resource`` loader so its calls and misses are
+counted (a miss is a call that ran the function body). Every page starts an
+``instrument_page`` run at the top and finishes it at the bottom.
+
+Samples go to a process-wide recorder (the last ``SAMPLES`` per name, for
+p50/p95) and to the current session. Adding ``?diagnostics=1`` to any page's
+URL shows both below the page, with JSON and Prometheus text downloads.
+"""
+import functools
+import json
+import os
+import threading
+from collections import Counter, defaultdict, deque
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+SAMPLES = 1024
+SESSION_SAMPLES = 256
+SESSION_KEY = "_instrumentation"
+DIAGNOSTICS_PARAM = "diagnostics"
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+
+def rss_bytes():
+    """Current resident set size, or NaN where ``/proc`` is not available."""
+    if _PAGE_SIZE is None:
+        return float("nan")
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return float("nan")
+
+
+class Recorder:
+    """Thread-safe store of timing samples and cache counters."""
+
+    def __init__(self, samples=SAMPLES):
+        self.samples = samples
+        self._seconds = defaultdict(lambda: deque(maxlen=self.samples))
+        self._memory = defaultdict(lambda: deque(maxlen=self.samples))
+        self._count = Counter()
+        self._total = Counter()
+        self.calls = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, memory_delta):
+        with self._lock:
+            self._seconds[name].append(seconds)
+            self._memory[name].append(memory_delta)
+            self._count[name] += 1
+            self._total[name] += seconds
+
+    def call(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    def miss(self, name):
+        with self._lock:
+            self.misses[name] += 1
+
+    def timings(self):
+        """p50/p95/max milliseconds and mean memory delta per name, over the retained samples."""
+        with self._lock:
+            samples = {name: (list(values), list(self._memory[name]), self._count[name])
+                       for name, values in self._seconds.items()}
+        return timing_table(samples)
+
+    def caches(self):
+        with self._lock:
+            rows = {name: {"calls": calls, "misses": self.misses[name]}
+                    for name, calls in self.calls.items()}
+        table = pd.DataFrame.from_dict(rows, orient="index", columns=["calls", "misses"])
+        table.insert(1, "hits", table["calls"] - table["misses"])
+        table["hit_rate"] = table["hits"] / table["calls"].where(table["calls"] > 0)
+        return table.rename_axis("name").sort_index()
+
+    def to_dict(self):
+        with self._lock:
+            count, total = dict(self._count), dict(self._total)
+        timings = self.timings()
+        return {
+            "rss_bytes": rss_bytes(),
+            "timings": {
+                name: {**row, "total_count": count[name], "total_seconds": total[name]}
+                for name, row in timings.to_dict(orient="index").items()
+            },
+            "caches": self.caches().to_dict(orient="index"),
+        }
+
+    def prometheus(self, prefix="air_quality_dashboard"):
+        """The recorder in the Prometheus text exposition format."""
+        data = self.to_dict()
+        lines = [
+            f"# HELP {prefix}_duration_seconds Wall time of instrumented blocks.",
+            f"# TYPE {prefix}_duration_seconds summary",
+        ]
+        for name, row in data["timings"].items():
+            label = f'name="{name}"'
+            lines.append(f'{prefix}_duration_seconds{{{label},quantile="0.5"}} {row["p50_ms"] / 1e3:.6g}')
+            lines.append(f'{prefix}_duration_seconds{{{label},quantile="0.95"}} {row["p95_ms"] / 1e3:.6g}')
+            lines.append(f'{prefix}_duration_seconds_sum{{{label}}} {row["total_seconds"]:.6g}')
+            lines.append(f'{prefix}_duration_seconds_count{{{label}}} {row["total_count"]}')
+        lines += [
+            f"# HELP {prefix}_cache_requests_total Cached loader calls by result.",
+            f"# TYPE {prefix}_cache_requests_total counter",
+        ]
+        for name, row in data["caches"].items():
+            lines.append(f'{prefix}_cache_requests_total{{name="{name}",result="hit"}} {row["hits"]}')
+            lines.append(f'{prefix}_cache_requests_total{{name="{name}",result="miss"}} {row["misses"]}')
+        lines += [
+            f"# HELP {prefix}_resident_memory_bytes Resident set size of the server process.",
+            f"# TYPE {prefix}_resident_memory_bytes gauge",
+            f"{prefix}_resident_memory_bytes {data['rss_bytes']:.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def timing_table(samples):
+    """Summary frame of ``{name: (seconds, memory deltas, count)}``."""
+    rows = {}
+    for name, (seconds, memory, count) in samples.items():
+        if not seconds:
+            continue
+        p50, p95 = np.percentile(seconds, [50, 95])
+        rows[name] = {
+            "count": count,
+            "p50_ms": p50 * 1e3,
+            "p95_ms": p95 * 1e3,
+            "max_ms": max(seconds) * 1e3,
+            "memory_delta_mb": np.nanmean(memory) / 2**20 if not np.isnan(memory).all() else np.nan,
+        }
+    columns = ["count", "p50_ms", "p95_ms", "max_ms", "memory_delta_mb"]
+    return pd.DataFrame.from_dict(rows, orient="index", columns=columns).rename_axis("name").sort_index()
+
+
+def json_safe(value):
+    """``value`` with NaN and infinities replaced by None, so ``json.dumps`` writes valid JSON."""
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, (float, np.floating)):
+        return float(value) if np.isfinite(value) else None
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+@st.cache_resource(show_spinner=False)
+def recorder():
+    """The process-wide recorder."""
+    return Recorder()
+
+
+def session_recorder():
+    """The current session's recorder, or None outside a script run (CLIs, benchmarks)."""
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    if SESSION_KEY not in st.session_state:
+        st.session_state[SESSION_KEY] = Recorder(SESSION_SAMPLES)
+    return st.session_state[SESSION_KEY]
+
+
+def _recorders():
+    session = session_recorder()
+    return (recorder(),) if session is None else (recorder(), session)
+
+
+def _record(name, seconds, memory_delta):
+    for store in _recorders():
+        store.record(name, seconds, memory_delta)
+
+
+class timed:
+    """Record the wall time and RSS change of a block, as ``with timed(name):`` or ``@timed(name)``."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self._rss = rss_bytes()
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _record(self.name, perf_counter() - self._start, rss_bytes() - self._rss)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # A fresh instance per call, so concurrent sessions do not share state
+            with timed(self.name):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def count_call(name, miss=False):
+    """Count a call (and a miss) of a cache that is not wrapped with ``cached``."""
+    for store in _recorders():
+        store.call(name)
+        if miss:
+            store.miss(name)
+
+
+def cached(name, cache):
+    """Apply ``cache`` (e.g. ``st.cache_data(...)``) and count its calls, misses and latency as ``name``."""
+    def decorate(func):
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            for store in _recorders():
+                store.miss(name)
+            return func(*args, **kwargs)
+
+        cached_body = cache(body)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for store in _recorders():
+                store.call(name)
+            with timed(f"cache.{name}"):
+                return cached_body(*args, **kwargs)
+
+        wrapper.clear = cached_body.clear
+        return wrapper
+    return decorate
+
+
+class instrument_page:
+    """Time one run of a page script; call ``finish()`` as its last statement.
+
+    Pages that render one of several views name it with ``view()``, so each
+    view gets its own timings.
+    """
+
+    def __init__(self, page):
+        self._timer = timed(f"page.{page}").__enter__()
+
+    def view(self, name):
+        self._timer.name = f"{self._timer.name}[{name.strip()}]"
+
+    def finish(self):
+        self._timer.__exit__(None, None, None)
+        if st.query_params.get(DIAGNOSTICS_PARAM):
+            render_diagnostics()
+
+
+def render_diagnostics():
+    """Timings, cache counters and exports, appended below the current page."""
+    from src.chart_cache import chart_cache
+
+    store = recorder()
+    st.divider()
+    st.header("Diagnostics")
+
+    charts = chart_cache()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Resident memory", f"{rss_bytes() / 2**20:,.0f} MB")
+    col2.metric("Chart cache", f"{len(charts)} charts, {charts.size / 2**20:.1f} MB")
+    col3.metric("Chart cache hits / misses", f"{charts.hits} / {charts.misses}")
+
+    st.subheader("All sessions")
+    st.dataframe(store.timings().round(2), use_container_width=True)
+    st.subheader("This session")
+    session = session_recorder()
+    if session is not None:
+        st.dataframe(session.timings().round(2), use_container_width=True)
+    st.subheader("Cached loaders")
+    col1, col2 = st.columns(2)
+    col1.caption("All sessions")
+    col1.dataframe(store.caches().round(3), use_container_width=True)
+    if session is not None:
+        col2.caption("This session")
+        col2.dataframe(session.caches().round(3), use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    col1.download_button("Export JSON", json.dumps(json_safe(store.to_dict()), indent=2, allow_nan=False),
+                         file_name="dashboard_metrics.json", mime="application/json")
+    col2.download_button("Export Prometheus text", store.prometheus(),
+                         file_name="dashboard_metrics.prom", mime="text/plain")
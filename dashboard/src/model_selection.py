@@ -0,0 +1,164 @@
+"""Parallel KMeans model selection (elbow and silhouette sweep).
+
+Reusable form of the k sweep in ``notebooks/04_etl_modeling.ipynb``. The
+features are scaled and PCA-projected once; the projected matrix is placed in
+shared memory and every k is fitted in its own worker process, which attaches
+to that block instead of receiving a pickled copy. Silhouette scores are
+computed on a fixed random sample once n is large, since the exact score is
+quadratic in n.
+
+Run from the ``dashboard`` folder::
+
+    python -m src.model_selection                   # daily dataset, k = 1..10
+    python -m src.model_selection --source hourly   # ingestion store, hourly rows
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+from sklearn.metrics import silhouette_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+
+from src.data_management import load_daily
+
+
+CLUSTER_FEATURES = [
+    "temperature_2m", "relative_humidity_2m", "precipitation",
+    "wind_speed_10m", "surface_pressure",
+    "pm2_5", "pm10", "us_aqi", "ozone",
+    "nitrogen_dioxide", "sulphur_dioxide", "carbon_monoxide", "carbon_dioxide",
+]
+N_COMPONENTS = 5
+DEFAULT_KS = range(1, 11)
+SILHOUETTE_SAMPLE = 10_000
+RESULTS_CSV = Path(__file__).resolve().parents[2] / "models" / "kmeans_sweep.csv"
+
+# Set in each worker by _attach
+_shared = {}
+
+
+def project(X, n_components=N_COMPONENTS, random_state=0):
+    """Scale and PCA-project the features once for the whole sweep."""
+    steps = Pipeline([
+        ("scaler", StandardScaler()),
+        ("pca", PCA(n_components=n_components, random_state=random_state)),
+    ])
+    return np.ascontiguousarray(steps.fit_transform(X), dtype=np.float64)
+
+
+def _attach(name, shape, dtype, threads):
+    block = shared_memory.SharedMemory(name=name)
+    _shared["block"] = block
+    _shared["matrix"] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    # One process per k already fills the cores; keep each fit single-threaded
+    _shared["threads"] = threadpool_limits(limits=threads)
+
+
+def evaluate_k(k, matrix=None, silhouette_sample=SILHOUETTE_SAMPLE, random_state=0):
+    """Fit KMeans with ``k`` clusters and score it; returns one results row."""
+    matrix = _shared["matrix"] if matrix is None else matrix
+    start = perf_counter()
+    model = KMeans(n_clusters=k, random_state=random_state).fit(matrix)
+    fit_seconds = perf_counter() - start
+
+    silhouette = np.nan
+    start = perf_counter()
+    if 1 < k < len(matrix):
+        sample_size = silhouette_sample if len(matrix) > silhouette_sample else None
+        silhouette = silhouette_score(matrix, model.labels_, sample_size=sample_size,
+                                      random_state=random_state)
+    silhouette_seconds = perf_counter() - start
+
+    sizes = np.bincount(model.labels_, minlength=k)
+    return {
+        "k": k,
+        "inertia": model.inertia_,
+        "silhouette": silhouette,
+        "smallest_cluster_share": sizes.min() / len(matrix),
+        "fit_seconds": fit_seconds,
+        "silhouette_seconds": silhouette_seconds,
+    }
+
+
+def sweep(matrix, ks=DEFAULT_KS, max_workers=None, silhouette_sample=SILHOUETTE_SAMPLE,
+          random_state=0):
+    """Evaluate every k in ``ks`` on ``matrix`` across a process pool.
+
+    Returns a frame with inertia (elbow), silhouette, the share of the
+    smallest cluster and the fit and scoring time of each k.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+    ks = list(ks)
+    max_workers = max_workers or min(len(ks), os.cpu_count() or 1)
+    if max_workers == 1:
+        rows = [evaluate_k(k, matrix, silhouette_sample, random_state) for k in ks]
+        return pd.DataFrame(rows).set_index("k")
+
+    block = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+    try:
+        np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=block.buf)[:] = matrix
+        threads = max(1, (os.cpu_count() or 1) // max_workers)
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_attach,
+            initargs=(block.name, matrix.shape, matrix.dtype, threads),
+        ) as pool:
+            # Largest k first: they take longest, so the pool drains evenly
+            futures = [pool.submit(evaluate_k, k, None, silhouette_sample, random_state)
+                       for k in sorted(ks, reverse=True)]
+            rows = [future.result() for future in futures]
+    finally:
+        block.close()
+        block.unlink()
+    return pd.DataFrame(rows).set_index("k").sort_index()
+
+
+def daily_features():
+    return load_daily()[CLUSTER_FEATURES].dropna()
+
+
+def hourly_features():
+    """Hourly weather and air-quality rows from the ingestion store, joined on city and hour."""
+    from src.ingestion import read_store
+
+    air_quality = read_store("air_quality")
+    weather = read_store("weather")
+    columns = ["city", "date"]
+    merged = pd.merge(
+        air_quality[columns + [col for col in CLUSTER_FEATURES if col in air_quality.columns]],
+        weather[columns + [col for col in CLUSTER_FEATURES if col in weather.columns]],
+        on=columns, how="inner",
+    )
+    return merged[CLUSTER_FEATURES].dropna()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel KMeans k sweep")
+    parser.add_argument("--source", choices=["daily", "hourly"], default="daily")
+    parser.add_argument("--k-min", type=int, default=min(DEFAULT_KS))
+    parser.add_argument("--k-max", type=int, default=max(DEFAULT_KS))
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--silhouette-sample", type=int, default=SILHOUETTE_SAMPLE)
+    parser.add_argument("--output", type=Path, default=RESULTS_CSV)
+    args = parser.parse_args()
+
+    X = daily_features() if args.source == "daily" else hourly_features()
+    start = perf_counter()
+    results = sweep(project(X), range(args.k_min, args.k_max + 1), args.max_workers,
+                    args.silhouette_sample)
+    results.to_csv(args.output)
+    print(results.to_string(float_format="{:.4f}".format))
+    print(f"{len(X):,} rows swept in {perf_counter() - start:.1f}s, results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Serve the persisted KMeans regime pipeline to the dashboard.
+
+The pipeline (StandardScaler -> PCA(5) -> KMeans(4)) saved by
+``notebooks/04_etl_modeling.ipynb`` is loaded once per process, and the daily
+dataset is scored in a single batched ``predict`` call whose labels are cached
+per dataset version, so page reruns never re-score. The labels are also kept
+in the shared disk cache under the dataset and model content hashes, so other
+processes and replicas skip both the model load and the scoring. The loaded
+model is cached per model content hash too, so a retrained model is picked up
+without a restart and never scores under another model's key.
+
+When the NumPy artifact exported by ``src.regime_artifact`` matches the
+pickle, it is served instead, and sklearn is never imported.
+"""
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.data_management import dataset_digest, dataset_version, load_daily
+from src.disk_cache import cache_key, disk_cache, file_digest
+from src.instrumentation import cached
+from src.regime_artifact import REGIME_ARTIFACT_PATH, REGIME_MODEL_PATH, RegimeArtifact, file_sha256
+
+
+def _current_artifact(path, artifact_path):
+    """The exported artifact, or None when it is missing, unreadable, of another format or from another pickle."""
+    if not Path(artifact_path).exists():
+        return None
+    try:
+        artifact = RegimeArtifact.load(artifact_path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if Path(path).exists() and artifact.source_sha256 != file_sha256(path):
+        return None
+    return artifact
+
+
+def _model_digests(path, artifact_path):
+    """Content hashes of the pickle and the artifact, None for a missing file."""
+    return tuple(file_digest(p) if Path(p).exists() else None for p in (path, artifact_path))
+
+
+@cached("model.load_regime_model", st.cache_resource(show_spinner=False, max_entries=2))
+def _load_regime_model(path, artifact_path, digests):
+    # ``digests`` key the cache, so a retrained or re-exported model is loaded again
+    start = perf_counter()
+    model = _current_artifact(path, artifact_path)
+    if model is None:
+        import joblib
+
+        model = joblib.load(path, mmap_mode="r")
+    return model, perf_counter() - start
+
+
+def load_regime_model(path=REGIME_MODEL_PATH, artifact_path=REGIME_ARTIFACT_PATH):
+    """Load the regime model once per process and model content; returns ``(model, load_seconds)``.
+
+    The NumPy artifact is preferred. Otherwise the pickle is loaded with
+    ``mmap_mode``, so the fitted arrays are memory-mapped from the file rather
+    than copied into every worker.
+    """
+    return _load_regime_model(str(path), str(artifact_path), _model_digests(path, artifact_path))
+
+
+def _feature_means(model):
+    if isinstance(model, RegimeArtifact):
+        return model.feature_means
+    return model.steps[0][1].mean_
+
+
+def regime_features(df, model):
+    """Build the model input matrix in the column order the pipeline was fit on.
+
+    The persisted pipeline was fit with an extra ``Cluster`` column (labels
+    from an earlier fit). Any input the frame does not carry is filled with the
+    scaler's training mean, which scales to zero and so does not pull rows
+    towards any cluster.
+    """
+    features = list(model.feature_names_in_)
+    means = _feature_means(model)
+    columns = {}
+    for i, name in enumerate(features):
+        if name in df.columns:
+            columns[name] = df[name].to_numpy(dtype=np.float64)
+        else:
+            columns[name] = np.full(len(df), means[i])
+    return pd.DataFrame(columns, index=df.index)
+
+
+def predict_regimes(df, model=None):
+    """Score every row of ``df`` in one batched call; returns int8 cluster ids."""
+    if model is None:
+        model, _ = load_regime_model()
+    return model.predict(regime_features(df, model)).astype(np.int8)
+
+
+@cached("model.score_daily", st.cache_data(show_spinner=False, max_entries=4))
+def _score_daily(version, digests):
+    key = cache_key(dataset_digest(), *digests)
+    entry = disk_cache().get("model.regimes", key)
+    if entry is not None:
+        arrays, report = entry
+        return arrays["labels"], report
+
+    # The model of these digests, so the labels are stored under the model that made them
+    model, load_seconds = _load_regime_model(str(REGIME_MODEL_PATH), str(REGIME_ARTIFACT_PATH), digests)
+    df = load_daily()
+
+    start = perf_counter()
+    labels = predict_regimes(df, model)
+    predict_seconds = perf_counter() - start
+
+    report = {
+        "model_format": "npz" if isinstance(model, RegimeArtifact) else "pickle",
+        "rows": len(df),
+        "load_seconds": load_seconds,
+        "predict_seconds": predict_seconds,
+        "rows_per_second": len(df) / predict_seconds if predict_seconds else float("inf"),
+    }
+    if _model_digests(REGIME_MODEL_PATH, REGIME_ARTIFACT_PATH) == digests:
+        # Not when a file was replaced during the load: the model may be the new one
+        disk_cache().put("model.regimes", key, {"labels": labels}, report)
+    return labels, report
+
+
+def daily_regime_clusters():
+    """Cluster ids for the shared daily frame plus the serving cost report.
+
+    Returns ``(labels, report)`` where ``labels`` is aligned with
+    ``load_daily()`` and ``report`` holds the model load time and the
+    throughput of the batched predict that produced the labels.
+    """
+    return _score_daily(dataset_version(), _model_digests(REGIME_MODEL_PATH, REGIME_ARTIFACT_PATH))
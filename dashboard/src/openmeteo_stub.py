@@ -0,0 +1,200 @@
+"""Offline stand-ins for the Open-Meteo API used by the ingestion pipeline.
+
+``StubOpenMeteoClient.weather_api`` accepts the same ``url``/``params`` as
+``openmeteo_requests.Client`` and returns objects with the same accessor
+methods (``Hourly().Variables(i).ValuesAsNumpy()`` and friends).
+``serve_stub()`` starts a local HTTP server answering with real FlatBuffer
+payloads, for exercising the pooled HTTP fetcher without network access.
+
+Values are a deterministic function of location, variable and timestamp, so
+refetching an hour always yields the same numbers.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import flatbuffers
+import numpy as np
+import pandas as pd
+
+
+HOUR = 3600
+
+
+class _Values:
+    def __init__(self, values):
+        self._values = values
+
+    def ValuesAsNumpy(self):
+        return self._values
+
+
+class _Hourly:
+    def __init__(self, start, end, variables):
+        self._start = start
+        self._end = end
+        self._variables = variables
+
+    def Time(self):
+        return self._start
+
+    def TimeEnd(self):
+        return self._end
+
+    def Interval(self):
+        return HOUR
+
+    def VariablesLength(self):
+        return len(self._variables)
+
+    def Variables(self, i):
+        return _Values(self._variables[i])
+
+
+class _Response:
+    def __init__(self, lat, lon, hourly):
+        self._lat = lat
+        self._lon = lon
+        self._hourly = hourly
+
+    def Latitude(self):
+        return self._lat
+
+    def Longitude(self):
+        return self._lon
+
+    def Elevation(self):
+        return 0.0
+
+    def UtcOffsetSeconds(self):
+        return 0
+
+    def Hourly(self):
+        return self._hourly
+
+
+def _epoch(value):
+    return int(pd.Timestamp(value, tz="UTC").timestamp())
+
+
+def request_window(params):
+    """Epoch seconds ``(start, end)`` of the hours a request covers, end exclusive."""
+    if "start_hour" in params:
+        return _epoch(params["start_hour"]), _epoch(params["end_hour"]) + HOUR
+    return _epoch(params["start_date"]), _epoch(params["end_date"]) + 24 * HOUR
+
+
+def synthetic_values(lat, lon, variable_index, times):
+    """Smooth, strictly positive hourly series unique to a location and variable."""
+    phase = (lat * 7.0 + lon * 3.0 + variable_index) % (2 * np.pi)
+    daily = np.sin(2 * np.pi * (times % 86400) / 86400 + phase)
+    slow = np.cos(2 * np.pi * times / (86400 * 17.0) + phase)
+    level = 10.0 * (variable_index + 1)
+    return (level * (1.5 + 0.4 * daily + 0.3 * slow)).astype(np.float32)
+
+
+class StubOpenMeteoClient:
+    """In-process client; every call is recorded in ``calls``."""
+
+    def __init__(self):
+        self.calls = []
+
+    def weather_api(self, url, params):
+        self.calls.append((url, dict(params)))
+        start, end = request_window(params)
+        times = np.arange(start, end, HOUR, dtype=np.int64)
+        variables = params["hourly"]
+
+        responses = []
+        for lat, lon in zip(params["latitude"], params["longitude"]):
+            values = [synthetic_values(lat, lon, i, times) for i in range(len(variables))]
+            responses.append(_Response(lat, lon, _Hourly(start, end, values)))
+        return responses
+
+
+def encode_response(lat, lon, start, end, values):
+    """One length-prefixed ``WeatherApiResponse`` message with hourly variables."""
+    builder = flatbuffers.Builder(1024 + sum(v.nbytes for v in values))
+
+    variables = []
+    for array in values:
+        vector = builder.CreateNumpyVector(np.asarray(array, dtype=np.float32))
+        builder.StartObject(13)                               # VariableWithValues
+        builder.PrependUOffsetTRelativeSlot(3, vector, 0)     # values
+        variables.append(builder.EndObject())
+
+    builder.StartVector(4, len(variables), 4)
+    for offset in reversed(variables):
+        builder.PrependUOffsetTRelative(offset)
+    variables_vector = builder.EndVector()
+
+    builder.StartObject(4)                                    # VariablesWithTime
+    builder.PrependInt64Slot(0, start, 0)                     # time
+    builder.PrependInt64Slot(1, end, 0)                       # time_end
+    builder.PrependInt32Slot(2, HOUR, 0)                      # interval
+    builder.PrependUOffsetTRelativeSlot(3, variables_vector, 0)
+    hourly = builder.EndObject()
+
+    builder.StartObject(15)                                   # WeatherApiResponse
+    builder.PrependFloat32Slot(0, lat, 0.0)                   # latitude
+    builder.PrependFloat32Slot(1, lon, 0.0)                   # longitude
+    builder.PrependUOffsetTRelativeSlot(11, hourly, 0)        # hourly
+    builder.Finish(builder.EndObject())
+
+    payload = builder.Output()
+    return len(payload).to_bytes(4, "little") + payload
+
+
+def _list_param(query, name):
+    return [item for value in query.get(name, []) for item in value.split(",")]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, so pooled connections are reused
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        params = {key: values[0] for key, values in query.items()}
+        latitudes = [float(v) for v in _list_param(query, "latitude")]
+        longitudes = [float(v) for v in _list_param(query, "longitude")]
+        variables = _list_param(query, "hourly")
+
+        start, end = request_window(params)
+        times = np.arange(start, end, HOUR, dtype=np.int64)
+        body = b"".join(
+            encode_response(lat, lon, start, end,
+                            [synthetic_values(lat, lon, i, times) for i in range(len(variables))])
+            for lat, lon in zip(latitudes, longitudes)
+        )
+
+        server = self.server
+        time.sleep(server.latency + server.latency_per_location * len(latitudes))
+        with server.lock:
+            server.requests += 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stub(latency=0.0, latency_per_location=0.0, host="127.0.0.1", port=0):
+    """Start the mock API in a daemon thread; returns ``(server, base_url)``.
+
+    ``latency`` (plus ``latency_per_location`` for each coordinate in the
+    request) is slept before answering, to mimic a remote API. Call
+    ``server.shutdown()`` when done; ``server.requests`` counts requests served.
+    """
+    server = ThreadingHTTPServer((host, port), _StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.latency_per_location = latency_per_location
+    server.requests = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,156 @@
+"""Out-of-core daily dataset: hive-partitioned Parquet scanned lazily.
+
+The ETL writes the daily frame as ``datasets/daily/year=<yyyy>/`` partitions,
+sorted by city and day, plus a ``_version`` marker. Reads go through
+``pyarrow.dataset`` with the requested columns and a filter on city, year and
+date pushed down: years outside the filter are never opened, row groups whose
+city and date statistics miss the filter are skipped, and columns a chart
+does not need are never decoded. Partitioning by year rather than by station
+keeps files large when there are thousands of stations.
+
+Run from the ``dashboard`` folder to convert an existing CSV::
+
+    python -m src.partitioned
+"""
+import argparse
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from src.data_management import (
+    CATEGORICAL_COLS, DAILY_CSV, DATE_COL, PARTITIONED_DIR, dataset_version,
+    to_daily_schema,
+)
+from src.instrumentation import cached, timed
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:  # only the in-memory backend is available without pyarrow
+    pa = None
+    pc = None
+    ds = None
+
+
+VERSION_MARKER = "_version"
+PARTITION_COLS = ["year"]
+# Rows are sorted by city, so each row group covers a narrow band of cities and
+# the row-group statistics let a city filter skip the rest of the file
+ROWS_PER_GROUP = 32_768
+
+
+def write_partitioned(df, root=PARTITIONED_DIR):
+    """Replace the partitioned dataset with ``df``.
+
+    The new dataset is written next to the old one and swapped in with a
+    rename, and the version marker is part of it, so readers see either the
+    old or the new version.
+    """
+    root = Path(root)
+    token = uuid.uuid4().hex
+    staging = root.with_name(f".{root.name}-{token}")
+    retired = root.with_name(f".{root.name}-old-{token}")
+
+    frame = df.assign(year=df[DATE_COL].dt.year.astype("int16"), city=df["city"].astype(str))
+    frame = frame.sort_values(["year", "city", DATE_COL], kind="stable")
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    ds.write_dataset(
+        table, staging, format="parquet",
+        partitioning=PARTITION_COLS, partitioning_flavor="hive",
+        basename_template="part-{i}.parquet",
+        min_rows_per_group=ROWS_PER_GROUP, max_rows_per_group=ROWS_PER_GROUP,
+    )
+    (staging / VERSION_MARKER).write_text(pd.Timestamp.now(tz="UTC").isoformat())
+
+    if root.exists():
+        os.replace(root, retired)
+    os.replace(staging, root)
+    shutil.rmtree(retired, ignore_errors=True)
+    return root
+
+
+@cached("partitioned.open_dataset", st.cache_resource(show_spinner=False, max_entries=2))
+def _open_dataset(version, root):
+    return ds.dataset(root, format="parquet", partitioning="hive")
+
+
+def open_dataset(root=PARTITIONED_DIR):
+    root = Path(root)
+    return _open_dataset(dataset_version(root / VERSION_MARKER), str(root))
+
+
+def scan_filter(cities=None, start=None, end=None):
+    """Dataset filter for a city selection and an inclusive date range."""
+    conditions = []
+    if cities is not None:
+        conditions.append(ds.field("city").isin(list(cities)))
+    if start is not None:
+        start = pd.Timestamp(start)
+        # The year condition prunes whole partitions before any file is opened
+        conditions.append(ds.field("year") >= start.year)
+        conditions.append(ds.field(DATE_COL) >= start.to_pydatetime())
+    if end is not None:
+        end = pd.Timestamp(end)
+        conditions.append(ds.field("year") <= end.year)
+        conditions.append(ds.field(DATE_COL) <= end.to_pydatetime())
+    if not conditions:
+        return None
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
+
+
+@timed("partitioned.scan")
+def scan(columns=None, cities=None, start=None, end=None, root=PARTITIONED_DIR):
+    """Typed daily rows of ``columns`` for ``cities`` between ``start`` and ``end``."""
+    dataset = open_dataset(root)
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != "year"]
+    table = dataset.to_table(columns=list(columns), filter=scan_filter(cities, start, end))
+    df = table.to_pandas()
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    if "city" in df.columns and DATE_COL in df.columns:
+        df = df.sort_values(["city", DATE_COL], kind="stable", ignore_index=True)
+    return df
+
+
+def row_count(root=PARTITIONED_DIR):
+    """Number of rows, from the Parquet footers."""
+    return open_dataset(root).count_rows()
+
+
+def cities(root=PARTITIONED_DIR):
+    """Cities present in the dataset; reads only the city column."""
+    column = open_dataset(root).to_table(columns=["city"])["city"]
+    return sorted(pc.unique(column).to_pylist())
+
+
+def date_range(root=PARTITIONED_DIR):
+    dates = open_dataset(root).to_table(columns=[DATE_COL])[DATE_COL]
+    if len(dates) == 0:
+        return None, None
+    bounds = pc.min_max(dates)
+    return pd.Timestamp(bounds["min"].as_py()), pd.Timestamp(bounds["max"].as_py())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the daily CSV as a partitioned dataset")
+    parser.add_argument("--csv", default=DAILY_CSV, type=Path)
+    parser.add_argument("--output", default=PARTITIONED_DIR, type=Path)
+    args = parser.parse_args()
+
+    df = to_daily_schema(pd.read_csv(args.csv))
+    write_partitioned(df, args.output)
+    print(f"Partitioned dataset saved to: {args.output} {df.shape}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Indexed lookups into the daily dataset.
+
+The daily frame is kept sorted by (city, date_day), so each city occupies one
+contiguous block of rows and its dates are ascending. ``DailyIndex`` records
+where each block starts and stops and binary-searches the dates inside it,
+so a (city, date range) query is two ``searchsorted`` calls and a positional
+slice of the shared frame: no mask over the whole history, no copy.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.data_management import DATE_COL, dataset_version, load_daily, out_of_core
+from src.instrumentation import cached, timed
+
+
+class DailyIndex:
+    """City -> row-range index over a frame sorted by ``key`` and ``date_col``."""
+
+    def __init__(self, df, key="city", date_col=DATE_COL):
+        keys = df[key].astype("category")
+        codes = keys.cat.codes.to_numpy()
+        dates = df[date_col].to_numpy()
+        in_order = np.all((codes[1:] > codes[:-1]) | ((codes[1:] == codes[:-1]) & (dates[1:] >= dates[:-1])))
+        if not in_order:
+            order = np.lexsort((dates, codes))
+            df = df.iloc[order].reset_index(drop=True)
+            codes, dates = codes[order], dates[order]
+
+        self.frame = df
+        self.key = key
+        self.date_col = date_col
+        self.dates = dates
+        categories = keys.cat.categories
+        starts = np.searchsorted(codes, np.arange(len(categories)), side="left")
+        stops = np.searchsorted(codes, np.arange(len(categories)), side="right")
+        self.ranges = {
+            city: (int(start), int(stop))
+            for city, start, stop in zip(categories, starts, stops)
+            if stop > start
+        }
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def cities(self):
+        """Cities present, in sorted order."""
+        return list(self.ranges)
+
+    def date_range(self):
+        if not len(self.dates):
+            return None, None
+        return pd.Timestamp(self.dates.min()), pd.Timestamp(self.dates.max())
+
+    def rows(self, city, start=None, end=None):
+        """``(first, stop)`` row positions of ``city`` between ``start`` and ``end`` inclusive."""
+        first, stop = self.ranges.get(city, (0, 0))
+        dates = self.dates[first:stop]
+        if start is not None:
+            first += int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side="left"))
+            dates = self.dates[first:stop]
+        if end is not None:
+            stop = first + int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side="right"))
+        return first, stop
+
+    def get(self, city, start=None, end=None, columns=None):
+        """Rows of ``city`` between ``start`` and ``end`` (inclusive) as a slice of the shared frame."""
+        first, stop = self.rows(city, start, end)
+        rows = self.frame.iloc[first:stop]
+        return rows if columns is None else rows[columns]
+
+    @timed("query.get_many")
+    def get_many(self, cities, start=None, end=None, columns=None):
+        """Rows of several cities, in city order; only the selected rows are copied."""
+        wanted = set(cities)
+        parts = [self.get(city, start, end, columns) for city in self.cities if city in wanted]
+        if not parts:
+            return self.get(None, columns=columns)
+        return parts[0] if len(parts) == 1 else pd.concat(parts)
+
+    @timed("query.read")
+    def read(self, columns=None, cities=None, start=None, end=None):
+        """Rows of ``columns`` (default: all), optionally limited to cities and dates."""
+        if cities is None and start is None and end is None:
+            return self.frame if columns is None else self.frame[columns]
+        return self.get_many(self.cities if cities is None else cities, start, end, columns)
+
+    def batches(self, columns=None):
+        """The rows of ``columns`` in city-aligned batches; one batch when in memory."""
+        yield self.read(columns)
+
+
+class PartitionedIndex:
+    """The ``DailyIndex`` queries over the out-of-core partitioned dataset.
+
+    Every query is a scan of just the partitions and columns it needs, so
+    nothing beyond the requested slice is held in memory.
+    """
+
+    def __init__(self, cities_per_batch=64):
+        from src import partitioned
+
+        self._store = partitioned
+        self.cities_per_batch = cities_per_batch
+        self.cities = partitioned.cities()
+        self._rows = partitioned.row_count()
+        self._date_range = partitioned.date_range()
+
+    def __len__(self):
+        return self._rows
+
+    def date_range(self):
+        return self._date_range
+
+    def get(self, city, start=None, end=None, columns=None):
+        return self.get_many([city], start, end, columns)
+
+    def get_many(self, cities, start=None, end=None, columns=None):
+        return self._store.scan(columns, list(cities), start, end)
+
+    def read(self, columns=None, cities=None, start=None, end=None):
+        return self._store.scan(columns, cities, start, end)
+
+    def batches(self, columns=None):
+        """The rows of ``columns``, ``cities_per_batch`` cities at a time."""
+        for i in range(0, len(self.cities), self.cities_per_batch):
+            yield self.read(columns, self.cities[i:i + self.cities_per_batch])
+
+
+@cached("query.daily_index", st.cache_resource(show_spinner=False, max_entries=1))
+def _daily_index(version):
+    if out_of_core():
+        return PartitionedIndex()
+    return DailyIndex(load_daily())
+
+
+def daily_index():
+    """Index over the daily dataset for the current dataset version.
+
+    In out-of-core mode queries scan the partitioned dataset instead of
+    slicing a frame in memory.
+    """
+    return _daily_index(dataset_version())
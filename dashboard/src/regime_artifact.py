@@ -0,0 +1,122 @@
+"""Versioned NumPy artifact of the KMeans regime pipeline and its predictor.
+
+The joblib pickle of the sklearn ``Pipeline`` needs sklearn imported and
+unpickled at load, and only loads cleanly under the sklearn version that
+wrote it. Scoring only needs a handful of arrays, though: the scaler's means
+and scales, the PCA mean and components, and the KMeans centroids. They are
+exported to a small ``.npz`` with a format version, and ``RegimeArtifact``
+predicts from them with NumPy alone, matching ``Pipeline.predict``.
+
+The artifact records the SHA-256 of the pickle it was exported from, so a
+retrained pickle is never shadowed by a stale artifact.
+
+Run from the ``dashboard`` folder to export the persisted pipeline::
+
+    python -m src.regime_artifact
+"""
+import argparse
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+
+MODELS_DIR = Path(__file__).resolve().parents[2] / "models"
+REGIME_MODEL_PATH = MODELS_DIR / "weather_air_regime_cluster.pkl"
+REGIME_ARTIFACT_PATH = MODELS_DIR / "weather_air_regime_cluster.npz"
+FORMAT_VERSION = 1
+
+
+def file_sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def export_artifact(pipeline, path=REGIME_ARTIFACT_PATH, source=None):
+    """Write the arrays of a fitted scaler -> PCA -> KMeans pipeline to ``path``.
+
+    ``source`` is the pickle the pipeline was loaded from; its hash is stored
+    so loaders can tell whether the artifact is still current.
+    """
+    import sklearn
+
+    scaler, pca, model = (step for _, step in pipeline.steps)
+    n_features = len(pipeline.feature_names_in_)
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+    components = pca.components_
+    if getattr(pca, "whiten", False):
+        components = components / np.sqrt(pca.explained_variance_)[:, None]
+
+    np.savez(
+        path,
+        format_version=np.int64(FORMAT_VERSION),
+        sklearn_version=np.str_(sklearn.__version__),
+        source_sha256=np.str_(file_sha256(source) if source else ""),
+        feature_names=np.asarray(pipeline.feature_names_in_, dtype=str),
+        scaler_mean=mean,
+        scaler_scale=scale,
+        pca_mean=pca.mean_,
+        pca_components=components,
+        cluster_centers=model.cluster_centers_,
+    )
+    return Path(path)
+
+
+class RegimeArtifact:
+    """Pure-NumPy regime predictor loaded from an exported ``.npz``."""
+
+    def __init__(self, arrays):
+        version = int(arrays["format_version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported regime artifact format {version}, expected {FORMAT_VERSION}")
+        self.feature_names_in_ = arrays["feature_names"]
+        self.feature_means = arrays["scaler_mean"]
+        self.source_sha256 = str(arrays["source_sha256"])
+        self.sklearn_version = str(arrays["sklearn_version"])
+        # Fold the scaler and the PCA centering into one affine map:
+        # ((x - mean) / scale - pca_mean) @ components.T == x @ weights - offset
+        components = arrays["pca_components"]
+        scale = arrays["scaler_scale"]
+        self._weights = (components / scale).T
+        self._offset = (self.feature_means / scale + arrays["pca_mean"]) @ components.T
+        self._centers = arrays["cluster_centers"]
+        self._center_norms = (self._centers ** 2).sum(axis=1)
+
+    @classmethod
+    def load(cls, path=REGIME_ARTIFACT_PATH):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) @ self._weights - self._offset
+
+    def predict(self, X):
+        """Index of the nearest centroid for every row of ``X``.
+
+        Rows with NaN raise ``ValueError`` like the sklearn pipeline does,
+        rather than all landing in cluster 0.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        missing = np.isnan(X).any(axis=1)
+        if missing.any():
+            raise ValueError(f"Input X contains NaN in {int(missing.sum())} rows")
+        projected = self.transform(X)
+        # ||z - c||^2 without the ||z||^2 term, which is the same for every centroid
+        distances = self._center_norms - 2 * projected @ self._centers.T
+        return distances.argmin(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the regime pipeline to a NumPy artifact")
+    parser.add_argument("--model", default=REGIME_MODEL_PATH, type=Path)
+    parser.add_argument("--output", default=REGIME_ARTIFACT_PATH, type=Path)
+    args = parser.parse_args()
+
+    import joblib
+
+    export_artifact(joblib.load(args.model), args.output, source=args.model)
+    print(f"Regime artifact saved to: {args.output} ({args.output.stat().st_size:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Train the KMeans regime pipeline, in memory or streamed chunk by chunk.
+
+The batch fit is the notebook's ``PipelineCluster`` (StandardScaler ->
+PCA(5) -> KMeans(4)) on the whole daily frame. The streaming fit builds the
+same three steps from ``partial_fit``-capable estimators and reads the daily
+dataset in chunks, so training memory is bounded by the chunk size rather
+than the history:
+
+1. ``StandardScaler.partial_fit`` accumulates means and variances;
+2. ``IncrementalPCA.partial_fit`` learns the components from scaled chunks,
+   while a fixed-size reservoir sample of projected rows is kept;
+3. ``MiniBatchKMeans`` is seeded from k-means++ on the reservoir and then
+   updated with ``partial_fit`` over the projected chunks for a few epochs.
+
+The daily dataset is sorted by city, so seeding from the reservoir (a uniform
+sample of all rows) keeps the first chunks' cities from owning the centroids.
+Both modes return a ``Pipeline`` with ``scaler``/``pca``/``model`` steps, so
+the artifact loads and predicts like ``weather_air_regime_cluster.pkl``.
+
+Run from the ``dashboard`` folder::
+
+    python -m src.regime_training --streaming --compare
+
+The result is written next to the served model, not over it; pass
+``--output`` with the served path to replace it.
+"""
+import argparse
+from pathlib import Path
+from time import perf_counter
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.metrics import adjusted_rand_score, silhouette_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.data_management import DAILY_CSV, load_daily, out_of_core
+from src.model_selection import CLUSTER_FEATURES, N_COMPONENTS, SILHOUETTE_SAMPLE
+from src.regime_artifact import MODELS_DIR, REGIME_MODEL_PATH, export_artifact
+
+
+N_CLUSTERS = 4
+CHUNKSIZE = 50_000
+EPOCHS = 3
+RESERVOIR_SIZE = 20_000
+# Kept apart from REGIME_MODEL_PATH so a training run never replaces the served model by default
+TRAINED_MODEL_PATH = MODELS_DIR / "weather_air_regime_cluster.trained.pkl"
+
+
+def regime_pipeline(n_components=N_COMPONENTS, n_clusters=N_CLUSTERS, random_state=0):
+    """The notebook's ``PipelineCluster``."""
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("pca", PCA(n_components=n_components, random_state=random_state)),
+        ("model", KMeans(n_clusters=n_clusters, random_state=random_state)),
+    ])
+
+
+def fit_batch(X, n_components=N_COMPONENTS, n_clusters=N_CLUSTERS, random_state=0):
+    return regime_pipeline(n_components, n_clusters, random_state).fit(X)
+
+
+def daily_chunks(columns=CLUSTER_FEATURES, chunksize=CHUNKSIZE):
+    """Daily rows of ``columns`` in chunks of at most ``chunksize``, rows with gaps dropped.
+
+    Out-of-core datasets are scanned a few cities at a time; otherwise the
+    daily CSV is read with ``chunksize``. Each call starts a new pass.
+    """
+    columns = list(columns)
+    if out_of_core():
+        from src.query import daily_index
+
+        for batch in daily_index().batches(columns):
+            for start in range(0, len(batch), chunksize):
+                yield batch.iloc[start:start + chunksize].dropna()
+        return
+    dtype = dict.fromkeys(columns, np.float32)
+    for chunk in pd.read_csv(DAILY_CSV, usecols=columns, dtype=dtype, chunksize=chunksize):
+        yield chunk[columns].dropna()
+
+
+class _Reservoir:
+    """Uniform sample of at most ``size`` rows from a stream of arrays (Algorithm R, vectorised)."""
+
+    def __init__(self, size, n_columns, random_state=0):
+        self.sample = np.empty((size, n_columns))
+        self.seen = 0
+        self.filled = 0
+        self._rng = np.random.default_rng(random_state)
+
+    def add(self, rows):
+        take = min(len(self.sample) - self.filled, len(rows))
+        self.sample[self.filled:self.filled + take] = rows[:take]
+        self.filled += take
+        rest = rows[take:]
+        if len(rest):
+            # Row i of the stream replaces a random slot with probability size / (i + 1)
+            positions = self._rng.integers(0, self.seen + take + np.arange(1, len(rest) + 1))
+            keep = positions < len(self.sample)
+            self.sample[positions[keep]] = rest[keep]
+        self.seen += len(rows)
+
+    def rows(self):
+        return self.sample[:self.filled]
+
+
+def fit_streaming(chunks=daily_chunks, n_components=N_COMPONENTS, n_clusters=N_CLUSTERS,
+                  epochs=EPOCHS, reservoir_size=RESERVOIR_SIZE, random_state=0):
+    """Fit the regime pipeline from ``chunks()``, a callable returning a fresh chunk iterator.
+
+    Every pass reads the chunks once; the scaler and PCA take one pass each and
+    KMeans ``epochs`` passes. Chunks smaller than ``n_components`` rows are
+    skipped by the PCA pass.
+    """
+    scaler = StandardScaler()
+    for chunk in chunks():
+        if len(chunk):
+            scaler.partial_fit(chunk)
+
+    pca = IncrementalPCA(n_components=n_components)
+    pending = []
+    for chunk in chunks():
+        pending.append(chunk)
+        # IncrementalPCA needs at least n_components rows per call
+        if sum(len(part) for part in pending) >= n_components:
+            pca.partial_fit(scaler.transform(pd.concat(pending)))
+            pending = []
+    if pending and sum(len(part) for part in pending) >= n_components:
+        pca.partial_fit(scaler.transform(pd.concat(pending)))
+
+    reservoir = _Reservoir(reservoir_size, n_components, random_state)
+    for chunk in chunks():
+        if len(chunk):
+            reservoir.add(pca.transform(scaler.transform(chunk)))
+    seed = KMeans(n_clusters=n_clusters, random_state=random_state).fit(reservoir.rows())
+
+    model = MiniBatchKMeans(n_clusters=n_clusters, init=seed.cluster_centers_, n_init=1,
+                            random_state=random_state)
+    for _ in range(max(epochs, 1)):
+        for chunk in chunks():
+            if len(chunk) >= n_clusters:
+                model.partial_fit(pca.transform(scaler.transform(chunk)))
+
+    return Pipeline([("scaler", scaler), ("pca", pca), ("model", model)])
+
+
+def compare(batch, streaming, X, silhouette_sample=SILHOUETTE_SAMPLE, random_state=0):
+    """Agreement and quality of two fitted regime pipelines on ``X``.
+
+    Both are scored in the batch pipeline's projected space: KMeans inertia of
+    each labelling (sum of squared distances to its own cluster means) and a
+    sampled silhouette, plus the adjusted Rand index between the labellings.
+    """
+    projected = batch[:-1].transform(X)
+    rows = {}
+    for name, pipeline in (("batch", batch), ("streaming", streaming)):
+        labels = pipeline.predict(X)
+        inertia = 0.0
+        for label in np.unique(labels):
+            members = projected[labels == label]
+            inertia += ((members - members.mean(axis=0)) ** 2).sum()
+        sample_size = silhouette_sample if len(X) > silhouette_sample else None
+        rows[name] = {
+            "inertia": inertia,
+            "silhouette": silhouette_score(projected, labels, sample_size=sample_size,
+                                           random_state=random_state),
+            "labels": labels,
+        }
+    report = pd.DataFrame(rows).T.drop(columns="labels").astype(float)
+    report["adjusted_rand"] = adjusted_rand_score(rows["batch"]["labels"], rows["streaming"]["labels"])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the KMeans regime pipeline")
+    parser.add_argument("--streaming", action="store_true",
+                        help="fit chunk by chunk instead of on the whole daily frame")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--compare", action="store_true",
+                        help="also fit in memory and report agreement with the streamed fit")
+    parser.add_argument("--output", type=Path, default=TRAINED_MODEL_PATH,
+                        help=f"pipeline path; the .npz artifact is written next to it (served model: {REGIME_MODEL_PATH})")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    if args.streaming:
+        pipeline = fit_streaming(lambda: daily_chunks(chunksize=args.chunksize), epochs=args.epochs)
+    else:
+        pipeline = fit_batch(load_daily()[CLUSTER_FEATURES].dropna())
+    print(f"Fitted in {perf_counter() - start:.2f}s")
+
+    if args.streaming and args.compare:
+        X = load_daily()[CLUSTER_FEATURES].dropna()
+        print(compare(fit_batch(X), pipeline, X).to_string(float_format="{:.4f}".format))
+
+    joblib.dump(pipeline, args.output)
+    artifact = export_artifact(pipeline, args.output.with_suffix(".npz"), source=args.output)
+    print(f"Regime pipeline saved to: {args.output} and {artifact}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Per-day cache of decoded Open-Meteo responses for the ingestion pipeline.
+
+Replaces the ``requests_cache.CachedSession('.cache', expire_after=3600)`` of
+``notebooks/01_data_ingestion.ipynb``, which kept whole responses in SQLite
+keyed by URL: any change to the coordinate list or date window missed
+entirely, and concurrent writers hit "attempt to write a readonly database".
+Here every (endpoint URL, location, variable list, UTC day) is one entry
+holding that day's decoded ``(variables, 24)`` float32 block, so a request
+overlapping days already fetched, for any mix of locations, only goes to the
+API for the days it lacks.
+
+Entries are raw float32 files named by a SHA-256 of their key under
+``datasets/responses/<2 hex>/``. They are written to a temporary file and
+renamed into place, so any number of ingestion workers share the directory
+without locks: readers see a whole entry or none, and two workers filling the
+same day write the same bytes.
+
+Days still in progress are never stored. Days that ended more than
+``FINAL_AFTER`` ago with every hour present are kept for good; other ended
+days are served for ``EXPIRE_AFTER`` (the notebook's hour) and then fetched
+again.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_management import DATASETS_DIR
+
+
+RESPONSE_CACHE_DIR = DATASETS_DIR / "responses"
+EXPIRE_AFTER = pd.Timedelta(hours=1)
+FINAL_AFTER = pd.Timedelta(days=2)
+DAY = pd.Timedelta(days=1)
+HOURS_PER_DAY = 24
+# Well below the API's grid spacing, so nearby spellings of a coordinate share entries
+COORD_DECIMALS = 4
+DTYPE = np.dtype("<f4")
+
+
+class ResponseCache:
+    """Directory of decoded (location, day) blocks shared by ingestion workers."""
+
+    def __init__(self, root=RESPONSE_CACHE_DIR, expire_after=EXPIRE_AFTER, final_after=FINAL_AFTER):
+        self.root = Path(root)
+        self._root = str(self.root)
+        self.expire_after = pd.Timedelta(expire_after)
+        self.final_after = pd.Timedelta(final_after)
+
+    def _digests(self, url, location, variables, first_day, n_days):
+        """Entry digest of each of ``n_days`` days from ``first_day`` for one location."""
+        prefix = hashlib.sha256(json.dumps([
+            url, round(location["lat"], COORD_DECIMALS), round(location["lon"], COORD_DECIMALS), list(variables),
+        ]).encode())
+        digests = []
+        for d in range(n_days):
+            digest = prefix.copy()
+            digest.update((first_day + d * DAY).strftime("%Y-%m-%d").encode())
+            digests.append(digest.hexdigest())
+        return digests
+
+    def _path(self, digest, recent=False):
+        # Plain strings: building Path objects dominated warm reads
+        return os.path.join(self._root, digest[:2], digest + (".recent.f32" if recent else ".f32"))
+
+    def _load(self, path, size):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        # A foreign or truncated file is a miss; the next write replaces it
+        return np.frombuffer(data, dtype=DTYPE) if len(data) == size * DTYPE.itemsize else None
+
+    def read(self, url, locations, variables, first_day, n_days):
+        """Cached hours of ``n_days`` UTC days from ``first_day`` for every location.
+
+        Returns ``(values, found)``: a ``(locations, variables, n_days * 24)``
+        float32 array, NaN where nothing is cached, and a ``(locations,
+        n_days)`` mask of the days found.
+        """
+        size = len(variables) * HOURS_PER_DAY
+        values = np.full((len(locations), len(variables), n_days, HOURS_PER_DAY), np.nan, dtype=np.float32)
+        found = np.zeros((len(locations), n_days), dtype=bool)
+        expires = time.time() - self.expire_after.total_seconds()
+        for i, location in enumerate(locations):
+            for d, digest in enumerate(self._digests(url, location, variables, first_day, n_days)):
+                block = self._load(self._path(digest), size)
+                if block is None:
+                    recent = self._path(digest, recent=True)
+                    try:
+                        fresh = os.stat(recent).st_mtime > expires
+                    except OSError:
+                        fresh = False
+                    block = self._load(recent, size) if fresh else None
+                if block is not None:
+                    values[i, :, d] = block.reshape(len(variables), HOURS_PER_DAY)
+                    found[i, d] = True
+        return values.reshape(len(locations), len(variables), -1), found
+
+    def write(self, url, locations, variables, first_day, values, now=None):
+        """Store the days of ``values`` (shaped as ``read`` returns them); returns the number stored.
+
+        Days not over at ``now`` (default: the current time) and days with
+        no values at all are skipped, so they are fetched again.
+        """
+        now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+        n_days = values.shape[2] // HOURS_PER_DAY
+        days = values.reshape(len(locations), len(variables), n_days, HOURS_PER_DAY)
+        # Only days already over are stored; they come first
+        ended = sum(first_day + (d + 1) * DAY <= now for d in range(n_days))
+        stored = 0
+        for i, location in enumerate(locations):
+            for d, digest in enumerate(self._digests(url, location, variables, first_day, ended)):
+                block = days[i, :, d]
+                received = ~np.isnan(block).all(axis=0)
+                if not received.any():
+                    continue
+                settled = first_day + (d + 1) * DAY + self.final_after <= now
+                self._write(self._path(digest, recent=not (settled and received.all())), block)
+                stored += 1
+        return stored
+
+    def _write(self, path, block):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        np.ascontiguousarray(block, dtype=DTYPE).tofile(tmp)
+        os.replace(tmp, path)
@@ -0,0 +1,428 @@
+"""Rolling statistics and alerts over the per-city time series.
+
+For every city and column: a trailing mean, an exponentially weighted moving
+average (EWMA), the z-score of each value against the window before it, and
+the length of the run of consecutive steps above an alert threshold. All
+cities are computed at once over rows sorted by (city, time): window sums
+are differences of cumulative sums at positions found with
+``np.searchsorted``, the EWMA is a log-depth scan of its linear recurrence,
+and runs come from a running maximum of run starts. Windows are in time
+steps, so a missing day shortens a window instead of shifting it.
+
+``RollingEngine`` keeps, per city, only the rows of its last step and the
+``BASELINE_WINDOW`` steps before it, and the EWMA and run just before them,
+so folding in newly ingested rows costs O(new rows) however long the history
+is. Its latest row per city is what the Monitoring page's alerts table shows.
+A new dataset version is only folded in that way when it appends days;
+otherwise the engine is rebuilt. Checking which it is reads and hashes every
+row of the version (``BatchHistory``), so a refresh as a whole is O(total
+rows), with only that hashing on top of the read.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.aqi_bands import AQI_BAND_EDGES
+from src.data_management import DATE_COL, BatchHistory, dataset_version
+from src.instrumentation import cached, timed
+from src.query import daily_index
+
+
+ROLLING_COLUMNS = ["us_aqi", "pm2_5"]
+
+THRESHOLDS = {
+    "us_aqi": AQI_BAND_EDGES[1],  # above "Moderate"
+    "pm2_5": 35.4,                # 24 h mean above the "Moderate" PM2.5 breakpoint (src.aqi)
+}
+
+STEP = pd.Timedelta(days=1)
+MEAN_WINDOW = 7         # steps in the trailing mean
+EWMA_SPAN = 7           # alpha = 2 / (span + 1), per observation (missing values are skipped)
+BASELINE_WINDOW = 30    # steps before a value its z-score is measured against
+MIN_BASELINE = 7        # observations the baseline needs
+Z_ALERT = 3.0
+MIN_RUN = 2             # consecutive exceeding steps that raise an alert
+
+STATS = ["mean", "ewma", "zscore", "run"]
+
+
+def sort_order(codes, steps):
+    """Order putting rows by (series, step), or None if they already are."""
+    if len(codes) < 2:
+        return None
+    same_series = codes[1:] == codes[:-1]
+    if (codes[1:] >= codes[:-1]).all() and (steps[1:][same_series] > steps[:-1][same_series]).all():
+        return None
+    return np.lexsort((steps, codes))
+
+
+def series_keys(codes, steps, pad):
+    """Ascending int64 keys of rows sorted by (series, step), with series over ``pad`` steps apart."""
+    first = steps.min() if len(steps) else 0
+    span = (steps.max() - first if len(steps) else 0) + pad + 1
+    return codes * span + (steps - first)
+
+
+def window_starts(keys, window):
+    """Position of the first row inside each row's trailing ``window`` steps."""
+    bound = keys - (window - 1)
+    # On a complete grid the window starts exactly window - 1 rows back;
+    # only rows near gaps and series starts need the binary search
+    start = np.arange(-(window - 1), len(keys) - (window - 1))
+    np.maximum(start, 0, out=start)
+    irregular = keys.take(start) != bound
+    start[irregular] = np.searchsorted(keys, bound[irregular], side="left")
+    return start
+
+
+def _cumulative(values, squares=False):
+    """Cumulative sums of the present values (and their squares) and counts, each with a leading 0."""
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    sums = np.zeros(len(values) + 1)
+    np.cumsum(filled, out=sums[1:])
+    counts = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(present, out=counts[1:])
+    if not squares:
+        return sums, counts
+    sum_squares = np.zeros(len(values) + 1)
+    np.cumsum(filled * filled, out=sum_squares[1:])
+    return sums, sum_squares, counts
+
+
+def rolling_mean(values, keys, window, min_periods, start=None):
+    """Trailing ``window``-step means of rows sorted by ``keys`` (see ``series_keys``).
+
+    Missing values count neither towards the sum nor towards ``min_periods``.
+    ``start`` is ``window_starts(keys, window)``, if already computed.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if window == 1:
+        return values
+    sums, counts = _cumulative(values)
+    if start is None:
+        start = window_starts(keys, window)
+    n = counts[1:] - counts.take(start)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (sums[1:] - sums.take(start)) / n
+    means[n < min_periods] = np.nan
+    return means
+
+
+def baseline_zscore(values, keys, window, min_periods):
+    """Z-score of every value against the mean and standard deviation of the ``window`` steps before it."""
+    values = np.asarray(values, dtype=np.float64)
+    # Centering keeps the sums small, so the variance does not cancel out
+    centered = values - (np.nanmean(values) if (~np.isnan(values)).any() else 0.0)
+    sums, sum_squares, counts = _cumulative(centered, squares=True)
+    start = window_starts(keys, window + 1)
+    end = np.arange(len(values))
+    n = counts.take(end) - counts.take(start)
+    total = sums.take(end) - sums.take(start)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / n
+        var = (sum_squares.take(end) - sum_squares.take(start) - total * mean) / (n - 1)
+        z = (centered - mean) / np.sqrt(var)
+    z[(n < min_periods) | ~(var > 0)] = np.nan
+    return z
+
+
+def ewma(values, first, alpha, initial=None):
+    """EWMA of rows sorted by series, restarting at every ``first`` row.
+
+    Missing values carry the previous average forward and do not count as
+    steps, as ``pandas.Series.ewm(adjust=False, ignore_na=True)`` does. A
+    series starts from its ``initial`` value (one per series, e.g. the
+    average up to the previous update) or, where that is NaN, from its first
+    observation; rows before a series has any value are NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return values.copy()
+    positions = np.arange(n)
+    starts = np.flatnonzero(first)
+    series = np.cumsum(first) - 1
+    present = ~np.isnan(values)
+
+    # First observation of every series, for series without an initial value
+    next_present = np.minimum.accumulate(np.where(present, positions, n)[::-1])[::-1]
+    first_seen = next_present.take(starts)
+    ends = np.append(starts[1:], n)
+    first_value = np.where(first_seen < ends, values.take(np.minimum(first_seen, n - 1)), np.nan)
+    has_initial = np.zeros(len(starts), dtype=bool) if initial is None else ~np.isnan(initial)
+    init = np.where(has_initial, np.nan if initial is None else initial, first_value)
+
+    # Rows before a series' first value, without an initial value to carry
+    last_present = np.maximum.accumulate(np.where(present, positions, -1))
+    undefined = (last_present < starts.take(series)) & ~has_initial.take(series)
+
+    # y[t] = a[t] * y[t - 1] + b[t]: a missing value keeps y (a = 1, b = 0), and a
+    # series restarts from its initial value. Solved by doubling the reach of
+    # every row until the remaining coefficient is negligible
+    decay = 1.0 - alpha
+    a = np.where(present, decay, 1.0)
+    b = np.where(present, alpha * values, 0.0)
+    b[starts] += a[starts] * np.nan_to_num(init)
+    a[starts] = 0.0
+    shift = 1
+    while shift < n and a.max() > np.finfo(np.float64).eps:
+        b[shift:] += a[shift:] * b[:-shift]
+        a[shift:] *= a[:-shift]
+        shift *= 2
+    b[undefined] = np.nan
+    return b
+
+
+def run_lengths(exceeds, keys, first, initial=None):
+    """Consecutive exceeding steps up to and including every row (0 where it does not exceed).
+
+    ``initial`` is, per series, the run length the series' first row
+    continues (0 where it does not follow on from an exceeding step).
+    """
+    exceeds = np.asarray(exceeds, dtype=bool)
+    n = len(exceeds)
+    positions = np.arange(n)
+    follows = np.zeros(n, dtype=bool)
+    follows[1:] = exceeds[:-1] & (np.diff(keys) == 1)
+    follows &= ~first
+    run_start = np.maximum.accumulate(np.where(exceeds & ~follows, positions, 0))
+    lengths = np.where(exceeds, positions - run_start + 1, 0)
+    if initial is not None:
+        carried = np.zeros(n, dtype=np.int64)
+        carried[first] = initial
+        lengths += np.where(exceeds, carried.take(run_start), 0)
+    return lengths
+
+
+def time_steps(dates, step=STEP):
+    """Whole ``step`` periods since the epoch of every date, as int64."""
+    dates = pd.Series(dates)
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+    return dates.to_numpy().astype("datetime64[ns]").view(np.int64) // step.value
+
+
+def _compute(codes, steps, frame, columns, thresholds, state=None):
+    """Stats of rows sorted by (codes, steps); ``state`` holds, per code, the step, EWMA and run before them."""
+    keys = series_keys(codes, steps, BASELINE_WINDOW + 1)
+    first = np.ones(len(codes), dtype=bool)
+    first[1:] = codes[1:] != codes[:-1]
+    first_codes = codes[first]
+    mean_start = window_starts(keys, MEAN_WINDOW)
+
+    follows_state = None
+    if state is not None:
+        follows_state = steps[first] == state["step"].take(first_codes) + 1
+
+    stats = {}
+    for column in columns:
+        values = frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        initial_ewma = initial_run = None
+        if state is not None:
+            initial_ewma = state[f"{column}_ewma"].take(first_codes)
+            initial_run = np.where(follows_state, state[f"{column}_run"].take(first_codes), 0)
+        stats[f"{column}_mean"] = rolling_mean(values, keys, MEAN_WINDOW, 1, mean_start)
+        stats[f"{column}_ewma"] = ewma(values, first, 2.0 / (EWMA_SPAN + 1), initial_ewma)
+        stats[f"{column}_zscore"] = baseline_zscore(values, keys, BASELINE_WINDOW, MIN_BASELINE)
+        with np.errstate(invalid="ignore"):
+            exceeds = values > thresholds[column]
+        stats[f"{column}_run"] = run_lengths(exceeds, keys, first, initial_run)
+    return stats
+
+
+def rolling_stats(df, columns=ROLLING_COLUMNS, thresholds=THRESHOLDS, by="city", date_col=DATE_COL, step=STEP):
+    """``<column>_mean``, ``_ewma``, ``_zscore`` and ``_run`` of every row of ``df``, per ``by`` group."""
+    codes = pd.factorize(df[by])[0].astype(np.int64)
+    steps = time_steps(df[date_col], step)
+    order = sort_order(codes, steps)
+    frame = df if order is None else df.iloc[order]
+    if order is not None:
+        codes, steps = codes[order], steps[order]
+
+    stats = _compute(codes, steps, frame, columns, thresholds)
+    if order is not None:
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(len(order))
+        stats = {name: values.take(inverse) for name, values in stats.items()}
+    return pd.DataFrame(stats, index=df.index)
+
+
+class RollingEngine:
+    """Per-group rolling state of ``columns``, refreshed from the growing dataset.
+
+    Only rows from each group's retained window onwards are read on
+    ``update``, and a row restating a retained step replaces it, so a
+    partially ingested day can be revised. Earlier rows are taken as final;
+    ``sync`` checks that they are and rebuilds the state when they are not.
+    """
+
+    def __init__(self, columns=ROLLING_COLUMNS, thresholds=THRESHOLDS, by="city", date_col=DATE_COL, step=STEP):
+        self.columns = list(columns)
+        self.thresholds = {column: thresholds[column] for column in self.columns}
+        self.by = by
+        self.date_col = date_col
+        self.step = step
+        self.version = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget every group."""
+        self._tail = None
+        self._state = None
+        self.latest = None
+        # Per group, the last step synced and the digest of the rows before it
+        self._marks = None
+        self._history = None
+
+    def sync(self, batches):
+        """Bring the engine up to a new version of the dataset; returns whether it was rebuilt.
+
+        ``batches()`` yields the version's rows in group-aligned batches. They
+        are folded in with ``update`` only while the version just appends to
+        the last one synced: every group still present, with the same rows
+        before its last synced step and none of them ending before it. Revised
+        history, removed groups or a replaced dataset rebuild the state from
+        scratch. Every row is read and hashed once for the check, so this is
+        O(total rows) even when only the new rows are folded in.
+        """
+        if self._marks is not None:
+            synced = self._fold(batches(), check=True)
+            if synced is not None and self._marks.index.isin(synced[0].index).all():
+                self._marks, self._history = synced
+                return False
+        self.reset()
+        self._marks, self._history = self._fold(batches(), check=False)
+        return True
+
+    def _fold(self, batches, check):
+        """``update`` with every batch; the new marks and digests, or None once a batch is not an append."""
+        marks, history = [], []
+        for batch in batches:
+            steps = time_steps(batch[self.date_col], self.step)
+            batch_history = BatchHistory(batch[self.by], steps, batch[self.columns])
+            if check and not batch_history.appends(self._marks, self._history):
+                return None
+            self.update(batch)
+            marks.append(batch_history.newest)
+            history.append(batch_history.digest(batch_history.newest))
+        if not marks:
+            return pd.Series(dtype=np.int64), pd.DataFrame(columns=["size", "sum"], dtype=np.int64)
+        return pd.concat(marks), pd.concat(history)
+
+    def update(self, df):
+        """Fold in the rows of ``df`` from each group's retained window onwards."""
+        rows = df[[self.by, self.date_col] + self.columns].assign(_step=time_steps(df[self.date_col], self.step))
+        rows[self.by] = rows[self.by].astype(str)
+        if self._tail is not None:
+            window_start = self._tail.groupby(self.by, sort=False)["_step"].min()
+            start = rows[self.by].map(window_start)
+            rows = rows[start.isna() | (rows["_step"] >= start)]
+        fresh = len(rows)
+        if not fresh:
+            # An empty batch, or only rows the retained window is already past
+            return 0
+        others = None
+        if self._tail is not None:
+            # Groups without rows in ``df`` keep their stats as they are
+            updated = self._tail[self.by].isin(rows[self.by].unique())
+            others = self._tail[~updated]
+            rows = pd.concat([self._tail[updated], rows], ignore_index=True)
+            rows = rows.drop_duplicates([self.by, "_step"], keep="last")
+
+        codes, groups = pd.factorize(rows[self.by], sort=True)
+        groups = np.asarray(groups, dtype=object)
+        steps = rows["_step"].to_numpy()
+        order = np.lexsort((steps, codes))
+        rows = rows.iloc[order].reset_index(drop=True)
+        codes, steps = codes[order].astype(np.int64), steps[order]
+
+        state = None
+        if self._state is not None:
+            known = self._state.reindex(groups)
+            state = {"step": known["step"].fillna(np.iinfo(np.int64).min // 2).to_numpy(np.int64)}
+            for column in self.columns:
+                state[f"{column}_ewma"] = known[f"{column}_ewma"].to_numpy(np.float64)
+                state[f"{column}_run"] = known[f"{column}_run"].fillna(0).to_numpy(np.int64)
+        stats = pd.DataFrame(_compute(codes, steps, rows, self.columns, self.thresholds, state))
+
+        last = np.ones(len(codes), dtype=bool)
+        last[:-1] = codes[1:] != codes[:-1]
+        latest = pd.concat([rows.loc[last, [self.by, self.date_col] + self.columns], stats[last]], axis=1)
+        latest = latest.set_index(self.by)
+        self.latest = latest if self.latest is None else pd.concat(
+            [self.latest.drop(latest.index, errors="ignore"), latest]).sort_index()
+
+        # Keep the last step and the BASELINE_WINDOW steps before it, so a restated
+        # last step still has its whole baseline, and the state of the row before them
+        newest = pd.Series(steps[last], index=codes[last]).reindex(codes).to_numpy()
+        keep = steps >= newest - BASELINE_WINDOW
+        dropped = ~keep
+        before = dropped.copy()
+        before[:-1] &= keep[1:] & (codes[1:] == codes[:-1])
+        before[-1] = False
+        state = pd.DataFrame({"step": steps[before]}, index=groups[codes[before]])
+        for column in self.columns:
+            state[f"{column}_ewma"] = stats[f"{column}_ewma"].to_numpy()[before]
+            state[f"{column}_run"] = stats[f"{column}_run"].to_numpy()[before]
+        if self._state is not None:
+            state = pd.concat([self._state.drop(state.index, errors="ignore"), state])
+        self._state = state
+        self._tail = pd.concat([others, rows[keep]], ignore_index=True)
+        return fresh
+
+    def alerts(self, z_alert=Z_ALERT, min_run=MIN_RUN):
+        """One row per active alert at each group's latest step: exceedance runs and anomalous values."""
+        columns = [self.by, "metric", "alert", self.date_col, "value", "threshold", "mean", "zscore", "run", "since"]
+        if self.latest is None:
+            return pd.DataFrame(columns=columns)
+        parts = []
+        latest = self.latest.reset_index()
+        for column in self.columns:
+            base = pd.DataFrame({
+                self.by: latest[self.by],
+                "metric": column,
+                self.date_col: latest[self.date_col],
+                "value": latest[column],
+                "threshold": self.thresholds[column],
+                "mean": latest[f"{column}_mean"],
+                "zscore": latest[f"{column}_zscore"],
+                "run": latest[f"{column}_run"],
+            })
+            base["since"] = base[self.date_col] - (base["run"] - 1).clip(lower=0) * self.step
+            parts.append(base[base["run"] >= min_run].assign(alert="Exceedance"))
+            parts.append(base[base["zscore"].abs() >= z_alert].assign(alert="Anomaly"))
+        alerts = pd.concat(parts, ignore_index=True)[columns]
+        return alerts.sort_values(["alert", "run", "zscore"], ascending=[True, False, False], ignore_index=True)
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_engine():
+    return RollingEngine()
+
+
+@timed("rolling.engine")
+def rolling_engine():
+    """The process-wide engine, brought up to date with the current dataset version."""
+    engine = _shared_engine()
+    version = dataset_version()
+    with engine.lock:
+        if engine.version != version:
+            columns = [engine.by, engine.date_col] + engine.columns
+            engine.sync(lambda: daily_index().batches(columns))
+            engine.version = version
+    return engine
+
+
+@cached("rolling.city_stats", st.cache_data(show_spinner=False, max_entries=64))
+def _city_rolling(version, city, columns):
+    rows = daily_index().get(city, columns=["city", DATE_COL, *columns])
+    return pd.concat([rows[[DATE_COL, *columns]], rolling_stats(rows, list(columns))], axis=1).reset_index(drop=True)
+
+
+def city_rolling(city, columns=ROLLING_COLUMNS):
+    """Rows of ``city`` with the rolling stats of ``columns``, for chart overlays."""
+    return _city_rolling(dataset_version(), city, tuple(columns))